@@ -0,0 +1,122 @@
+# bankapp/account_numbers.py
+"""
+Account number allocation without lookups.
+
+A database counter is handed out in blocks (one short UPDATE per BLOCK_SIZE
+numbers per process). Each counter value goes through a keyed Feistel
+permutation, so consecutive customers don't get guessable consecutive numbers,
+and gets a Luhn check digit. The permutation is a bijection, so two counter
+values can never produce the same number.
+
+Numbers are 10 digits: a 9-digit body (never starting with 0) and the check
+digit. Older accounts have 8-digit random numbers, so the two never collide.
+"""
+import hashlib
+import threading
+from functools import lru_cache
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from .models import AccountNumberSequence
+
+
+SEQUENCE_NAME = 'account_number'
+BLOCK_SIZE = 100
+
+DOMAIN = 9 * 10 ** 8  # bodies 100000000..999999999
+_HALF_BITS = 15       # 2**30 is the smallest even-bit power of two above DOMAIN
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_ROUNDS = 4
+
+
+class AccountNumbersExhausted(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=1)
+def _key():
+    # Changing ACCOUNT_NUMBER_KEY (or SECRET_KEY, its default) on a live system
+    # changes the permutation, so new numbers could collide with issued ones.
+    secret = getattr(settings, 'ACCOUNT_NUMBER_KEY', None) or settings.SECRET_KEY
+    return hashlib.sha256(secret.encode()).digest()
+
+
+def _round(i, half):
+    digest = hashlib.blake2b(bytes([i]) + half.to_bytes(2, 'big'), key=_key(), digest_size=4).digest()
+    return int.from_bytes(digest, 'big') & _HALF_MASK
+
+
+def _feistel(value):
+    left, right = value >> _HALF_BITS, value & _HALF_MASK
+    for i in range(_ROUNDS):
+        left, right = right, left ^ _round(i, right)
+    return (left << _HALF_BITS) | right
+
+
+def permute(value):
+    """Bijection on range(DOMAIN): Feistel on 30 bits, cycle-walking back into the domain."""
+    if not 0 <= value < DOMAIN:
+        raise AccountNumbersExhausted(f"Account number counter {value} is outside the number space")
+    value = _feistel(value)
+    while value >= DOMAIN:
+        value = _feistel(value)
+    return value
+
+
+def luhn_check_digit(digits):
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        n = int(digit)
+        if i % 2 == 0:  # these get doubled once the check digit is appended
+            n = n * 2 - 9 if n > 4 else n * 2
+        total += n
+    return str(-total % 10)
+
+
+def is_valid_account_number(number):
+    return len(number) == 10 and number.isdigit() and luhn_check_digit(number[:-1]) == number[-1]
+
+
+def account_number_for(counter):
+    body = str(10 ** 8 + permute(counter))
+    return body + luhn_check_digit(body)
+
+
+def reserve_block(size=BLOCK_SIZE):
+    """
+    Claim `size` counter values with one conditional UPDATE and return them as a
+    range. Runs in its own transaction when called outside one, so call it
+    before opening the atomic block that uses the numbers to avoid holding the
+    counter row lock for the whole signup.
+    """
+    with transaction.atomic():
+        AccountNumberSequence.objects.filter(name=SEQUENCE_NAME).update(next_value=F('next_value') + size)
+        end = AccountNumberSequence.objects.values_list('next_value', flat=True).get(name=SEQUENCE_NAME)
+    return range(end - size, end)
+
+
+class AccountNumberAllocator:
+    """Hands out account numbers from blocks reserved per process."""
+
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.block = iter(())
+
+    def take(self, count=1):
+        numbers = []
+        with self.lock:
+            while len(numbers) < count:
+                counter = next(self.block, None)
+                if counter is None:
+                    self.block = iter(reserve_block(max(self.block_size, count - len(numbers))))
+                    continue
+                numbers.append(account_number_for(counter))
+        return numbers
+
+
+allocator = AccountNumberAllocator()
+
+
+def allocate_account_number():
+    return allocator.take()[0]
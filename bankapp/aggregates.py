@@ -0,0 +1,178 @@
+# bankapp/aggregates.py
+from datetime import datetime
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, Exists, F, OuterRef, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import ArchiveSegment, MonthlyAggregate, Transaction
+
+
+def month_start(value):
+    """Return the first day of the month for a date or (aware) datetime."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def record_transaction(txn):
+    """
+    Fold a freshly created Transaction into its monthly rollup row.
+    Must be called inside the same atomic block that created the transaction.
+    """
+    month = month_start(txn.timestamp)
+    credit = txn.amount if txn.amount > 0 else Decimal('0.00')
+    debit = txn.amount if txn.amount < 0 else Decimal('0.00')
+
+    rows = MonthlyAggregate.objects.filter(
+        account_id=txn.account_id, month=month, transaction_type=txn.transaction_type
+    )
+    updated = rows.update(
+        count=F('count') + 1,
+        credit_total=F('credit_total') + credit,
+        debit_total=F('debit_total') + debit,
+    )
+    if updated:
+        return
+
+    try:
+        # Savepoint so a concurrent insert of the same row doesn't poison the outer transaction
+        with transaction.atomic():
+            MonthlyAggregate.objects.create(
+                account_id=txn.account_id, month=month, transaction_type=txn.transaction_type,
+                count=1, credit_total=credit, debit_total=debit,
+            )
+    except IntegrityError:
+        rows.update(
+            count=F('count') + 1,
+            credit_total=F('credit_total') + credit,
+            debit_total=F('debit_total') + debit,
+        )
+
+
+def rebuild_aggregates(accounts=None):
+    """
+    Recompute rollup rows from the Transaction table with a single GROUP BY.
+    Pass a queryset/list of accounts to limit the rebuild; returns rows written.
+    """
+    transactions = Transaction.objects.all()
+    aggregates = MonthlyAggregate.objects.all()
+    if accounts is not None:
+        transactions = transactions.filter(account__in=accounts)
+        aggregates = aggregates.filter(account__in=accounts)
+
+    # Months moved to the archive aren't in the table any more; their rollups stay as they are
+    aggregates = aggregates.exclude(Exists(
+        ArchiveSegment.objects.filter(account=OuterRef('account'), month=OuterRef('month'))
+    ))
+
+    money = DecimalField(max_digits=14, decimal_places=2)
+    grouped = (
+        transactions.annotate(month=TruncMonth('timestamp'))
+        .values('account_id', 'month', 'transaction_type')
+        .annotate(
+            txn_count=Count('id'),
+            credits=Sum(Case(When(amount__gt=0, then=F('amount')), default=Value(0), output_field=money)),
+            debits=Sum(Case(When(amount__lt=0, then=F('amount')), default=Value(0), output_field=money)),
+        )
+        .order_by()
+    )
+
+    rows = [
+        MonthlyAggregate(
+            account_id=row['account_id'],
+            month=month_start(row['month']),
+            transaction_type=row['transaction_type'],
+            count=row['txn_count'],
+            credit_total=row['credits'] or Decimal('0.00'),
+            debit_total=row['debits'] or Decimal('0.00'),
+        )
+        for row in grouped
+    ]
+
+    with transaction.atomic():
+        aggregates.delete()
+        # A kept archived-month row already counts the rows still in the table for that month
+        MonthlyAggregate.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def monthly_net_totals(account, months):
+    """Map each requested month (first-of-month date) to the net amount moved in it."""
+    totals = dict.fromkeys(months, Decimal('0.00'))
+    rows = MonthlyAggregate.objects.filter(account=account, month__in=list(totals)).values_list(
+        'month', 'credit_total', 'debit_total'
+    )
+    for month, credits, debits in rows:
+        totals[month] += credits + debits
+    return totals
+
+
+def _type_rows(account):
+    return (
+        MonthlyAggregate.objects.filter(account=account)
+        .values('transaction_type')
+        .annotate(credits=Sum('credit_total'), debits=Sum('debit_total'))
+        .order_by()
+    )
+
+
+def _by_type(rows):
+    return {
+        row['transaction_type']: (row['credits'] or Decimal('0.00'), row['debits'] or Decimal('0.00'))
+        for row in rows
+    }
+
+
+def type_totals(account):
+    """Lifetime credit/debit totals per transaction type, read from the rollup table."""
+    return _by_type(_type_rows(account))
+
+
+async def atype_totals(account):
+    return _by_type([row async for row in _type_rows(account)])
+
+
+def record_transactions(txns):
+    """
+    Bulk version of record_transaction for batch jobs: folds many transactions
+    into their rollup rows with one read, one bulk_update and one bulk_create.
+    Callers must hold row locks on the affected accounts.
+    """
+    deltas = {}
+    for txn in txns:
+        key = (txn.account_id, month_start(txn.timestamp), txn.transaction_type)
+        count, credit, debit = deltas.get(key, (0, Decimal('0.00'), Decimal('0.00')))
+        if txn.amount > 0:
+            credit += txn.amount
+        else:
+            debit += txn.amount
+        deltas[key] = (count + 1, credit, debit)
+    if not deltas:
+        return
+
+    existing = MonthlyAggregate.objects.filter(
+        account_id__in={key[0] for key in deltas},
+        month__in={key[1] for key in deltas},
+        transaction_type__in={key[2] for key in deltas},
+    )
+    to_update = []
+    for row in existing:
+        delta = deltas.pop((row.account_id, row.month, row.transaction_type), None)
+        if delta is None:
+            continue
+        row.count += delta[0]
+        row.credit_total += delta[1]
+        row.debit_total += delta[2]
+        to_update.append(row)
+
+    MonthlyAggregate.objects.bulk_update(to_update, ['count', 'credit_total', 'debit_total'], batch_size=1000)
+    MonthlyAggregate.objects.bulk_create([
+        MonthlyAggregate(
+            account_id=account_id, month=month, transaction_type=transaction_type,
+            count=count, credit_total=credit, debit_total=debit,
+        )
+        for (account_id, month, transaction_type), (count, credit, debit) in deltas.items()
+    ], batch_size=1000)
@@ -0,0 +1,69 @@
+# bankapp/amortization.py
+"""
+Repayment schedules for approved loans.
+
+A loan owes its balance_remaining: the approved amount plus the scheme's flat
+interest. schedule_installments() splits that into equal monthly
+installments, each carrying an equal share of the interest, and returns them as
+unsaved LoanInstallment rows for a single bulk_create. The arithmetic runs on
+integer cents for the whole batch of loans, so the parts always add up to the
+balance exactly. Whatever doesn't divide evenly goes on the last installment.
+
+auto_repay_loans (bankapp/services.py) then reads only the installments due by
+the run date, through the (status, due_date) index. The nightly job grows with
+what is due, not with the number of open loans.
+"""
+import calendar
+from decimal import Decimal
+from django.db.models import OuterRef, Subquery
+from .models import LoanInstallment
+
+
+def add_months(day, months):
+    """`day` moved by whole calendar months, clamped to the end of shorter months."""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _cents(amount):
+    return int((amount * 100).to_integral_value())
+
+
+def _split(total, parts):
+    """`total` cents in `parts` equal whole-cent shares, the remainder on the last one."""
+    share = total // parts
+    return [share] * (parts - 1) + [total - share * (parts - 1)]
+
+
+def schedule_installments(loans, start, months):
+    """
+    The schedule of each loan in `loans` as unsaved LoanInstallments: its
+    balance_remaining in `months` monthly installments (an int, or a
+    {loan id: int} mapping), installment n due n months after the date
+    `start`. Interest is the part of the balance that the loan's flat
+    interest_rate added on top of the principal.
+    """
+    installments = []
+    for loan in loans:
+        count = max(1, months[loan.id] if isinstance(months, dict) else months)
+        balance = _cents(loan.balance_remaining)
+        interest = _cents(loan.balance_remaining * loan.interest_rate / (1 + loan.interest_rate))
+        amounts, interests = _split(balance, count), _split(interest, count)
+        installments += [
+            LoanInstallment(
+                loan=loan, account_id=loan.account_id, number=number, due_date=add_months(start, number),
+                amount=Decimal(amount) / 100, interest=Decimal(part) / 100, principal=Decimal(amount - part) / 100,
+            )
+            for number, amount, part in zip(range(1, count + 1), amounts, interests)
+        ]
+    return installments
+
+
+def with_next_installment(loans):
+    """Annotate a Loan queryset with the due date and amount of each loan's earliest unpaid installment."""
+    upcoming = LoanInstallment.objects.filter(loan=OuterRef('pk'), status='Due').order_by('number')
+    return loans.annotate(
+        next_due_date=Subquery(upcoming.values('due_date')[:1]),
+        next_due_amount=Subquery(upcoming.values('amount')[:1]),
+    )
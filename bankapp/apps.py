@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _ensure_search_index(using, **kwargs):
+    from .search import ensure_search_index
+    ensure_search_index(using)
 
 
 class BankappConfig(AppConfig):
     name = 'bankapp'
+
+    def ready(self):
+        # SQLite table rebuilds in later migrations drop the FTS triggers; put them back
+        post_migrate.connect(_ensure_search_index, sender=self, dispatch_uid='bankapp.search')
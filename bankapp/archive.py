@@ -0,0 +1,287 @@
+# bankapp/archive.py
+"""
+Cold storage for old transactions.
+
+archive_transactions() moves every transaction older than the archive horizon
+(ARCHIVE_AFTER_DAYS back, rounded down to a month start) out of the Transaction
+table. Each account's rows for one month become one gzip member of a JSON-lines
+file under ARCHIVE_DIR/transactions/YYYY-MM/, and an ArchiveSegment row records
+where that member is, the ids and times it covers and the sum of its amounts.
+Files are written and fsynced before the segments are inserted and the rows
+deleted in the chunk's transaction, so a crash leaves at worst an unreferenced
+file, never a lost row. MonthlyAggregate and the ledger keep their rows.
+
+Readers query the hot table first and only open archive files when what they
+were asked for reaches back past the account's newest archived row:
+paginate_history (history pages, dashboard, APIs), statement_rows and
+opening_balance (statements) and archived_transaction (receipts). Decompressed
+segments are kept in a small per-process LRU, so paging through an archived
+month reads its file once.
+"""
+import gzip
+import heapq
+import json
+import os
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from itertools import groupby, islice
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .aggregates import month_start
+from .batch import plan_shards, run_shards, run_totals, shard_filter
+from .models import Account, ArchiveSegment, BatchShard, Transaction
+from .pagination import DEFAULT_PAGE_SIZE, _make_page, _page_query, date_range_bounds, decode_cursor
+from .search import search_predicate
+
+
+JOB = 'archive_transactions'
+DELETE_BATCH = 500
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.get_fixed_timezone(0))
+
+
+def archive_horizon(now=None):
+    """Start of the oldest month that stays in the Transaction table."""
+    cutoff = (now or timezone.now()) - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    return timezone.make_aware(datetime.combine(month_start(cutoff), time.min))
+
+
+def _write_segments(rows):
+    """
+    Write (account_id, id, timestamp, transaction_type, description, amount,
+    counterparty) rows, ordered by account then time, as one gzip member per
+    account and month; one new file per month. Returns the unsaved
+    ArchiveSegments and the ids written.
+    """
+    files, segments, ids = {}, [], []
+    try:
+        for (account_id, month), group in groupby(rows, key=lambda row: (row[0], month_start(row[2]))):
+            group = list(group)
+            if month not in files:
+                path = os.path.join('transactions', f"{month:%Y-%m}", f"{uuid.uuid4().hex}.jsonl.gz")
+                os.makedirs(os.path.dirname(os.path.join(settings.ARCHIVE_DIR, path)), exist_ok=True)
+                files[month] = (path, open(os.path.join(settings.ARCHIVE_DIR, path), 'xb'))
+            path, out = files[month]
+
+            payload = ''.join(
+                json.dumps({
+                    'account_id': account_id, 'id': pk, 'timestamp': timestamp.isoformat(),
+                    'transaction_type': transaction_type, 'description': description,
+                    'amount': str(amount), 'counterparty': counterparty,
+                }, separators=(',', ':')) + '\n'
+                for account_id, pk, timestamp, transaction_type, description, amount, counterparty in group
+            )
+            member = gzip.compress(payload.encode(), mtime=0)
+            segments.append(ArchiveSegment(
+                account_id=account_id, month=month, path=path, offset=out.tell(), length=len(member),
+                row_count=len(group), first_id=min(row[1] for row in group), last_id=max(row[1] for row in group),
+                first_at=group[0][2], last_at=group[-1][2], total=sum(row[5] for row in group),
+            ))
+            out.write(member)
+            ids += [row[1] for row in group]
+
+        for _, out in files.values():
+            out.flush()
+            os.fsync(out.fileno())
+    finally:
+        for _, out in files.values():
+            out.close()
+    return segments, ids
+
+
+def archive_shard(shard, before, chunk_size=200, scope=None):
+    """
+    Archive the transactions older than `before` of the accounts in one shard,
+    chunk_size accounts at a time. Each chunk locks the shard row, writes the
+    accounts' old rows to archive files, inserts their segments, deletes the
+    rows and moves the checkpoint forward in one transaction.
+    """
+    accounts = Account.objects.all()
+    if scope is not None:
+        accounts.query = scope
+    accounts = accounts.filter(shard_filter(shard))
+    while True:
+        with transaction.atomic():
+            shard = BatchShard.objects.select_for_update().get(id=shard.id)
+            account_ids = list(
+                accounts.filter(id__gt=shard.last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not account_ids:
+                return
+
+            rows = Transaction.objects.filter(account_id__in=account_ids, timestamp__lt=before).order_by(
+                'account_id', 'timestamp', 'id',
+            ).values_list('account_id', 'id', 'timestamp', 'transaction_type', 'description', 'amount', 'counterparty')
+            segments, ids = _write_segments(rows.iterator(chunk_size=2000))
+            ArchiveSegment.objects.bulk_create(segments, batch_size=1000)
+            deleted = 0
+            for start in range(0, len(ids), DELETE_BATCH):
+                # Goes through the collector, so receipts queued for these rows go too
+                _, per_model = Transaction.objects.filter(id__in=ids[start:start + DELETE_BATCH]).delete()
+                deleted += per_model.get(Transaction._meta.label, 0)
+            if deleted != len(ids):
+                # Someone else (a second archiver) removed rows we wrote; roll back and leave the files orphaned
+                raise RuntimeError(f"Expected to archive {len(ids)} transactions, deleted {deleted}")
+
+            shard.last_id = account_ids[-1]
+            shard.processed += len(account_ids)
+            shard.succeeded += len(ids)
+            shard.total_amount += sum((segment.total for segment in segments), Decimal('0.00'))
+            shard.save(update_fields=['last_id', 'processed', 'succeeded', 'total_amount'])
+
+
+def archive_transactions(before=None, chunk_size=200, workers=1, shards=None, progress=None, accounts=None,
+                         run_key=None):
+    """
+    Move every transaction older than `before` (default archive_horizon()) to
+    the archive, sharded by account id range (see bankapp/batch.py). A run is
+    keyed by its cutoff, so running again for the same cutoff resumes an
+    interrupted run and is a no-op after a completed one. `accounts` optionally
+    narrows the Account queryset and `run_key` replaces the cutoff as the run's
+    key (both used by the benchmark). Returns (run totals, BatchReport); totals
+    count accounts in `processed` and archived transactions in `succeeded`.
+    """
+    before = before or archive_horizon()
+    run_key = run_key or before.isoformat()
+    plan = plan_shards(
+        JOB, run_key, Account.objects.all() if accounts is None else accounts,
+        shards or (workers * 4 if workers > 1 else 1),
+    )
+    report = run_shards(
+        archive_shard, plan, workers, progress,
+        before=before, chunk_size=chunk_size, scope=None if accounts is None else accounts.query,
+    )
+    return run_totals(JOB, run_key), report
+
+
+@lru_cache(maxsize=64)
+def _load(path, offset, length):
+    """Rows of one segment as (timestamp, id, type, description, amount, counterparty), oldest first."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = gzip.decompress(f.read(length))  # checks the member's CRC
+    rows = []
+    for line in data.splitlines():
+        row = json.loads(line)
+        rows.append((
+            datetime.fromisoformat(row['timestamp']), row['id'], row['transaction_type'], row['description'],
+            Decimal(row['amount']), row['counterparty'],
+        ))
+    return tuple(rows)
+
+
+def _segment_rows(path, offset, length):
+    return _load(os.path.join(settings.ARCHIVE_DIR, path), offset, length)
+
+
+def _segments(account, start=None, end=None):
+    segments = ArchiveSegment.objects.filter(account=account)
+    if start is not None:
+        segments = segments.filter(last_at__gte=start)
+    if end is not None:
+        segments = segments.filter(first_at__lt=end)
+    return segments
+
+
+def archived_rows(account, start=None, end=None, newest_first=False):
+    """
+    The account's archived rows with start <= timestamp < end, as
+    (timestamp, id, type, description, amount, counterparty), oldest first or
+    newest first. Segment files are opened one at a time as the caller
+    iterates, so stopping early leaves the rest unread.
+    """
+    segments = _segments(account, start, end).order_by('-last_at' if newest_first else 'first_at')
+    pending = list(segments.values_list('path', 'offset', 'length', 'first_at', 'last_at'))
+    sign = -1 if newest_first else 1
+    heap, i = [], 0
+    while i < len(pending) or heap:
+        # Segments can overlap (a month archived twice), so load the next one
+        # whenever it could hold a row that sorts before the next one buffered
+        if i < len(pending) and (not heap or (
+            pending[i][4] >= heap[0][1][0] if newest_first else pending[i][3] <= heap[0][1][0]
+        )):
+            for row in _segment_rows(*pending[i][:3]):
+                if (start is None or row[0] >= start) and (end is None or row[0] < end):
+                    micros = (row[0] - EPOCH) // timedelta(microseconds=1)
+                    heapq.heappush(heap, ((sign * micros, sign * row[1]), row))
+            i += 1
+            continue
+        yield heapq.heappop(heap)[1]
+
+
+def _as_transaction(account, row):
+    timestamp, pk, transaction_type, description, amount, counterparty = row
+    return Transaction(
+        id=pk, account=account, timestamp=timestamp, transaction_type=transaction_type,
+        description=description, amount=amount, counterparty=counterparty,
+    )
+
+
+def archived_total(account, start=None):
+    """Sum of the amounts of the account's archived rows at or after `start` (all of them if None)."""
+    total = Decimal('0.00')
+    for path, offset, length, first_at, segment_total in _segments(account, start).values_list(
+        'path', 'offset', 'length', 'first_at', 'total',
+    ):
+        if start is None or first_at >= start:
+            total += segment_total
+        else:
+            total += sum((row[4] for row in _segment_rows(path, offset, length) if row[0] >= start), Decimal('0.00'))
+    return total
+
+
+def archived_transaction(account, pk):
+    """One archived transaction of `account` as an unsaved Transaction, or None."""
+    segments = ArchiveSegment.objects.filter(account=account, first_id__lte=pk, last_id__gte=pk)
+    for path, offset, length in segments.values_list('path', 'offset', 'length'):
+        for row in _segment_rows(path, offset, length):
+            if row[1] == pk:
+                return _as_transaction(account, row)
+    return None
+
+
+def _top_up(rows, page_size, queryset, account, cursor, params):
+    """Merge archived rows into a page of hot rows if the page reaches back into the archive."""
+    if account is None or queryset.query.is_empty():
+        return _make_page(rows, page_size)
+
+    start, end = date_range_bounds(*(params.get(name) for name in ('start_date', 'end_date'))) if params else (None, None)
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        end = min(end, after[0] + timedelta(microseconds=1)) if end else after[0] + timedelta(microseconds=1)
+    if len(rows) > page_size:
+        # A full page only needs archived rows that would sort above its last one
+        start = max(start, rows[-1].timestamp) if start else rows[-1].timestamp
+    if not _segments(account, start, end).exists():
+        return _make_page(rows, page_size)
+
+    matches = search_predicate(params) if params else None
+    archived = (
+        txn for txn in (_as_transaction(account, row) for row in archived_rows(account, start, end, newest_first=True))
+        if (after is None or (txn.timestamp, txn.id) < after) and (matches is None or matches(txn))
+    )
+    merged = heapq.merge(rows, archived, key=lambda txn: (txn.timestamp, txn.id), reverse=True)
+    return _make_page(list(islice(merged, page_size + 1)), page_size)
+
+
+def paginate_history(queryset, account, cursor=None, page_size=DEFAULT_PAGE_SIZE, params=None):
+    """
+    paginate_transactions over one account's rows, topped up from the archive
+    when the page reaches back past the newest archived row. `params` are the
+    search filters already applied to `queryset` (see search_transactions);
+    archived rows are filtered the same way. Costs one indexed EXISTS on
+    ArchiveSegment per page until the archive is actually reached.
+    """
+    query, page_size = _page_query(queryset, cursor, page_size)
+    return _top_up(list(query), page_size, queryset, account, cursor, params)
+
+
+async def apaginate_history(queryset, account, cursor=None, page_size=DEFAULT_PAGE_SIZE, params=None):
+    """paginate_history on the async ORM; the archive check and file reads run in a thread."""
+    query, page_size = _page_query(queryset, cursor, page_size)
+    rows = [txn async for txn in query]
+    return await sync_to_async(_top_up)(rows, page_size, queryset, account, cursor, params)
@@ -0,0 +1,178 @@
+# bankapp/batch.py
+"""
+Sharded runner for nightly batch jobs.
+
+A run is split into account id ranges (BatchShard rows, created once per run
+and reused when the run is resumed). Each shard is handed to a shard function
+that walks its range in chunks and moves the shard's checkpoint forward in the
+same transaction as each chunk's writes. With workers > 1 the shards run in a
+ProcessPoolExecutor; every worker process opens its own database connection.
+Results and errors of all shards are merged into one BatchReport.
+
+Shard functions must be importable module-level callables taking
+(shard, **kwargs), since they're pickled to the worker processes.
+"""
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+import django
+from django.db import connections
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from .models import BatchShard
+
+
+class ShardResult:
+    def __init__(self, shard_id, low, high, processed=0, succeeded=0, deferred=0,
+                 total_amount=Decimal('0.00'), error=None, elapsed=0.0):
+        self.shard_id = shard_id
+        self.low = low
+        self.high = high
+        self.processed = processed
+        self.succeeded = succeeded
+        self.deferred = deferred
+        self.total_amount = total_amount
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def label(self):
+        return f"[{self.low}, {'...' if self.high is None else self.high})"
+
+
+class BatchReport:
+    """Merged outcome of the shards run by one run_shards() call."""
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def errors(self):
+        return [r for r in self.results if r.error]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def total(self, field):
+        return sum(getattr(r, field) for r in self.results)
+
+
+def shard_filter(shard, field='id'):
+    """Q restricting `field` to the shard's id range."""
+    q = Q(**{f'{field}__gte': shard.low})
+    if shard.high is not None:
+        q &= Q(**{f'{field}__lt': shard.high})
+    return q
+
+
+def plan_shards(job, run_key, queryset, count, field='id'):
+    """
+    The shards of a run, creating them on first use by splitting the current
+    min..max of `field` in `queryset` into `count` ranges. The last range is
+    open-ended so rows added later still belong to a shard.
+    """
+    shards = list(BatchShard.objects.filter(job=job, run_key=run_key).order_by('low'))
+    if shards:
+        return shards
+
+    bounds = queryset.aggregate(low=Min(field), high=Max(field))
+    low, high = bounds['low'] or 0, bounds['high'] or 0
+    count = max(1, min(count, high - low + 1))
+    step = -(-(high - low + 1) // count)  # ceiling division
+    edges = [low + i * step for i in range(count)]
+    BatchShard.objects.bulk_create([
+        BatchShard(job=job, run_key=run_key, low=edge,
+                   high=edges[i + 1] if i + 1 < len(edges) else None)
+        for i, edge in enumerate(edges)
+    ], ignore_conflicts=True)
+    return list(BatchShard.objects.filter(job=job, run_key=run_key).order_by('low'))
+
+
+def _result(shard, **extra):
+    return ShardResult(
+        shard.id, shard.low, shard.high, shard.processed, shard.succeeded, shard.deferred,
+        shard.total_amount, **extra,
+    )
+
+
+def parallel_writes_supported():
+    # SQLite locks the whole file for a write, so concurrent shards would just fail on "database is locked"
+    return connections['default'].vendor != 'sqlite'
+
+
+def run_shard(func, shard_id, kwargs):
+    """Run one shard to completion (or failure) in this process. Never raises."""
+    started = time.perf_counter()
+    BatchShard.objects.filter(id=shard_id).update(status='Running', error='', started_at=timezone.now())
+    try:
+        func(BatchShard.objects.get(id=shard_id), **kwargs)
+    except Exception:
+        BatchShard.objects.filter(id=shard_id).update(status='Failed', error=traceback.format_exc())
+        shard = BatchShard.objects.get(id=shard_id)
+        return _result(shard, error=shard.error.strip().splitlines()[-1], elapsed=time.perf_counter() - started)
+
+    BatchShard.objects.filter(id=shard_id).update(status='Completed', finished_at=timezone.now())
+    return _result(BatchShard.objects.get(id=shard_id), elapsed=time.perf_counter() - started)
+
+
+def _run_in_worker(func, shard_id, kwargs):
+    try:
+        return run_shard(func, shard_id, kwargs)
+    finally:
+        connections.close_all()
+
+
+def run_shards(func, shards, workers=1, progress=None, **kwargs):
+    """
+    Run every not-yet-completed shard through func(shard, **kwargs) and merge
+    the results. workers=1 (or SQLite) runs them one after another in this process.
+    `progress`, if given, is called with each ShardResult as it finishes.
+    Don't call this inside a transaction: shards commit chunk by chunk.
+    """
+    pending = [shard.id for shard in shards if shard.status != 'Completed']
+    started = time.perf_counter()
+    results = []
+
+    if workers <= 1 or len(pending) <= 1 or not parallel_writes_supported():
+        for shard_id in pending:
+            results.append(run_shard(func, shard_id, kwargs))
+            if progress:
+                progress(results[-1])
+        return BatchReport(results, time.perf_counter() - started)
+
+    # Workers must open their own connections, never share the parent's
+    connections.close_all()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'banking_system.settings')
+    context = multiprocessing.get_context('spawn')
+    # The initializer is unpickled before the app registry is ready, so it can't live in a bankapp module
+    with ProcessPoolExecutor(min(workers, len(pending)), mp_context=context, initializer=django.setup) as pool:
+        futures = {pool.submit(_run_in_worker, func, shard_id, kwargs): shard_id for shard_id in pending}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:  # a worker died outright (OOM kill, segfault)
+                shard = BatchShard.objects.get(id=futures[future])
+                BatchShard.objects.filter(id=shard.id, status='Running').update(status='Failed', error=repr(e))
+                result = _result(shard, error=f"Worker process died: {e!r}")
+            results.append(result)
+            if progress:
+                progress(result)
+
+    return BatchReport(results, time.perf_counter() - started)
+
+
+def run_totals(job, run_key):
+    """Counters summed over all shards of a run, plus whether every shard completed."""
+    shards = BatchShard.objects.filter(job=job, run_key=run_key)
+    totals = {
+        field: sum(getattr(shard, field) for shard in shards)
+        for field in ('processed', 'succeeded', 'deferred', 'total_amount')
+    }
+    totals['completed'] = bool(shards) and all(shard.status == 'Completed' for shard in shards)
+    return totals
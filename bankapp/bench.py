@@ -0,0 +1,110 @@
+# bankapp/bench.py
+"""Synthetic data helpers shared by the bench_* management commands."""
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.utils import timezone
+from .models import Account, LedgerEntry, Transaction
+
+
+def seed_accounts(count, prefix, tag, account_type='Savings', balance=Decimal('1000.00'), batch_size=5000):
+    """
+    bulk_create `count` users named `<prefix><n>` with one account each and return
+    the account ids. `tag` (two or three letters) keeps account numbers and CNICs
+    of different benchmarks apart. Users get unusable passwords, so seeding
+    doesn't pay for password hashing.
+    """
+    account_ids = []
+    for start in range(0, count, batch_size):
+        names = [f"{prefix}{i}" for i in range(start, min(start + batch_size, count))]
+        User.objects.bulk_create([User(username=name, password='!') for name in names], batch_size=batch_size)
+        user_ids = User.objects.filter(username__in=names).values_list('username', 'id')
+        accounts = [
+            Account(
+                user_id=user_id, account_number=f"{tag}{int(username[len(prefix):]):010d}", account_type=account_type,
+                balance=balance, cnic=f"{tag}-{int(username[len(prefix):]):010d}", date_of_birth='1990-01-01',
+                age=30, address='benchmark', phone_number='0',
+            )
+            for username, user_id in user_ids
+        ]
+        Account.objects.bulk_create(accounts, batch_size=batch_size)
+        account_ids += Account.objects.filter(user_id__in=[uid for _, uid in user_ids]).values_list('id', flat=True)
+    return account_ids
+
+
+@contextmanager
+def explicit_timestamps():
+    """Let seeding code set Transaction.timestamp itself instead of auto_now_add."""
+    field = Transaction._meta.get_field('timestamp')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def seed_transactions(account_id, count, span_days=365 * 3, batch_size=5000):
+    """
+    bulk_create `count` alternating deposits/withdrawals spread evenly over the
+    last `span_days`, oldest first. Returns rows written per second.
+    """
+    now = timezone.now()
+    step = timedelta(days=span_days) / max(count, 1)
+    started = time.perf_counter()
+    with explicit_timestamps():
+        for start in range(0, count, batch_size):
+            Transaction.objects.bulk_create([
+                Transaction(
+                    account_id=account_id,
+                    amount=Decimal('25.00') if i % 2 == 0 else Decimal('-20.00'),
+                    description="Deposit" if i % 2 == 0 else "Withdrawal",
+                    transaction_type="Deposit" if i % 2 == 0 else "Withdrawal",
+                    timestamp=now - step * (count - i),
+                )
+                for i in range(start, min(start + batch_size, count))
+            ], batch_size=batch_size)
+    return count / (time.perf_counter() - started)
+
+
+def cleanup(prefix, batch_size=5000):
+    """Delete every user created by seed_accounts(prefix=...) and everything hanging off them."""
+    # Transactions go first, in slices, so cascading deletes never load millions of rows at once
+    transactions = Transaction.objects.filter(account__user__username__startswith=prefix)
+    while True:
+        ids = list(transactions.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        Transaction.objects.filter(id__in=ids).delete()
+
+    # Whole journals, so the bank-side legs of benchmark postings go too
+    journals = LedgerEntry.objects.filter(account__user__username__startswith=prefix).values_list('journal', flat=True)
+    while True:
+        batch = list(journals.distinct()[:batch_size])
+        if not batch:
+            break
+        LedgerEntry.objects.filter(journal__in=batch).delete()
+
+    while True:
+        ids = list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return
+        User.objects.filter(id__in=ids).delete()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, round(pct / 100 * len(samples)) - 1))
+    return samples[rank]
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
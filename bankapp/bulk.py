@@ -0,0 +1,58 @@
+# bankapp/bulk.py
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+
+class BulkFileError(ValueError):
+    pass
+
+
+def _parse_amount(value):
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    return amount if amount.is_finite() else None
+
+
+def parse_transfer_csv(text):
+    """CSV with a `receiver_account,amount` header row."""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {'receiver_account', 'amount'} <= {f.strip() for f in reader.fieldnames}:
+        raise BulkFileError("CSV must have 'receiver_account' and 'amount' columns.")
+    rows = []
+    for line in reader:
+        line = {k.strip(): v for k, v in line.items() if k}
+        rows.append({
+            'receiver_account': (line.get('receiver_account') or '').strip(),
+            'amount': _parse_amount(line.get('amount')),
+        })
+    return rows
+
+
+def parse_transfer_json(text):
+    """A JSON list of {"receiver_account", "amount"} objects, optionally wrapped in {"transfers": [...]}."""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise BulkFileError(f"Invalid JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get('transfers')
+    if not isinstance(data, list):
+        raise BulkFileError("JSON must be a list of transfers.")
+    rows = []
+    for item in data:
+        item = item if isinstance(item, dict) else {}
+        rows.append({
+            'receiver_account': str(item.get('receiver_account') or '').strip(),
+            'amount': _parse_amount(item.get('amount')),
+        })
+    return rows
+
+
+def parse_transfer_file(text, filename=''):
+    if filename.lower().endswith('.json') or text.lstrip().startswith(('[', '{')):
+        return parse_transfer_json(text)
+    return parse_transfer_csv(text)
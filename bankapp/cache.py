@@ -0,0 +1,178 @@
+# bankapp/cache.py
+"""
+Read-through cache for Account lookups.
+
+Two tiers:
+- a per-request memo (set up by AccountCacheMiddleware) so one request never
+  loads the same account twice;
+- an optional tier on Django's cache framework (locmem by default), enabled by
+  setting ACCOUNT_CACHE_TTL > 0. It only holds lookups that never change (account
+  number -> id, user -> account id), never Account rows: their balances change
+  on every write and a locmem invalidation only reaches the process that wrote.
+
+Accounts are always loaded with their user, so __str__ and templates don't
+trigger extra queries. Facade writes call invalidate_accounts().
+"""
+import threading
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from .models import Account
+
+
+_request_memo = ContextVar('account_request_memo', default=None)
+_stats_lock = threading.Lock()
+_stats = {'request_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _count(key, n=1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+def account_cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_account_cache_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _ttl():
+    return getattr(settings, 'ACCOUNT_CACHE_TTL', 0)
+
+
+def _shared():
+    return caches[getattr(settings, 'ACCOUNT_CACHE_ALIAS', 'default')]
+
+
+def _lookup(key, loader, shared=True):
+    """`shared=False` keeps the value out of the shared tier (anything mutable)."""
+    memo = _request_memo.get()
+    if memo is not None and key in memo:
+        _count('request_hits')
+        return memo[key]
+
+    shared = shared and _ttl() > 0
+    value = None
+    if shared:
+        value = _shared().get(key)
+        if value is not None:
+            _count('shared_hits')
+    if value is None:
+        _count('misses')
+        value = loader()
+        if shared:
+            _shared().set(key, value, _ttl())
+
+    if memo is not None:
+        memo[key] = value
+    return value
+
+
+async def _alookup(key, loader, shared=True):
+    """Async twin of _lookup; `loader` is a coroutine function using the async ORM."""
+    memo = _request_memo.get()
+    if memo is not None and key in memo:
+        _count('request_hits')
+        return memo[key]
+
+    shared = shared and _ttl() > 0
+    value = None
+    if shared:
+        value = await _shared().aget(key)
+        if value is not None:
+            _count('shared_hits')
+    if value is None:
+        _count('misses')
+        value = await loader()
+        if shared:
+            await _shared().aset(key, value, _ttl())
+
+    if memo is not None:
+        memo[key] = value
+    return value
+
+
+def get_account(account_id):
+    """Account by primary key (with its user), memoised per request only. Raises Account.DoesNotExist."""
+    return _lookup(
+        f'account:id:{account_id}',
+        lambda: Account.objects.select_related('user').get(id=account_id),
+        shared=False,
+    )
+
+
+def get_user_account(user):
+    """The logged-in user's account. Raises Account.DoesNotExist like Account.objects.get(user=...)."""
+    account_id = _lookup(
+        f'account:user:{user.pk}',
+        lambda: Account.objects.values_list('id', flat=True).get(user_id=user.pk),
+    )
+    return get_account(account_id)
+
+
+async def aget_account(account_id):
+    return await _alookup(
+        f'account:id:{account_id}',
+        lambda: Account.objects.select_related('user').aget(id=account_id),
+        shared=False,
+    )
+
+
+async def aget_user_account(user):
+    account_id = await _alookup(
+        f'account:user:{user.pk}',
+        lambda: Account.objects.values_list('id', flat=True).aget(user_id=user.pk),
+    )
+    return await aget_account(account_id)
+
+
+def get_account_id_by_number(account_number):
+    """Resolve an account number to its id; account numbers never change, so this caches well."""
+    return _lookup(
+        f'account:number:{account_number}',
+        lambda: Account.objects.values_list('id', flat=True).get(account_number=account_number),
+    )
+
+
+def invalidate_accounts(*account_ids):
+    """Drop the request's memoised Account rows after a write (rows never reach the shared tier)."""
+    if not account_ids:
+        return
+    _count('invalidations', len(account_ids))
+    memo = _request_memo.get()
+    if memo is not None:
+        for account_id in account_ids:
+            memo.pop(f'account:id:{account_id}', None)
+
+
+class AccountCacheMiddleware:
+    """Gives every request its own Account memo and throws it away afterwards."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _request_memo.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _request_memo.reset(token)
+
+    async def __acall__(self, request):
+        token = _request_memo.set({})
+        try:
+            return await self.get_response(request)
+        finally:
+            _request_memo.reset(token)
@@ -0,0 +1,162 @@
+# bankapp/db_pool/__init__.py
+"""
+In-process database connection pool for the MySQL (and, as a local stand-in,
+SQLite) backends. Django only pools PostgreSQL connections natively.
+
+Select it with ENGINE 'bankapp.db_pool.mysql' or 'bankapp.db_pool.sqlite3';
+settings.py does that when DB_POOL_SIZE is set. Pool options live in the
+database's 'POOL' dict (SIZE, MAX_OVERFLOW, RECYCLE, TIMEOUT, PING_AFTER).
+
+Every time Django closes a connection (end of request with CONN_MAX_AGE=0,
+close_old_connections, connections.close_all) the raw connection goes back to
+a per-process pool instead of being torn down, and the next connect() in any
+thread or async task takes it from there. So a process needs as many server
+connections as it has requests in flight, not one per thread that ever ran a
+query. Connections idle for more than PING_AFTER seconds are pinged before
+reuse, and ones older than RECYCLE seconds are replaced.
+"""
+import os
+import threading
+import time
+from collections import deque
+from django.db.utils import OperationalError
+
+
+class ConnectionPool:
+    def __init__(self, size=5, max_overflow=10, recycle=3600, timeout=30, ping_after=10):
+        self.size = size
+        self.recycle = recycle
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._idle = deque()  # (raw connection, opened at, returned at); newest on the right
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size + max_overflow)
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def acquire(self, connect, ping):
+        """
+        Return (raw connection, opened at, reused). `connect()` opens a new one;
+        `ping(raw)` returns False for a dead connection.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(f"No database connection free in the pool after {self.timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    break
+                raw, opened_at, returned_at = entry
+                now = time.monotonic()
+                if now - opened_at > self.recycle or (now - returned_at > self.ping_after and not ping(raw)):
+                    self._discard(raw)
+                    continue
+                self.reused += 1
+                return raw, opened_at, True
+
+            raw = connect()
+            self.opened += 1
+            return raw, time.monotonic(), False
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, raw, opened_at, reusable=True):
+        """Hand a connection back; it's closed instead if it's not reusable or the pool is full."""
+        try:
+            with self._lock:
+                if reusable and len(self._idle) < self.size:
+                    self._idle.append((raw, opened_at, time.monotonic()))
+                    return
+            self._discard(raw)
+        finally:
+            self._slots.release()
+
+    def _discard(self, raw):
+        self.discarded += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        return {'idle': len(self._idle), 'opened': self.opened, 'reused': self.reused, 'discarded': self.discarded}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """The pool for a database alias in this process (a forked worker never reuses its parent's sockets)."""
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = settings_dict.get('POOL') or {}
+            pool = _pools[key] = ConnectionPool(
+                size=options.get('SIZE', 5),
+                max_overflow=options.get('MAX_OVERFLOW', 10),
+                recycle=options.get('RECYCLE', 3600),
+                timeout=options.get('TIMEOUT', 30),
+                ping_after=options.get('PING_AFTER', 10),
+            )
+        return pool
+
+
+def pool_stats():
+    """{alias: stats} for the pools of this process."""
+    pid = os.getpid()
+    return {alias: pool.stats() for (owner, alias), pool in list(_pools.items()) if owner == pid}
+
+
+def _ping(raw):
+    try:
+        cursor = raw.cursor()
+        cursor.execute('SELECT 1')
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class PooledConnectionMixin:
+    """Mixed into a backend's DatabaseWrapper to take and return connections through the pool."""
+
+    _pool_opened_at = None
+    _pool_reused = False
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        raw, self._pool_opened_at, self._pool_reused = self.pool.acquire(
+            lambda: super(PooledConnectionMixin, self).get_new_connection(conn_params), _ping,
+        )
+        return raw
+
+    def init_connection_state(self):
+        # Session settings survive on a pooled connection; only new ones need them
+        if not self._pool_reused:
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Closed mid-transaction (close_all inside atomic): Django keeps a reference, so it can't be shared
+        reusable = not self.in_atomic_block and not self.errors_occurred
+        if reusable and not self.autocommit:
+            try:
+                self.connection.rollback()
+            except Exception:
+                reusable = False
+        self.pool.release(self.connection, self._pool_opened_at, reusable)
@@ -0,0 +1,6 @@
+from django.db.backends.sqlite3 import base
+from bankapp.db_pool import PooledConnectionMixin
+
+
+class DatabaseWrapper(PooledConnectionMixin, base.DatabaseWrapper):
+    pass
@@ -1,6 +1,6 @@
 # bankapp/factories.py
 from decimal import Decimal
-from datetime import datetime
+from django.utils import timezone
 from .models import Loan
 
 class LoanFactory:
@@ -15,5 +15,5 @@ class LoanFactory:
             principal_amount=Decimal(scheme_details["max_amount"]),
             status='Pending',
             balance_remaining=Decimal(scheme_details["max_amount"]),
-            applied_on=datetime.now()
+            applied_on=timezone.now()
         )
@@ -0,0 +1,140 @@
+# bankapp/idempotency.py
+"""
+Exactly-once execution of the money-moving POSTs (deposit, withdraw, transfer,
+mobile recharge).
+
+Each form carries a one-time `idempotency_key`; API clients can send an
+Idempotency-Key header instead. The first request with a key claims it by
+inserting an IdempotencyKey row, then runs the facade and stores its
+(succeeded, message) outcome in the same transaction as the facade's writes.
+A repeat within IDEMPOTENCY_TTL_SECONDS (a retry, a double click, a parallel
+resubmission) hits the unique index on insert and gets the stored outcome
+back without touching any account rows. Requests without a key run as before.
+"""
+import hashlib
+import json
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import IdempotencyKey
+
+
+FORM_FIELD = 'idempotency_key'
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+WAIT_SECONDS = 5  # how long a repeat waits for the first request's outcome
+STALE_AFTER = timedelta(minutes=5)  # a claim this old without an outcome was left by a crashed worker
+IN_PROGRESS = "This request is already being processed."
+
+
+class IdempotencyConflict(ValueError):
+    pass
+
+
+def new_key():
+    """A fresh key for a form about to be rendered."""
+    return uuid.uuid4().hex
+
+
+def request_key(request):
+    key = (request.META.get(HEADER) or request.POST.get(FORM_FIELD) or '').strip()
+    return key[:64] or None
+
+
+def request_fingerprint(scope, request):
+    """Hash of the submitted parameters, so a key can't be replayed for a different amount or payee."""
+    params = sorted((k, v) for k, v in request.POST.items() if k not in ('csrfmiddlewaretoken', FORM_FIELD))
+    return hashlib.sha256(json.dumps([scope, params]).encode()).hexdigest()
+
+
+def _claim(user, scope, key, fingerprint):
+    """Return (record, claimed); claimed is True if this request now owns the key and must run."""
+    now = timezone.now()
+    fields = {
+        'fingerprint': fingerprint, 'succeeded': None, 'message': '', 'created_at': now,
+        'expires_at': now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+    }
+    for _ in range(3):
+        try:
+            # Savepoint, so a clash doesn't poison a surrounding transaction
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user=user, scope=scope, key=key, **fields), True
+        except IntegrityError:
+            pass
+        try:
+            record = IdempotencyKey.objects.get(user=user, scope=scope, key=key)
+        except IdempotencyKey.DoesNotExist:  # purged in between; insert again
+            continue
+
+        # Expired, or abandoned mid-run: take it over, unless a parallel request already did
+        reclaimable = Q(expires_at__lte=now) | Q(succeeded__isnull=True, created_at__lte=now - STALE_AFTER)
+        if IdempotencyKey.objects.filter(reclaimable, id=record.id).update(**fields):
+            for name, value in fields.items():
+                setattr(record, name, value)
+            return record, True
+        return record, False
+    raise IntegrityError(f"Could not claim idempotency key {key}")
+
+
+def _wait(record, deadline):
+    """The first request's outcome, or None if it failed and dropped the claim."""
+    while record.succeeded is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            record.refresh_from_db(fields=['succeeded', 'message'])
+        except IdempotencyKey.DoesNotExist:
+            return None
+    if record.succeeded is None:
+        return False, IN_PROGRESS
+    return record.succeeded, record.message
+
+
+def run_once(request, scope, func):
+    """
+    Call func() -> (succeeded, message) at most once per idempotency key of the
+    request and return its outcome; repeats get the stored outcome instead.
+    Raises IdempotencyConflict if the key was used for different parameters.
+    If func raises, the claim is dropped so the client can retry; repeats that
+    were waiting on it claim the key again and one of them runs func itself.
+    """
+    key = request_key(request)
+    if key is None:
+        return func()
+
+    fingerprint = request_fingerprint(scope, request)
+    deadline = time.monotonic() + WAIT_SECONDS
+    while True:
+        record, claimed = _claim(request.user, scope, key, fingerprint)
+        if claimed:
+            break
+        if record.fingerprint != fingerprint:
+            raise IdempotencyConflict("This request was already submitted with different details.")
+        outcome = _wait(record, deadline)
+        if outcome is not None:
+            return outcome
+        if time.monotonic() >= deadline:
+            return False, IN_PROGRESS
+
+    try:
+        with transaction.atomic():
+            succeeded, message = func()
+            IdempotencyKey.objects.filter(id=record.id).update(succeeded=succeeded, message=message[:255])
+    except BaseException:
+        IdempotencyKey.objects.filter(id=record.id, succeeded__isnull=True).delete()
+        raise
+    return succeeded, message
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired keys in batches; returns how many were removed."""
+    removed = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return removed
+        removed += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,109 @@
+# bankapp/interest.py
+from django.db import transaction
+from django.utils import timezone
+from .aggregates import month_start
+from .cache import invalidate_accounts
+from .batch import BatchReport, plan_shards, run_shards, run_totals, shard_filter
+from .models import Account, BatchShard, InterestRun, Transaction
+from .posting import post_transactions
+from .services import INTEREST_STRATEGIES
+
+
+INTEREST_DESCRIPTION = "Monthly Interest Credit (5%)"
+
+
+def interest_run_key(period, account_type):
+    """BatchShard run key of one accrual; each account type is accrued as its own run."""
+    return f"{period.isoformat()}:{account_type}"
+
+
+def accrue_interest_shard(shard, period, account_type, chunk_size=1000, scope=None):
+    """
+    Credit interest to the accounts in one shard's id range, chunk_size at a
+    time. Each chunk locks the shard row and its accounts, computes interest for
+    the whole chunk through the InterestStrategy, bulk-updates balances, posts the
+    interest transactions and advances the shard checkpoint in one transaction.
+    """
+    strategy = INTEREST_STRATEGIES[account_type]
+    base = Account.objects.all()
+    if scope is not None:
+        base.query = scope
+    base = base.filter(shard_filter(shard), account_type=account_type)
+
+    while True:
+        with transaction.atomic():
+            shard = BatchShard.objects.select_for_update().get(id=shard.id)
+            chunk = list(
+                base.select_for_update()
+                .filter(id__gt=shard.last_id)
+                .order_by('id')
+                .only('id', 'balance', 'account_type')[:chunk_size]
+            )
+            if not chunk:
+                return
+
+            interest = strategy.calculate_many([account.balance for account in chunk])
+            credited, txns = [], []
+            for account, amount in zip(chunk, interest):
+                if amount <= 0:
+                    continue
+                account.balance += amount
+                credited.append(account)
+                txns.append(Transaction(
+                    account=account, amount=amount,
+                    description=INTEREST_DESCRIPTION, transaction_type='Deposit',
+                ))
+
+            Account.objects.bulk_update(credited, ['balance'], batch_size=chunk_size)
+            invalidate_accounts(*[account.id for account in credited])
+            post_transactions(txns, contra_book='Interest')
+
+            shard.last_id = chunk[-1].id
+            shard.processed += len(chunk)
+            shard.succeeded += len(credited)
+            shard.total_amount += sum(txn.amount for txn in txns)
+            shard.save(update_fields=['last_id', 'processed', 'succeeded', 'total_amount'])
+
+
+def accrue_interest(period=None, account_type='Savings', chunk_size=1000, progress=None, accounts=None,
+                    workers=1, shards=None):
+    """
+    Month-end interest for every account of `account_type`; each type is a
+    separate run with its own InterestRun and shards.
+
+    The accounts are split into id-range shards (`shards`, default 4 per worker,
+    or 1 when running in-process) that run in `workers` processes; see
+    bankapp/batch.py. Every chunk commits together with its shard checkpoint, so
+    re-running a period resumes where each shard stopped, and a completed period
+    is a no-op. `accounts` optionally narrows the Account queryset (used by the
+    benchmark). `progress` is called with each finished ShardResult.
+    The InterestRun is returned with the merged BatchReport as `.report`.
+    """
+    period = month_start(period or timezone.now())
+    run, _ = InterestRun.objects.get_or_create(period=period, account_type=account_type)
+    run_key = interest_run_key(period, account_type)
+    report = BatchReport([], 0.0)
+    if run.status != 'Completed':
+        base = Account.objects.all() if accounts is None else accounts
+        plan = plan_shards(
+            'accrue_interest', run_key, base.filter(account_type=account_type),
+            shards or (workers * 4 if workers > 1 else 1),
+        )
+        report = run_shards(
+            accrue_interest_shard, plan, workers, progress,
+            period=period, account_type=account_type, chunk_size=chunk_size,
+            scope=None if accounts is None else accounts.query,
+        )
+
+        totals = run_totals('accrue_interest', run_key)
+        run.accounts_processed = totals['succeeded']
+        run.total_interest = totals['total_amount']
+        fields = ['accounts_processed', 'total_interest']
+        if totals['completed']:
+            run.status = 'Completed'
+            run.finished_at = timezone.now()
+            fields += ['status', 'finished_at']
+        run.save(update_fields=fields)
+
+    run.report = report
+    return run
@@ -0,0 +1,340 @@
+# bankapp/ledger.py
+"""
+Append-only double-entry ledger next to Account.balance.
+
+Every facade write books one journal: a customer leg per Transaction plus, when
+the customer legs don't already cancel out (transfers do), one balancing leg on
+a bank book. BalanceSnapshot rows are taken periodically, so "balance as of T"
+is the nearest snapshot plus a scan of the entries after it.
+
+balance_series() turns the same data into end-of-day or end-of-month balances
+for charts: balance_as_of at the start of the range plus one running-sum window
+query over the range's entries, cached per account until record_ledger() books
+the next journal.
+"""
+import uuid
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Min, Q, Sum, Window
+from django.db.models.functions import RowNumber, Trunc
+from django.utils import timezone
+from .models import Account, BalanceSnapshot, LedgerEntry, Transaction
+
+
+# Snapshots stop this far behind "now" so transactions still in flight can't be missed
+SNAPSHOT_LAG = timedelta(minutes=5)
+
+
+def ledger_entries(txns, contra_book='Cash', journal=None):
+    """Unsaved legs for one journal over already-inserted Transaction objects."""
+    journal = journal or uuid.uuid4()
+    legs = [
+        LedgerEntry(
+            journal=journal, book='Customer', account_id=txn.account_id, transaction_id=txn.id,
+            amount=txn.amount, created_at=txn.timestamp,
+        )
+        for txn in txns
+    ]
+    net = sum((txn.amount for txn in txns), Decimal('0.00'))
+    if net:
+        legs.append(LedgerEntry(
+            journal=journal, book=contra_book, amount=-net, created_at=max(txn.timestamp for txn in txns),
+        ))
+    return legs
+
+
+def record_ledger(txns, contra_book='Cash', batch_size=1000):
+    """Book `txns` as one balanced journal. Call in the same atomic block that posted them."""
+    if txns:
+        LedgerEntry.objects.bulk_create(ledger_entries(txns, contra_book), batch_size=batch_size)
+        invalidate_balance_series(*{txn.account_id for txn in txns})
+
+
+def _delta(account, after, until):
+    entries = LedgerEntry.objects.filter(account=account, created_at__lte=until)
+    if after is not None:
+        entries = entries.filter(created_at__gt=after)
+    return entries
+
+
+def balance_as_of(account, when):
+    """Ledger balance of `account` including everything booked at or before `when`."""
+    snapshot = (
+        BalanceSnapshot.objects.filter(account=account, as_of__lte=when)
+        .order_by('-as_of').values_list('as_of', 'balance').first()
+    )
+    after, balance = snapshot or (None, Decimal('0.00'))
+    delta = _delta(account, after, when).aggregate(total=Sum('amount'))['total']
+    return balance + (delta or Decimal('0.00'))
+
+
+def _series(account, moments):
+    snapshot = (
+        BalanceSnapshot.objects.filter(account=account, as_of__lte=moments[0])
+        .order_by('-as_of').values_list('as_of', 'balance')
+    )
+    sums = {f'm{i}': Sum('amount', filter=Q(created_at__lte=moment)) for i, moment in enumerate(moments)}
+    return snapshot, sums
+
+
+def _combine(moments, snapshot, totals):
+    balance = snapshot[1] if snapshot else Decimal('0.00')
+    return {moment: balance + (totals[f'm{i}'] or Decimal('0.00')) for i, moment in enumerate(moments)}
+
+
+def balances_as_of(account, moments):
+    """
+    balance_as_of for several moments in two queries: the snapshot before the
+    earliest one, then one conditional SUM per moment over the entries after it.
+    """
+    moments = sorted(moments)
+    if not moments:
+        return {}
+    snapshot_query, sums = _series(account, moments)
+    snapshot = snapshot_query.first()
+    totals = _delta(account, snapshot and snapshot[0], moments[-1]).aggregate(**sums)
+    return _combine(moments, snapshot, totals)
+
+
+async def abalances_as_of(account, moments):
+    moments = sorted(moments)
+    if not moments:
+        return {}
+    snapshot_query, sums = _series(account, moments)
+    snapshot = await snapshot_query.afirst()
+    totals = await _delta(account, snapshot and snapshot[0], moments[-1]).aaggregate(**sums)
+    return _combine(moments, snapshot, totals)
+
+
+def month_end_moments(months, now=None):
+    """Map first-of-month dates to the last instant of that month (or now, for the current one)."""
+    now = now or timezone.now()
+    moments = {}
+    for month in months:
+        next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        end = timezone.make_aware(datetime.combine(next_month, time.min)) - timedelta(microseconds=1)
+        moments[month] = min(end, now)
+    return moments
+
+
+SERIES_GRANULARITIES = ('day', 'month')
+
+
+def _bucket_start(day, granularity):
+    return day.replace(day=1) if granularity == 'month' else day
+
+
+def _next_bucket(day, granularity):
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def _series_bounds(start, end, granularity):
+    if granularity not in SERIES_GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+    first = _bucket_start(start, granularity)
+    last = _bucket_start(end or timezone.localdate(), granularity)
+    return first, last, timezone.make_aware(datetime.combine(first, time.min)), timezone.make_aware(
+        datetime.combine(_next_bucket(last, granularity), time.min)
+    )
+
+
+def _series_rows(account, first_at, until, granularity):
+    """Running sum of the range's entries at the last entry of each bucket, one row per bucket with entries."""
+    entries = LedgerEntry.objects.filter(account=account, created_at__gte=first_at, created_at__lt=until)
+    return entries.annotate(
+        bucket=Trunc('created_at', granularity),
+        running=Window(Sum('amount'), order_by=[F('created_at').asc(), F('id').asc()]),
+        last_in_bucket=Window(
+            RowNumber(), partition_by=[F('bucket')], order_by=[F('created_at').desc(), F('id').desc()],
+        ),
+    ).filter(last_in_bucket=1).values_list('bucket', 'running').order_by('bucket')
+
+
+def _fill_series(first, last, granularity, base, rows):
+    """Every bucket from first to last with its closing balance; empty buckets carry the previous one."""
+    closing = {timezone.localtime(bucket).date(): running for bucket, running in rows}
+    series, balance, day = [], base, first
+    while day <= last:
+        if day in closing:
+            balance = base + closing[day]
+        series.append((day, balance))
+        day = _next_bucket(day, granularity)
+    return series
+
+
+def _series_key(account, first, last, granularity):
+    # The version key is dropped on every journal, in this process (and everywhere, on a shared cache).
+    # Writes land in the current bucket, whose closing balance is account.balance, so keying on
+    # the balance too keeps other processes' locmem caches from serving a series older than a write.
+    version = cache.get_or_set(f'balance_series:version:{account.id}', uuid.uuid4().hex, None)
+    return f'balance_series:{account.id}:{version}:{account.balance}:{granularity}:{first}:{last}'
+
+
+def balance_series(account, start, end=None, granularity='day'):
+    """
+    Closing ledger balance of `account` for every day (or month) from the one
+    containing the date `start` to the one containing `end` (default today), as
+    [(first day of the bucket, balance)]. The opening balance comes from
+    balance_as_of (nearest snapshot plus the entries since), then one window
+    query over the range keeps the running sum at the last entry of each
+    bucket. Cached until the account's next journal.
+    """
+    first, last, first_at, until = _series_bounds(start, end, granularity)
+    key = _series_key(account, first, last, granularity)
+    series = cache.get(key)
+    if series is None:
+        opening = balance_as_of(account, first_at - timedelta(microseconds=1))
+        series = _fill_series(first, last, granularity, opening, _series_rows(account, first_at, until, granularity))
+        cache.set(key, series, settings.BALANCE_SERIES_CACHE_TTL)
+    return series
+
+
+async def abalance_series(account, start, end=None, granularity='day'):
+    first, last, first_at, until = _series_bounds(start, end, granularity)
+    key = _series_key(account, first, last, granularity)
+    series = await cache.aget(key)
+    if series is None:
+        before = first_at - timedelta(microseconds=1)
+        opening = (await abalances_as_of(account, [before]))[before]
+        rows = [row async for row in _series_rows(account, first_at, until, granularity)]
+        series = _fill_series(first, last, granularity, opening, rows)
+        await cache.aset(key, series, settings.BALANCE_SERIES_CACHE_TTL)
+    return series
+
+
+def invalidate_balance_series(*account_ids):
+    """
+    Forget the cached series of these accounts: their version key goes, so every
+    cached range of theirs stops matching. Done now and again on commit, like
+    invalidate_accounts.
+    """
+    keys = [f'balance_series:version:{account_id}' for account_id in account_ids if account_id is not None]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def take_snapshots(as_of=None, accounts=None, chunk_size=1000):
+    """
+    Snapshot every account's ledger balance at `as_of` (default: now minus
+    SNAPSHOT_LAG). Each account starts from its previous snapshot, so a run only
+    reads the entries booked since the last one. Returns snapshots written.
+    """
+    as_of = as_of or timezone.now() - SNAPSHOT_LAG
+    base = Account.objects.all() if accounts is None else accounts
+    written, last_id = 0, 0
+    while True:
+        ids = list(base.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return written
+        last_id = ids[-1]
+
+        # Previous snapshot per account; runs share one as_of, so this is a handful of values
+        latest = dict(
+            BalanceSnapshot.objects.filter(account_id__in=ids, as_of__lt=as_of)
+            .values('account_id').annotate(last=Max('as_of')).values_list('account_id', 'last')
+        )
+        previous = {
+            (account_id, snap_at): balance
+            for account_id, snap_at, balance in BalanceSnapshot.objects.filter(
+                account_id__in=ids, as_of__in=set(latest.values())
+            ).values_list('account_id', 'as_of', 'balance')
+        }
+        by_start = defaultdict(list)
+        for account_id in ids:
+            by_start[latest.get(account_id)].append(account_id)
+
+        snapshots = []
+        for after, account_ids in by_start.items():
+            entries = LedgerEntry.objects.filter(account_id__in=account_ids, created_at__lte=as_of)
+            if after is not None:
+                entries = entries.filter(created_at__gt=after)
+            deltas = dict(entries.values('account_id').annotate(total=Sum('amount')).values_list('account_id', 'total').order_by())
+            for account_id in account_ids:
+                balance = previous.get((account_id, after), Decimal('0.00')) + (deltas.get(account_id) or Decimal('0.00'))
+                snapshots.append(BalanceSnapshot(account_id=account_id, as_of=as_of, balance=balance))
+        BalanceSnapshot.objects.bulk_create(snapshots, batch_size=chunk_size, ignore_conflicts=True)
+        written += len(snapshots)
+
+
+def backfill_ledger(accounts=None, batch_size=5000):
+    """
+    Book history that predates the ledger. For each account, every Transaction
+    without a customer leg gets one, and the first run also books an opening leg
+    (the part of Account.balance no transaction explains) balanced against the
+    'Opening' book. Safe to re-run; each account is locked while it is booked.
+    Returns the number of legs written.
+    """
+    base = Account.objects.all() if accounts is None else accounts
+    written = 0
+    for account_id in base.order_by('id').values_list('id', flat=True).iterator():
+        with transaction.atomic():
+            account = Account.objects.select_for_update().get(id=account_id)
+            booked = LedgerEntry.objects.filter(account=account)
+            unbooked = Transaction.objects.filter(account=account).exclude(
+                id__in=booked.filter(transaction__isnull=False).values('transaction_id')
+            )
+            journal = uuid.uuid4()
+            legs, net = [], Decimal('0.00')
+
+            if not booked.filter(transaction__isnull=True).exists():
+                known = (booked.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')) + (
+                    unbooked.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+                )
+                first = Transaction.objects.filter(account=account).aggregate(first=Min('timestamp'))['first']
+                opening = account.balance - known
+                # Always written, even when zero: it marks the account as opened
+                legs.append(LedgerEntry(
+                    journal=journal, book='Customer', account=account, amount=opening,
+                    created_at=first or timezone.now(),
+                ))
+                net += opening
+
+            rows = unbooked.order_by('timestamp', 'id').values_list('id', 'amount', 'timestamp')
+            for pk, amount, timestamp in rows.iterator(chunk_size=batch_size):
+                legs.append(LedgerEntry(
+                    journal=journal, book='Customer', account=account, transaction_id=pk,
+                    amount=amount, created_at=timestamp,
+                ))
+                net += amount
+                if len(legs) >= batch_size:
+                    LedgerEntry.objects.bulk_create(legs, batch_size=batch_size)
+                    written += len(legs)
+                    legs = []
+            if net:
+                legs.append(LedgerEntry(journal=journal, book='Opening', amount=-net, created_at=timezone.now()))
+            LedgerEntry.objects.bulk_create(legs, batch_size=batch_size)
+            written += len(legs)
+            invalidate_balance_series(account_id)
+    return written
+
+
+def reconcile_range(low, high):
+    """
+    Compare Account.balance with the ledger for accounts with low <= id < high.
+    Returns [(account_id, account_number, balance, ledger_balance)] for mismatches.
+    """
+    accounts = Account.objects.filter(id__gte=low, id__lt=high)
+    ledger = dict(
+        LedgerEntry.objects.filter(account_id__gte=low, account_id__lt=high)
+        .values('account_id').annotate(total=Sum('amount')).values_list('account_id', 'total').order_by()
+    )
+    return [
+        (account_id, number, balance, ledger.get(account_id) or Decimal('0.00'))
+        for account_id, number, balance in accounts.values_list('id', 'account_number', 'balance').order_by('id')
+        if balance != (ledger.get(account_id) or Decimal('0.00'))
+    ]
+
+
+def unbalanced_journals(limit=100):
+    """Journals whose legs don't sum to zero (should always be empty)."""
+    return list(
+        LedgerEntry.objects.values('journal').annotate(total=Sum('amount')).exclude(total=0)
+        .values_list('journal', 'total').order_by()[:limit]
+    )
@@ -0,0 +1,39 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from bankapp.interest import accrue_interest
+from bankapp.services import INTEREST_STRATEGIES
+
+
+class Command(BaseCommand):
+    help = "Credit month-end interest to all accounts of one type (idempotent per period and type, resumable)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', help="Accrual month as YYYY-MM (defaults to the current month).")
+        parser.add_argument('--account-type', default='Savings', choices=sorted(INTEREST_STRATEGIES))
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes, each taking account id ranges.")
+        parser.add_argument('--shards', type=int, help="Id ranges to split a new run into (default 4 per worker).")
+
+    def handle(self, *args, **options):
+        period = None
+        if options['period']:
+            try:
+                period = datetime.strptime(options['period'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("--period must look like 2026-01")
+
+        def progress(result):
+            status = self.style.ERROR(f"failed: {result.error}") if result.error else "done"
+            self.stdout.write(
+                f"  accounts {result.label}: {result.succeeded} credited, ${result.total_amount} "
+                f"in {result.elapsed:.2f}s, {status}"
+            )
+
+        run = accrue_interest(
+            period, account_type=options['account_type'], chunk_size=options['chunk_size'], progress=progress,
+            workers=options['workers'], shards=options['shards'],
+        )
+        summary = f"{run.account_type} {run.period:%b %Y}: {run.accounts_processed} accounts credited, ${run.total_interest} total interest."
+        if run.report.errors:
+            raise CommandError(f"{summary} {len(run.report.errors)} shard(s) failed; re-run to resume them.")
+        self.stdout.write(self.style.SUCCESS(summary))
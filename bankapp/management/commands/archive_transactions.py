@@ -0,0 +1,45 @@
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bankapp.archive import archive_transactions
+
+
+class Command(BaseCommand):
+    help = (
+        "Move transactions older than ARCHIVE_AFTER_DAYS (whole months) to gzip'd JSON-lines files "
+        "under ARCHIVE_DIR (resumable; a no-op once the cutoff month is done). Run it nightly or monthly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="Archive months before this one, as YYYY-MM (default: the archive horizon).")
+        parser.add_argument('--chunk-size', type=int, default=200, help="Accounts per file set and transaction.")
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes, each taking account id ranges.")
+        parser.add_argument('--shards', type=int, help="Id ranges to split a new run into (default 4 per worker).")
+
+    def handle(self, *args, **options):
+        before = None
+        if options['before']:
+            try:
+                before = timezone.make_aware(datetime.strptime(options['before'], '%Y-%m'))
+            except ValueError:
+                raise CommandError("--before must look like 2026-01")
+
+        def progress(result):
+            status = self.style.ERROR(f"failed: {result.error}") if result.error else "done"
+            self.stdout.write(
+                f"  accounts {result.label}: {result.succeeded} transactions archived "
+                f"in {result.elapsed:.2f}s, {status}"
+            )
+
+        totals, report = archive_transactions(
+            before, chunk_size=options['chunk_size'], progress=progress,
+            workers=options['workers'], shards=options['shards'],
+        )
+        summary = (
+            f"{totals['succeeded']} transactions of {totals['processed']} accounts archived "
+            f"to {settings.ARCHIVE_DIR} in {report.elapsed:.2f}s."
+        )
+        if report.errors:
+            raise CommandError(f"{summary} {len(report.errors)} shard(s) failed; re-run to resume them.")
+        self.stdout.write(self.style.SUCCESS(summary))
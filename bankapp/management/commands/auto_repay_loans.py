@@ -0,0 +1,52 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bankapp.models import LoanRepaymentRun
+from bankapp.services import LoanFacade
+
+
+class Command(BaseCommand):
+    help = "Collect the loan installments due by the run date in resumable chunks and report throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Run date as YYYY-MM-DD (defaults to today); re-using a date resumes that run.")
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes, each taking account id ranges.")
+        parser.add_argument('--shards', type=int, help="Account id ranges to split a new run into (default 4 per worker).")
+
+    def handle(self, *args, **options):
+        run_date = None
+        if options['date']:
+            try:
+                run_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--date must look like 2026-01-31")
+
+        # Installments already handled by an earlier, interrupted invocation don't count towards throughput
+        already_processed = LoanRepaymentRun.objects.filter(
+            run_date=run_date or timezone.localdate()
+        ).values_list('loans_processed', flat=True).first() or 0
+        started = time.perf_counter()
+
+        def progress(result):
+            status = self.style.ERROR(f"failed: {result.error}") if result.error else "done"
+            self.stdout.write(
+                f"  accounts {result.label}: {result.processed} processed "
+                f"({result.succeeded} paid, {result.deferred} left due) in {result.elapsed:.2f}s, {status}"
+            )
+
+        run = LoanFacade.auto_repay_loans(
+            run_date, chunk_size=options['chunk_size'], progress=progress,
+            workers=options['workers'], shards=options['shards'],
+        )
+        elapsed = time.perf_counter() - started
+        done = run.loans_processed - already_processed
+        summary = (
+            f"{run.run_date}: {run.loans_processed} installments processed, {run.loans_repaid} paid "
+            f"(${run.total_collected}), {run.loans_pending} left due, in {elapsed:.2f}s "
+            f"({done / elapsed if elapsed else 0:,.0f} installments/s)."
+        )
+        if run.report.errors:
+            raise CommandError(f"{summary} {len(run.report.errors)} shard(s) failed; re-run to resume them.")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from bankapp.ledger import backfill_ledger
+from bankapp.models import Account
+
+
+class Command(BaseCommand):
+    help = "Book pre-ledger transactions and opening balances into the ledger (safe to re-run)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account', action='append', dest='accounts', metavar='ACCOUNT_NUMBER',
+            help="Only backfill the given account number (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        accounts = None
+        if options['accounts']:
+            accounts = Account.objects.filter(account_number__in=options['accounts'])
+
+        written = backfill_ledger(accounts)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} ledger entries."))
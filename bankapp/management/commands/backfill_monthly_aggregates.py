@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from bankapp.aggregates import rebuild_aggregates
+from bankapp.models import Account
+
+
+class Command(BaseCommand):
+    help = "Rebuild the MonthlyAggregate rollup table from existing transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account', action='append', dest='accounts', metavar='ACCOUNT_NUMBER',
+            help="Only rebuild the given account number (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        accounts = None
+        if options['accounts']:
+            accounts = Account.objects.filter(account_number__in=options['accounts'])
+
+        written = rebuild_aggregates(accounts)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} monthly aggregate rows."))
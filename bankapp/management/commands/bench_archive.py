@@ -0,0 +1,132 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+from bankapp import archive
+from bankapp.aggregates import rebuild_aggregates
+from bankapp.archive import archive_horizon, archive_transactions, archived_transaction, paginate_history
+from bankapp.bench import Timer, cleanup, seed_accounts, seed_transactions
+from bankapp.models import Account, ArchiveSegment, BatchShard, Transaction
+from bankapp.pagination import date_range_bounds
+from bankapp.search import search_transactions
+from bankapp.statements import statement_rows
+
+PREFIX = 'bench_archive_'
+RUN_KEY = 'bench_archive'
+
+
+class Command(BaseCommand):
+    help = (
+        "Median latency of the history, dashboard and statement reads before and after archiving "
+        "the transactions older than ARCHIVE_AFTER_DAYS, plus the reads that now go to the archive "
+        "files. Archive files go to a temporary directory that is removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=200)
+        parser.add_argument('--transactions', type=int, default=1000, help="Per account, over the last three years.")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--workers', type=int, default=1)
+
+    def handle(self, *args, **options):
+        archive_dir = tempfile.mkdtemp(prefix='bench_archive_')
+        cleanup(PREFIX)
+        BatchShard.objects.filter(job='archive_transactions', run_key=RUN_KEY).delete()
+        try:
+            with override_settings(ARCHIVE_DIR=archive_dir):
+                self.run(options, archive_dir)
+        finally:
+            cleanup(PREFIX)
+            BatchShard.objects.filter(job='archive_transactions', run_key=RUN_KEY).delete()
+            shutil.rmtree(archive_dir, ignore_errors=True)
+
+    def run(self, options, archive_dir):
+        with Timer() as seeding:
+            account_ids = seed_accounts(options['accounts'], PREFIX, 'AR')
+            for account_id in account_ids:
+                seed_transactions(account_id, options['transactions'])
+        seeded = Account.objects.filter(user__username__startswith=PREFIX)
+        total = Transaction.objects.count()
+        self.stdout.write(
+            f"seeded {len(account_ids) * options['transactions']:,} transactions over {len(account_ids)} accounts "
+            f"in {seeding.elapsed:.1f}s ({total:,} rows in the table)"
+        )
+
+        account = Account.objects.get(id=account_ids[len(account_ids) // 2])
+        mine = Transaction.objects.filter(account=account)
+        now = timezone.now()
+        recent = {'start_date': (now - timedelta(days=30)).date().isoformat()}
+        old = {
+            'start_date': (now - timedelta(days=365 * 2 + 30)).date().isoformat(),
+            'end_date': (now - timedelta(days=365 * 2)).date().isoformat(),
+        }
+        oldest_id = mine.order_by('timestamp', 'id').values_list('id', flat=True).first()
+
+        def history(params=None):
+            queryset = search_transactions(mine, params, account) if params else mine
+            return lambda: len(paginate_history(queryset, account, params=params))
+
+        def statement(params):
+            start, end = date_range_bounds(params.get('start_date'), params.get('end_date'))
+            return lambda: sum(1 for _ in statement_rows(account, start, end))
+
+        hot = [
+            ("history, first page", history()),
+            ("history, type=Deposit", history({'type': 'Deposit'})),
+            ("dashboard, last 10", lambda: len(paginate_history(mine, account, page_size=10))),
+            ("statement, last 30 days", statement(recent)),
+            # Scans every row of the seeded accounts, so it shrinks with the table
+            ("rollup rebuild, seeded accounts", lambda: rebuild_aggregates(seeded)),
+        ]
+        cold = [
+            ("history, a month two years ago", history(old)),
+            ("statement, a month two years ago", statement(old)),
+            ("receipt of the oldest transaction", lambda: int(
+                mine.filter(id=oldest_id).exists() or archived_transaction(account, oldest_id) is not None
+            )),
+        ]
+
+        self.stdout.write("before archiving:")
+        baseline = {label: self.measure(label, build, options['repeat']) for label, build in hot + cold}
+
+        horizon = archive_horizon()
+        with Timer() as archiving:
+            totals, report = archive_transactions(
+                horizon, workers=options['workers'], accounts=seeded, run_key=RUN_KEY,
+            )
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(archive_dir) for name in names)
+        self.stdout.write(
+            f"archived {totals['succeeded']:,} transactions older than {horizon:%Y-%m-%d} in {archiving.elapsed:.1f}s "
+            f"({totals['succeeded'] / archiving.elapsed:,.0f} rows/s), "
+            f"{ArchiveSegment.objects.filter(account__in=seeded).count():,} segments, {size / 1e6:.1f} MB on disk "
+            f"({size / max(totals['succeeded'], 1):.0f} bytes/row); {Transaction.objects.count():,} rows left in the table"
+        )
+        if report.errors:
+            self.stdout.write(self.style.ERROR(f"{len(report.errors)} shard(s) failed: {report.errors[0].error}"))
+
+        self.stdout.write("after archiving (cold: every read decompresses its segments again):")
+        for label, build in hot + cold:
+            self.measure(label, build, options['repeat'], baseline[label], cold=(label, build) in cold)
+        self.stdout.write("after archiving, segments cached:")
+        for label, build in cold:
+            self.measure(label, build, options['repeat'], baseline[label])
+
+    def measure(self, label, build, repeat, baseline=None, cold=False):
+        timings = []
+        for _ in range(repeat):
+            if cold:
+                archive._load.cache_clear()
+            started = time.perf_counter()
+            result = build()
+            timings.append((time.perf_counter() - started) * 1000)
+        median = statistics.median(timings)
+        line = f"  {label:<36} {median:8.2f} ms  ({result} rows)"
+        if baseline is not None:
+            line += f"  was {baseline:.2f} ms"
+        self.stdout.write(line)
+        return median
@@ -0,0 +1,79 @@
+import statistics
+import time
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bankapp.bench import Timer, cleanup, seed_accounts, seed_transactions
+from bankapp.ledger import _next_bucket, backfill_ledger, balance_series, balances_as_of, invalidate_balance_series
+from bankapp.models import Account
+
+PREFIX = 'bench_series_'
+
+
+def bucket_closes(start, end, granularity):
+    """Last instant of every bucket from start to end, for the per-moment SUM the series replaces."""
+    moments, day = [], start
+    while day <= end:
+        nxt = _next_bucket(day, granularity)
+        moments.append(timezone.make_aware(datetime.combine(nxt, datetime.min.time())) - timedelta(microseconds=1))
+        day = nxt
+    return moments
+
+
+class Command(BaseCommand):
+    help = (
+        "Median latency of balance-trend series (6 months to 10 years, daily and monthly) from "
+        "the window query, cold and cached, next to one conditional SUM per bucket."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=20000, help="On one account, over ten years.")
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        cleanup(PREFIX)
+        try:
+            with Timer() as seeding:
+                account_ids = seed_accounts(1, PREFIX, 'BS')
+                seed_transactions(account_ids[0], options['transactions'], span_days=365 * 10)
+                backfill_ledger(Account.objects.filter(id__in=account_ids))
+            self.stdout.write(f"seeded {options['transactions']:,} ledger entries over ten years in {seeding.elapsed:.1f}s")
+            account = Account.objects.get(id=account_ids[0])
+            today = timezone.localdate()
+
+            ranges = [
+                ("6 months, monthly", today.replace(day=1) - timedelta(days=150), 'month'),
+                ("1 year, daily", today - timedelta(days=364), 'day'),
+                ("5 years, monthly", today - timedelta(days=365 * 5), 'month'),
+                ("10 years, monthly", today - timedelta(days=365 * 10), 'month'),
+                ("10 years, daily", today - timedelta(days=365 * 10), 'day'),
+            ]
+            for label, start, granularity in ranges:
+                series = balance_series(account, start, granularity=granularity)
+                moments = bucket_closes(series[0][0], series[-1][0], granularity)
+
+                def cold():
+                    invalidate_balance_series(account.id)
+                    return balance_series(account, start, granularity=granularity)
+
+                def per_bucket():
+                    # SQLite returns at most 2000 columns, so long daily ranges take several queries
+                    return [balances_as_of(account, moments[i:i + 500]) for i in range(0, len(moments), 500)]
+
+                old = self.measure(per_bucket, options['repeat'])
+                fresh = self.measure(cold, options['repeat'])
+                cached = self.measure(lambda: balance_series(account, start, granularity=granularity), options['repeat'])
+                self.stdout.write(
+                    f"  {label:<20} {len(series):5} points  SUM per bucket {old:8.2f} ms  "
+                    f"window query {fresh:8.2f} ms  cached {cached:6.3f} ms"
+                )
+        finally:
+            cleanup(PREFIX)
+
+    def measure(self, build, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            build()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,89 @@
+import os
+from datetime import date
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from bankapp.amortization import add_months, schedule_installments
+from bankapp.bench import Timer, cleanup, seed_accounts
+from bankapp.interest import accrue_interest, interest_run_key
+from bankapp.models import Account, BatchShard, InterestRun, Loan, LoanInstallment, LoanRepaymentRun
+from bankapp.services import REPAYMENT_JOB, LoanFacade
+
+PREFIX = 'bench_batch_'
+
+
+def bench_date(workers):
+    # Far in the past so the benchmark never collides with a real run
+    return date(1970 + workers, 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time interest accrual and loan auto-repayment on the sharded batch runner with 1..N "
+        "worker processes over the same synthetic accounts. Run it against MySQL for "
+        "meaningful numbers: SQLite serialises writers, so it can't scale past one worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=50000)
+        parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 4)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        counts = sorted({1, *[w for w in (2, 4, 8, 16, 32) if w < options['max_workers']], options['max_workers']})
+        self.reset(counts)
+        try:
+            with Timer() as seeding:
+                account_ids = seed_accounts(options['accounts'], PREFIX, 'BB')
+                Loan.objects.bulk_create([
+                    Loan(account_id=account_id, scheme='Personal', principal_amount=Decimal('10.00'))
+                    for account_id in account_ids
+                ], batch_size=5000)
+            self.stdout.write(f"seeded {len(account_ids):,} accounts with one loan each in {seeding.elapsed:.1f}s")
+            accounts = Account.objects.filter(user__username__startswith=PREFIX)
+            loans = Loan.objects.filter(account__user__username__startswith=PREFIX)
+
+            baseline = {}
+            for workers in counts:
+                with Timer() as interest:
+                    run = accrue_interest(
+                        bench_date(workers), chunk_size=options['chunk_size'], accounts=accounts, workers=workers,
+                    )
+                self.report('accrue_interest', workers, run.accounts_processed, interest.elapsed, run.report, baseline)
+
+                loans.update(status='Approved', balance_remaining=Decimal('10.00'), pending_repayment=False)
+                # One installment per loan, due on the run date
+                LoanInstallment.objects.filter(loan__in=loans).delete()
+                LoanInstallment.objects.bulk_create(
+                    schedule_installments(loans, add_months(bench_date(workers), -1), 1), batch_size=5000,
+                )
+                with Timer() as repay:
+                    run = LoanFacade.auto_repay_loans(
+                        bench_date(workers), chunk_size=options['chunk_size'], loans=loans, workers=workers,
+                    )
+                self.report('auto_repay_loans', workers, run.loans_processed, repay.elapsed, run.report, baseline)
+        finally:
+            cleanup(PREFIX)
+            self.reset(counts)
+
+    def reset(self, counts):
+        keys = [bench_date(workers).isoformat() for workers in counts]
+        BatchShard.objects.filter(job=REPAYMENT_JOB, run_key__in=keys).delete()
+        BatchShard.objects.filter(
+            job='accrue_interest', run_key__in=[interest_run_key(bench_date(workers), 'Savings') for workers in counts],
+        ).delete()
+        InterestRun.objects.filter(period__in=keys).delete()
+        LoanRepaymentRun.objects.filter(run_date__in=keys).delete()
+
+    def report(self, job, workers, rows, elapsed, batch_report, baseline):
+        rate = rows / elapsed if elapsed else 0
+        baseline.setdefault(job, rate)
+        speedup = rate / baseline[job] if baseline[job] else 0
+        line = (
+            f"  {job:<17} {workers:>3} worker(s): {rows:,} rows in {elapsed:6.2f}s "
+            f"{rate:10,.0f} rows/s  x{speedup:.2f}  {len(batch_report.results)} shard(s)"
+        )
+        if batch_report.errors:
+            line += f", {len(batch_report.errors)} failed: {batch_report.errors[0].error}"
+            self.stdout.write(self.style.ERROR(line))
+        else:
+            self.stdout.write(line)
@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+from django.test.utils import override_settings
+from bankapp.bench import cleanup
+from bankapp.models import Account
+from bankapp.services import BankingFacade
+
+BENCH_PREFIX = 'bench_contention_'
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a small set of accounts with concurrent deposits, withdrawals and transfers, "
+        "then check that no balance update was lost. Run against the real (MySQL) database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', default='1,2,4,8,16,32,64', help="Comma-separated writer thread counts.")
+        parser.add_argument('--ops', type=int, default=50, help="Operations per writer.")
+        parser.add_argument('--accounts', type=int, default=4, help="Size of the contended account pool.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stderr.write("SQLite serialises all writers; expect 'database is locked' errors and low numbers.")
+
+        accounts = self.create_accounts(options['accounts'])
+        try:
+            # A handful of accounts take thousands of debits a minute here; the velocity rules would refuse most
+            with override_settings(VELOCITY_CHECKS=False):
+                for writers in [int(w) for w in options['writers'].split(',')]:
+                    self.run_round(accounts, writers, options['ops'], options['seed'])
+        finally:
+            cleanup(BENCH_PREFIX)
+
+    def create_accounts(self, count):
+        cleanup(BENCH_PREFIX)
+        accounts = []
+        for i in range(count):
+            user = User.objects.create(username=f'{BENCH_PREFIX}{i}')
+            accounts.append(Account.objects.create(
+                user=user, account_number=f'BENCH{i:06d}', account_type='Current',
+                balance=Decimal('1000000.00'), cnic=f'BENCH-{i:09d}', date_of_birth='1990-01-01',
+                age=30, address='benchmark', phone_number='0',
+            ))
+        return accounts
+
+    def run_round(self, accounts, writers, ops, seed):
+        start_balances = dict(Account.objects.filter(id__in=[a.id for a in accounts]).values_list('id', 'balance'))
+        deltas = [dict.fromkeys(start_balances, Decimal('0')) for _ in range(writers)]
+        errors = [0] * writers
+
+        def writer(n):
+            rng = random.Random(seed * 1000 + n)
+            expected = deltas[n]
+            try:
+                for _ in range(ops):
+                    a, b = rng.sample(accounts, 2) if len(accounts) > 1 else (accounts[0], accounts[0])
+                    amount = Decimal(rng.randint(1, 500))
+                    op = rng.choice(('deposit', 'withdraw', 'transfer'))
+                    try:
+                        if op == 'deposit':
+                            BankingFacade.deposit(a.id, amount)
+                            expected[a.id] += amount
+                        elif op == 'withdraw':
+                            if BankingFacade.withdraw(a.id, amount)[0]:
+                                expected[a.id] -= amount
+                        else:
+                            if BankingFacade.transfer_funds(a.id, b.account_number, amount)[0]:
+                                expected[a.id] -= amount
+                                expected[b.id] += amount
+                    except OperationalError:
+                        # Deadlock/lock timeout: the atomic block rolled back, nothing to count
+                        errors[n] += 1
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        final = dict(Account.objects.filter(id__in=start_balances).values_list('id', 'balance'))
+        lost = {
+            acc_id: final[acc_id] - (start_balances[acc_id] + sum(d[acc_id] for d in deltas))
+            for acc_id in start_balances
+        }
+        consistent = not any(lost.values())
+        total_ops = writers * ops
+        self.stdout.write(
+            f"writers={writers:>3} ops={total_ops:>6} time={elapsed:7.2f}s "
+            f"throughput={total_ops / elapsed:8.1f} ops/s errors={sum(errors):>4} "
+            + (self.style.SUCCESS("no lost updates") if consistent else self.style.ERROR(f"LOST UPDATES {lost}"))
+        )
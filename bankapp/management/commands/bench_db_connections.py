@@ -0,0 +1,143 @@
+import copy
+import threading
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+from django.test import Client, RequestFactory
+from bankapp.aggregates import rebuild_aggregates
+from bankapp.bench import cleanup, percentile, seed_accounts, seed_transactions
+from bankapp.db_pool import get_pool
+from bankapp.models import Account
+
+PREFIX = 'bench_dbconn_'
+
+ENGINES = {
+    # vendor -> (stock backend, pooled backend)
+    'mysql': ('django.db.backends.mysql', 'bankapp.db_pool.mysql'),
+    'sqlite': ('django.db.backends.sqlite3', 'bankapp.db_pool.sqlite3'),
+}
+
+# name -> (pooled, settings overrides)
+CONFIGS = {
+    'connect-per-request': (False, {'CONN_MAX_AGE': 0}),
+    'persistent': (False, {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False}),
+    'persistent+health-checks': (False, {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}),
+    'pooled': (True, {'CONN_MAX_AGE': 0}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-request latency of the dashboard with a new connection per request, persistent "
+        "connections (CONN_MAX_AGE, with and without health checks) and the in-process pool. "
+        "Requests go through Django's WSGI handler in this process, from --threads threads, "
+        "against the configured database (MySQL, or SQLite as a stand-in)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--configs', default=','.join(CONFIGS), help="Comma-separated subset of: " + ', '.join(CONFIGS))
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--requests', type=int, default=1000, help="Requests per config.")
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--pool-size', type=int, default=4)
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['configs'].split(',')]
+        unknown = set(names) - set(CONFIGS)
+        if unknown:
+            raise CommandError(f"Unknown config(s): {', '.join(sorted(unknown))}")
+        vendor = connections['default'].vendor
+        if vendor not in ENGINES:
+            raise CommandError(f"No pooled backend for {vendor}")
+
+        cleanup(PREFIX)
+        try:
+            cookie = self.seed()
+            self.stdout.write(
+                f"{vendor}, {options['requests']} x GET {options['path']} per config, {options['threads']} threads"
+            )
+            for name in names:
+                self.run(name, vendor, cookie, options)
+        finally:
+            cleanup(PREFIX)
+
+    def seed(self):
+        account_id, = seed_accounts(1, PREFIX, 'DC', balance=Decimal('100000.00'))
+        seed_transactions(account_id, 1000)
+        rebuild_aggregates(Account.objects.filter(id=account_id))
+        client = Client()
+        client.force_login(Account.objects.get(id=account_id).user)
+        return f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+    def run(self, name, vendor, cookie, options):
+        pooled, overrides = CONFIGS[name]
+        engine = ENGINES[vendor][pooled]
+        settings_dict = copy.deepcopy(connections['default'].settings_dict)
+        settings_dict.update(overrides, ENGINE=engine)
+        settings_dict['POOL'] = {**(settings_dict.get('POOL') or {}), 'SIZE': options['pool_size']}
+        wrapper_class = load_backend(engine).DatabaseWrapper
+
+        handler = WSGIHandler()
+        factory = RequestFactory()
+        per_thread = max(1, options['requests'] // options['threads'])
+        samples, errors, connects = [], [], 0
+        lock = threading.Lock()
+
+        def count_connect(sender, connection, **kwargs):
+            nonlocal connects
+            with lock:
+                connects += 1
+
+        def client():
+            # Each thread gets its own connection object, like a gunicorn thread would
+            connections['default'] = wrapper_class(copy.deepcopy(settings_dict), 'default')
+            local = []
+            try:
+                for _ in range(per_thread):
+                    environ = factory.get(options['path'], HTTP_COOKIE=cookie).environ
+                    started = time.perf_counter()
+                    status = []
+                    response = handler(environ, lambda s, headers: status.append(s))
+                    b''.join(response)
+                    response.close()  # fires request_finished, which closes/returns the connection
+                    local.append((time.perf_counter() - started) * 1000)
+                    if not status[0].startswith('200'):
+                        errors.append(status[0])
+            finally:
+                connections['default'].close()
+                with lock:
+                    samples.extend(local)
+
+        connection_created.connect(count_connect)
+        try:
+            threads = [threading.Thread(target=client) for _ in range(options['threads'])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connect)
+
+        if pooled:
+            pool = get_pool('default', settings_dict)
+            opened = f"{pool.opened} opened, {pool.reused} reused"
+            pool.clear()
+        else:
+            opened = f"{connects} opened"
+        samples.sort()
+        line = (
+            f"  {name:<26} {len(samples) / wall:8.1f} req/s  p50={percentile(samples, 50):7.2f}ms "
+            f"p95={percentile(samples, 95):7.2f}ms p99={percentile(samples, 99):7.2f}ms  connections: {opened}"
+        )
+        if errors:
+            line += f", {len(errors)} non-200 ({errors[0]})"
+            self.stdout.write(self.style.ERROR(line))
+        else:
+            self.stdout.write(line)
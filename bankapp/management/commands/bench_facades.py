@@ -0,0 +1,138 @@
+import json
+import platform
+import time
+from decimal import Decimal
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from bankapp.aggregates import rebuild_aggregates
+from bankapp.bench import cleanup, percentile, seed_accounts, seed_transactions
+from bankapp.models import Account
+from bankapp.services import BankingFacade, LoanFacade, RechargeFacade
+
+PREFIX = 'bench_facades_'
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every BankingFacade/LoanFacade/RechargeFacade operation and the main views "
+        "against an account with 1k/100k/1M transactions of history. Runs on whatever database "
+        "DATABASES points at, so run it once per backend (SQLite, local MySQL) to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1000,100000,1000000', help="Comma-separated history sizes.")
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--output', help="Write results as JSON to this file.")
+        parser.add_argument('--compare', help="Earlier JSON results to diff against.")
+        parser.add_argument('--threshold', type=float, default=10.0, help="Percent p50 slowdown that counts as a regression.")
+
+    def handle(self, *args, **options):
+        scales = [int(s) for s in options['scales'].split(',')]
+        report = {
+            'meta': {
+                'vendor': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'iterations': options['iterations'],
+                'run_at': timezone.now().isoformat(),
+            },
+            'seeding_rows_per_sec': {},
+            'results': {},
+        }
+
+        for scale in scales:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"History of {scale:,} transactions"))
+            cleanup(PREFIX)
+            try:
+                account_id, other_id = seed_accounts(2, PREFIX, 'BF', balance=Decimal('100000000.00'))
+                rate = seed_transactions(account_id, scale)
+                rebuild_aggregates(Account.objects.filter(id=account_id))
+                report['seeding_rows_per_sec'][str(scale)] = round(rate)
+                self.stdout.write(f"  seeded at {rate:,.0f} rows/s")
+                # One account withdraws and transfers hundreds of times a minute here; bench_velocity
+                # measures what the velocity rules add
+                with override_settings(VELOCITY_CHECKS=False):
+                    report['results'][str(scale)] = self.run_scale(account_id, other_id, options['iterations'])
+            finally:
+                cleanup(PREFIX)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"results written to {options['output']}")
+        if options['compare']:
+            self.compare(report, options['compare'], options['threshold'])
+
+    def operations(self, account_id, other_id):
+        account = Account.objects.select_related('user').get(id=account_id)
+        other_number = Account.objects.values_list('account_number', flat=True).get(id=other_id)
+        client = Client()
+        client.force_login(account.user)
+        payroll = [{'receiver_account': other_number, 'amount': Decimal('1.00')}] * 100
+
+        return {
+            'deposit': lambda: BankingFacade.deposit(account_id, Decimal('10.00')),
+            'withdraw': lambda: BankingFacade.withdraw(account_id, Decimal('1.00')),
+            'transfer_funds': lambda: BankingFacade.transfer_funds(account_id, other_number, Decimal('1.00')),
+            'bulk_transfer_100': lambda: BankingFacade.bulk_transfer(account_id, payroll),
+            'apply_loan': lambda: LoanFacade.apply_loan(account_id, 'Personal'),
+            'process_recharge': lambda: RechargeFacade.process_recharge(account_id, '3001234567', '+92', Decimal('1.00')),
+            'view_dashboard': lambda: client.get('/'),
+            'view_history': lambda: client.get('/history/'),
+            'view_history_api': lambda: client.get('/api/transactions/'),
+        }
+
+    def run_scale(self, account_id, other_id, iterations):
+        results = {}
+        for name, op in self.operations(account_id, other_id).items():
+            for _ in range(3):  # warm caches and connections
+                op()
+            samples = []
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    op()
+                    samples.append((time.perf_counter() - started) * 1000)
+            samples.sort()
+            total = sum(samples) / 1000
+            results[name] = {
+                'p50_ms': round(percentile(samples, 50), 3),
+                'p95_ms': round(percentile(samples, 95), 3),
+                'p99_ms': round(percentile(samples, 99), 3),
+                'ops_per_sec': round(iterations / total, 1),
+                'queries_per_op': round(len(queries.captured_queries) / iterations, 2),
+            }
+            r = results[name]
+            self.stdout.write(
+                f"  {name:<18} p50={r['p50_ms']:8.2f}ms p95={r['p95_ms']:8.2f}ms p99={r['p99_ms']:8.2f}ms "
+                f"{r['ops_per_sec']:9.1f} ops/s {r['queries_per_op']:6.1f} queries/op"
+            )
+        return results
+
+    def compare(self, report, path, threshold):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Can't read {path}: {e}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Compared with {path}"))
+        regressions = 0
+        for scale, ops in report['results'].items():
+            for name, result in ops.items():
+                before = baseline.get('results', {}).get(scale, {}).get(name)
+                if not before or not before['p50_ms']:
+                    continue
+                change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+                line = f"  {scale:>8} {name:<18} p50 {before['p50_ms']:8.2f} -> {result['p50_ms']:8.2f}ms ({change:+.1f}%)"
+                if change > threshold:
+                    regressions += 1
+                    self.stdout.write(self.style.ERROR(line))
+                else:
+                    self.stdout.write(line)
+        if regressions:
+            self.stdout.write(self.style.ERROR(f"{regressions} regression(s) over {threshold}%"))
@@ -0,0 +1,50 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from bankapp.bench import Timer, cleanup, seed_accounts
+from bankapp.interest import accrue_interest, interest_run_key
+from bankapp.models import Account, BatchShard, InterestRun
+
+PREFIX = 'bench_interest_'
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic Savings accounts and time the batch interest accrual over them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=100000, help="Use 1000000 for the full-size run.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--keep', action='store_true', help="Don't delete the seeded data afterwards.")
+
+    def handle(self, *args, **options):
+        count = options['accounts']
+        # A period far in the past so the benchmark never collides with a real month-end run
+        period = date(1970, 1, 1)
+        cleanup(PREFIX)
+        InterestRun.objects.filter(period=period).delete()
+        BatchShard.objects.filter(job='accrue_interest', run_key=interest_run_key(period, 'Savings')).delete()
+
+        with Timer() as seeding:
+            seed_accounts(count, PREFIX, 'BI')
+        self.stdout.write(f"seeded {count} accounts in {seeding.elapsed:.1f}s")
+
+        seeded = Account.objects.filter(user__username__startswith=PREFIX)
+        try:
+            with CaptureQueriesContext(connection) as queries, Timer() as accrual:
+                run = accrue_interest(period, chunk_size=options['chunk_size'], accounts=seeded)
+            self.stdout.write(
+                f"accrued {run.accounts_processed} accounts in {accrual.elapsed:.2f}s "
+                f"({run.accounts_processed / accrual.elapsed:,.0f} accounts/s, "
+                f"{len(queries.captured_queries)} queries, ${run.total_interest} interest)"
+            )
+
+            with Timer() as rerun:
+                accrue_interest(period, chunk_size=options['chunk_size'], accounts=seeded)
+            self.stdout.write(f"idempotent re-run of the same period took {rerun.elapsed * 1000:.1f}ms")
+        finally:
+            reset_queries()
+            if not options['keep']:
+                cleanup(PREFIX)
+                InterestRun.objects.filter(period=period).delete()
+                BatchShard.objects.filter(job='accrue_interest', run_key=interest_run_key(period, 'Savings')).delete()
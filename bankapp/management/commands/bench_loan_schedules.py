@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from bankapp.amortization import schedule_installments
+from bankapp.bench import Timer, cleanup, seed_accounts
+from bankapp.models import BatchShard, Loan, LoanInstallment, LoanRepaymentRun
+from bankapp.services import REPAYMENT_JOB, LoanFacade
+
+PREFIX = 'bench_schedules_'
+# Far in the past so the benchmark never collides with a real run
+APPROVED = date(1980, 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build amortization tables for many approved loans in bulk, then run the nightly "
+        "collector on a few dates: its work follows the installments due that night, not the "
+        "number of open loans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=20000)
+        parser.add_argument('--installments', type=int, default=12)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--nights', type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.reset(options['nights'])
+        cleanup(PREFIX)
+        try:
+            account_ids = seed_accounts(options['loans'], PREFIX, 'LS', balance=Decimal('100000.00'))
+            Loan.objects.bulk_create([
+                Loan(
+                    account_id=account_id, scheme='Car', principal_amount=Decimal('1200.00'),
+                    approved_amount=Decimal('1200.00'), interest_rate=Decimal('0.08'),
+                    balance_remaining=Decimal('1296.00'), status='Approved',
+                )
+                for account_id in account_ids
+            ], batch_size=5000)
+            loans = Loan.objects.filter(account__user__username__startswith=PREFIX)
+
+            # Approvals spread over a month, so about 1/30 of the loans fall due on any night
+            by_day = {}
+            for loan in loans.only('id', 'account_id', 'balance_remaining', 'interest_rate'):
+                by_day.setdefault(loan.id % 30, []).append(loan)
+            with Timer() as building:
+                rows = []
+                for offset, day_loans in by_day.items():
+                    rows += schedule_installments(day_loans, APPROVED + timedelta(days=offset), options['installments'])
+            with Timer() as writing:
+                LoanInstallment.objects.bulk_create(rows, batch_size=5000)
+            self.stdout.write(
+                f"{len(rows):,} installments for {options['loans']:,} loans: built in {building.elapsed:.2f}s "
+                f"({len(rows) / building.elapsed:,.0f}/s), written in {writing.elapsed:.2f}s"
+            )
+
+            for night in range(options['nights']):
+                run_date = self.run_date(night)
+                due = LoanInstallment.objects.filter(loan__in=loans, status='Due', due_date__lte=run_date).count()
+                with Timer() as collecting:
+                    run = LoanFacade.auto_repay_loans(run_date, chunk_size=options['chunk_size'], loans=loans)
+                open_loans = loans.filter(status='Approved').count()
+                self.stdout.write(
+                    f"  {run_date}: {due:,} due, {run.loans_repaid:,} collected in {collecting.elapsed:.2f}s "
+                    f"({run.loans_processed / collecting.elapsed if collecting.elapsed else 0:,.0f}/s); "
+                    f"{open_loans:,} loans open, which the per-loan job read every night"
+                )
+        finally:
+            cleanup(PREFIX)
+            self.reset(options['nights'])
+
+    def run_date(self, night):
+        # The first installments fall due a month after approval
+        return date(1980, 2, 1) + timedelta(days=night)
+
+    def reset(self, nights):
+        keys = [self.run_date(night) for night in range(nights)]
+        BatchShard.objects.filter(job=REPAYMENT_JOB, run_key__in=[key.isoformat() for key in keys]).delete()
+        LoanRepaymentRun.objects.filter(run_date__in=keys).delete()
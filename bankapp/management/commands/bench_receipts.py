@@ -0,0 +1,77 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template.loader import render_to_string
+from bankapp.bench import cleanup, seed_accounts, seed_transactions
+from bankapp.models import Transaction
+from bankapp.utils import build_transaction_email, build_transaction_emails, render_receipts
+
+PREFIX = 'bench_receipts_'
+
+
+def legacy_receipt(transaction):
+    """What send_transaction_email used to do per transaction: lazy relations, render_to_string."""
+    account = transaction.account
+    html = render_to_string('transaction_email.html', {
+        'transaction': transaction, 'account': account, 'balance': account.balance,
+    })
+    text = f"Transaction Receipt for {account.user.username} {transaction.amount} {account.balance}"
+    return html, text
+
+
+class Command(BaseCommand):
+    help = "Receipts/sec for rendering transaction receipt emails one at a time versus in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=10000)
+        parser.add_argument('--accounts', type=int, default=100, help="Accounts the transactions are spread over.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count, batch_size = options['transactions'], options['batch_size']
+        cleanup(PREFIX)
+        try:
+            account_ids = seed_accounts(options['accounts'], PREFIX, 'BR')
+            for account_id in account_ids:
+                seed_transactions(account_id, count // len(account_ids))
+            User.objects.filter(username__startswith=PREFIX).update(email='bench@example.com')
+            ids = list(
+                Transaction.objects.filter(account_id__in=account_ids).order_by('id').values_list('id', flat=True)
+            )
+            self.stdout.write(f"{len(ids):,} transactions over {len(account_ids)} accounts")
+
+            def plain(chunk):
+                return list(Transaction.objects.filter(id__in=chunk).order_by('id'))
+
+            def joined(chunk):
+                return list(Transaction.objects.filter(id__in=chunk).select_related('account__user').order_by('id'))
+
+            def batches():
+                for start in range(0, len(ids), batch_size):
+                    yield ids[start:start + batch_size]
+
+            self.measure("legacy: render_to_string, lazy relations", len(ids),
+                         lambda: [legacy_receipt(txn) for chunk in batches() for txn in plain(chunk)])
+            self.measure("build_transaction_email one at a time", len(ids),
+                         lambda: [build_transaction_email(txn) for chunk in batches() for txn in joined(chunk)])
+            self.measure(f"render_receipts, batches of {batch_size}", len(ids),
+                         lambda: [render_receipts(plain(chunk)) for chunk in batches()])
+            self.measure(f"build_transaction_emails, batches of {batch_size}", len(ids),
+                         lambda: [build_transaction_emails(plain(chunk)) for chunk in batches()])
+        finally:
+            cleanup(PREFIX)
+
+    def measure(self, label, count, run):
+        queries = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(f"  {label:<48} {count / elapsed:10,.0f} receipts/s  {queries:6,} queries")
@@ -0,0 +1,102 @@
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from bankapp.bench import cleanup, explicit_timestamps, seed_accounts
+from bankapp.models import Account, Transaction
+from bankapp.pagination import paginate_transactions
+from bankapp.search import search_transactions
+
+PREFIX = 'bench_search_'
+
+
+class Command(BaseCommand):
+    help = (
+        "Median latency of the first page of filtered transaction history (type, counterparty, "
+        "amount range, description words, staff-wide lookups) over a synthetic table, next to "
+        "the LIKE / __date queries they replace."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=200000)
+        parser.add_argument('--accounts', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        cleanup(PREFIX)
+        try:
+            account_ids = seed_accounts(options['accounts'], PREFIX, 'SR')
+            numbers = dict(Account.objects.filter(id__in=account_ids).values_list('id', 'account_number'))
+            started = time.perf_counter()
+            self.seed(account_ids, numbers, options['transactions'])
+            self.stdout.write(
+                f"seeded {options['transactions']:,} transactions over {len(account_ids)} accounts "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+
+            account_id = account_ids[len(account_ids) // 2]
+            other = Transaction.objects.filter(account_id=account_id, transaction_type='Transfer').values_list(
+                'counterparty', flat=True,
+            ).first()
+            account = Account.objects.get(id=account_id)
+            mine = Transaction.objects.filter(account=account)
+            phone = mine.filter(transaction_type='Mobile Recharge').order_by('id').values_list(
+                'description', flat=True,
+            ).first().rsplit(' ', 1)[-1]
+            everyone = Transaction.objects.all()
+            today = timezone.localdate()
+            start, end = (today - timedelta(days=90)).isoformat(), today.isoformat()
+
+            cases = [
+                ("history, no filter", lambda: mine),
+                ("type=Transfer", lambda: search_transactions(mine, {'type': 'Transfer'}, account)),
+                ("counterparty", lambda: search_transactions(mine, {'counterparty': other}, account)),
+                ("amount 40..60", lambda: search_transactions(mine, {'min_amount': '40', 'max_amount': '60'}, account)),
+                ("q=recharge", lambda: search_transactions(mine, {'q': 'recharge'}, account)),
+                ("  old: description LIKE", lambda: mine.filter(description__icontains='recharge')),
+                ("q=<phone>, rare word", lambda: search_transactions(mine, {'q': phone}, account)),
+                ("  old: description LIKE", lambda: mine.filter(description__icontains=phone)),
+                ("last 90 days", lambda: search_transactions(mine, {'start_date': start, 'end_date': end}, account)),
+                ("  old: timestamp__date__range", lambda: mine.filter(timestamp__date__range=(start, end))),
+                ("staff: counterparty, all accounts", lambda: search_transactions(everyone, {'counterparty': other})),
+                ("  old: LIKE 'Sent to <acct>'", lambda: everyone.filter(
+                    Q(description__icontains=f"Sent to {other}") | Q(description__icontains=f"Received from {other}"))),
+                ("staff: q=<acct>, all accounts", lambda: search_transactions(everyone, {'q': other})),
+            ]
+            for label, build in cases:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    page = paginate_transactions(build())
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(f"  {label:<36} {statistics.median(timings):8.2f} ms  ({len(page)} rows)")
+        finally:
+            cleanup(PREFIX)
+
+    def seed(self, account_ids, numbers, count, batch_size=5000):
+        """Deposits, withdrawals, transfers between the accounts and recharges, spread over three years."""
+        now = timezone.now()
+        step = timedelta(days=365 * 3) / max(count, 1)
+        with explicit_timestamps():
+            for start in range(0, count, batch_size):
+                rows = []
+                for i in range(start, min(start + batch_size, count)):
+                    account_id = account_ids[i % len(account_ids)]
+                    other = numbers[account_ids[(i * 7 + 1) % len(account_ids)]]
+                    kind = (i // len(account_ids)) % 4
+                    amount = Decimal(10 + i % 90)
+                    if kind == 0:
+                        fields = dict(amount=amount, description="Deposit", transaction_type='Deposit')
+                    elif kind == 1:
+                        fields = dict(amount=-amount, description="Withdrawal", transaction_type='Withdrawal')
+                    elif kind == 2:
+                        fields = dict(amount=-amount, description=f"Sent to {other}", transaction_type='Transfer',
+                                      counterparty=other)
+                    else:
+                        fields = dict(amount=-amount, description=f"Mobile Recharge (+92) 300{i % 10000000:07d}",
+                                      transaction_type='Mobile Recharge')
+                    rows.append(Transaction(account_id=account_id, timestamp=now - step * (count - i), **fields))
+                Transaction.objects.bulk_create(rows, batch_size=batch_size)
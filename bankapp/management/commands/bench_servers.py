@@ -0,0 +1,169 @@
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from bankapp.aggregates import rebuild_aggregates
+from bankapp.bench import cleanup, percentile, seed_accounts, seed_transactions
+from bankapp.models import Account
+
+PREFIX = 'bench_servers_'
+
+# name -> (binary, argv after the binary, extra environment)
+SERVERS = {
+    'gunicorn-wsgi': (
+        'gunicorn', ['banking_system.wsgi', '--bind', '127.0.0.1:{port}', '--workers', '{workers}', '--threads', '{threads}'],
+        {'ASYNC_READ_VIEWS': '0'},
+    ),
+    'uvicorn-asgi-sync-views': (
+        'uvicorn', ['banking_system.asgi:application', '--port', '{port}', '--workers', '{workers}', '--no-access-log'],
+        {'ASYNC_READ_VIEWS': '0'},
+    ),
+    'uvicorn-asgi-async-views': (
+        'uvicorn', ['banking_system.asgi:application', '--port', '{port}', '--workers', '{workers}', '--no-access-log'],
+        {'ASYNC_READ_VIEWS': '1'},
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec and tail latency of the read-heavy pages under gunicorn (WSGI, the "
+        "Procfile setup) and uvicorn (ASGI, with the sync views and with the async views). "
+        "Each server is started as a subprocess against the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default=','.join(SERVERS), help="Comma-separated subset of: " + ', '.join(SERVERS))
+        parser.add_argument('--paths', default='/,/history/,/profile/,/my-loans/')
+        parser.add_argument('--requests', type=int, default=500, help="Requests per path per server.")
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4, help="gunicorn threads per worker.")
+        parser.add_argument('--history', type=int, default=10000, help="Transactions seeded for the benchmark user.")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output', help="Write results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['servers'].split(',')]
+        unknown = set(names) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown server(s): {', '.join(sorted(unknown))}")
+        missing = {SERVERS[name][0] for name in names if not shutil.which(SERVERS[name][0])}
+        if missing:
+            raise CommandError(f"Not installed: {', '.join(sorted(missing))} (pip install gunicorn uvicorn)")
+
+        paths = [p.strip() for p in options['paths'].split(',')]
+        report = {'meta': {k: options[k] for k in ('requests', 'concurrency', 'workers', 'threads', 'history')}, 'results': {}}
+
+        cleanup(PREFIX)
+        try:
+            cookie = self.seed(options['history'])
+            for name in names:
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                with self.server(name, options) as port:
+                    report['results'][name] = {
+                        path: self.load(port, path, cookie, options['requests'], options['concurrency'])
+                        for path in paths
+                    }
+        finally:
+            cleanup(PREFIX)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"results written to {options['output']}")
+
+    def seed(self, history):
+        account_id, = seed_accounts(1, PREFIX, 'BS', balance=Decimal('100000.00'))
+        seed_transactions(account_id, history)
+        rebuild_aggregates(Account.objects.filter(id=account_id))
+        client = Client()
+        client.force_login(Account.objects.get(id=account_id).user)
+        return f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+    @contextmanager
+    def server(self, name, options):
+        binary, argv, env = SERVERS[name]
+        log = tempfile.TemporaryFile()  # not a pipe: a chatty server would block once it fills
+        proc = subprocess.Popen(
+            [shutil.which(binary)] + [arg.format(**options) for arg in argv], cwd=settings.BASE_DIR,
+            env={**os.environ, **env, 'PYTHONPATH': os.pathsep.join(sys.path)},
+            stdout=subprocess.DEVNULL, stderr=log,
+        )
+        try:
+            self.wait_until_up(proc, options['port'], log)
+            yield options['port']
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            log.close()
+
+    def wait_until_up(self, proc, port, log, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"Server exited early:\n{log.read().decode(errors='replace')[-2000:]}")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+                conn.request('GET', '/login/')
+                conn.getresponse().read()
+                conn.close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Server didn't come up on port {port} within {timeout}s")
+
+    def load(self, port, path, cookie, requests, concurrency):
+        local = threading.local()
+        headers = {'Cookie': cookie}
+
+        def fetch(_):
+            if not hasattr(local, 'conn'):
+                local.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            started = time.perf_counter()
+            try:
+                local.conn.request('GET', path, headers=headers)
+                response = local.conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                local.conn.close()
+                del local.conn
+                ok = False
+            return (time.perf_counter() - started) * 1000, ok
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(fetch, range(concurrency * 2)))  # warm up connections and caches
+            started = time.perf_counter()
+            results = list(pool.map(fetch, range(requests)))
+            wall = time.perf_counter() - started
+
+        samples = sorted(ms for ms, _ in results)
+        result = {
+            'requests_per_sec': round(requests / wall, 1),
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'p99_ms': round(percentile(samples, 99), 2),
+            'errors': sum(1 for _, ok in results if not ok),
+        }
+        self.stdout.write(
+            f"  {path:<12} {result['requests_per_sec']:8.1f} req/s  p50={result['p50_ms']:7.2f}ms "
+            f"p95={result['p95_ms']:7.2f}ms p99={result['p99_ms']:7.2f}ms  errors={result['errors']}"
+        )
+        return result
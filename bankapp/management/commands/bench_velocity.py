@@ -0,0 +1,112 @@
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from bankapp import velocity
+from bankapp.bench import Timer, cleanup, seed_accounts, seed_transactions
+from bankapp.models import Account
+from bankapp.services import BankingFacade
+
+PREFIX = 'bench_velocity_'
+
+
+def query_rules(account, kind, amount):
+    """The naive version: a COUNT/SUM over the account's recent debits per rule, on every debit."""
+    now = time.time()
+    for rule in velocity.VELOCITY_RULES:
+        count, total = velocity._db_totals(account.id, rule.kinds, now - rule.window.total_seconds())
+        message = rule.check(count, total, amount)
+        if message:
+            return message
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Transfers/sec through BankingFacade.transfer_funds without velocity rules, with the "
+        "in-process rings, with the rings in a shared cache, and with one aggregate query per "
+        "rule; plus the cost of a single check on a warm and on a full ring."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transfers', type=int, default=2000)
+        parser.add_argument('--accounts', type=int, default=200, help="Senders the transfers rotate over.")
+        parser.add_argument('--history', type=int, default=1000, help="Transactions of history per sender.")
+        parser.add_argument('--cache-alias', default='default', help="CACHES alias standing in for the shared tier.")
+
+    def handle(self, *args, **options):
+        cleanup(PREFIX)
+        try:
+            with Timer() as seeding:
+                account_ids = seed_accounts(options['accounts'] + 1, PREFIX, 'VL', balance=Decimal('100000000.00'))
+                for account_id in account_ids:
+                    seed_transactions(account_id, options['history'])
+            self.stdout.write(
+                f"seeded {len(account_ids) * options['history']:,} transactions over {len(account_ids)} accounts "
+                f"in {seeding.elapsed:.1f}s"
+            )
+            receiver = Account.objects.values_list('account_number', flat=True).get(id=account_ids.pop())
+
+            # Limits nobody reaches, so every transfer goes through
+            with override_settings(VELOCITY_MAX_DEBITS=10 ** 9, VELOCITY_DAILY_DEBIT_LIMIT=10 ** 12):
+                self.transfers(account_ids, receiver, options)
+                self.checks(account_ids[0], options['cache_alias'])
+        finally:
+            velocity.reset_velocity()
+            cleanup(PREFIX)
+
+    def transfers(self, account_ids, receiver, options):
+        count = options['transfers']
+        senders = Account.objects.in_bulk(account_ids)
+
+        def run(before=None):
+            with Timer() as timer:
+                for i in range(count):
+                    sender_id = account_ids[i % len(account_ids)]
+                    if before is not None:
+                        before(senders[sender_id], 'Transfer', Decimal('1.00'))
+                    BankingFacade.transfer_funds(sender_id, receiver, Decimal('1.00'))
+            return timer.elapsed
+
+        cases = [
+            ("no velocity rules", dict(VELOCITY_CHECKS=False), None),
+            ("in-process rings", dict(VELOCITY_CHECKS=True, VELOCITY_CACHE_ALIAS=None), None),
+            ("rings in shared cache", dict(VELOCITY_CHECKS=True, VELOCITY_CACHE_ALIAS=options['cache_alias']), None),
+            ("aggregate query per rule", dict(VELOCITY_CHECKS=False), query_rules),
+        ]
+        baseline = None
+        for label, overrides, before in cases:
+            velocity.reset_velocity()
+            with override_settings(**overrides):
+                elapsed = run(before)
+            per_transfer = elapsed / count * 1e6
+            line = f"  {label:<26} {count / elapsed:9.1f} transfers/s  {per_transfer:8.1f} us/transfer"
+            if baseline is None:
+                baseline = per_transfer
+            else:
+                line += f"  ({per_transfer - baseline:+.1f} us)"
+            self.stdout.write(line)
+
+    def checks(self, account_id, cache_alias, repeat=20000):
+        account = Account.objects.get(id=account_id)
+        self.stdout.write("one check_velocity call:")
+        for label, overrides, fill in [
+            ("warm ring, in-process", dict(VELOCITY_CACHE_ALIAS=None), 10),
+            ("full ring, in-process", dict(VELOCITY_CACHE_ALIAS=None), None),
+            ("warm ring, shared cache", dict(VELOCITY_CACHE_ALIAS=cache_alias), 10),
+        ]:
+            with override_settings(VELOCITY_CHECKS=True, **overrides):
+                velocity.reset_velocity(account.id)
+                if overrides['VELOCITY_CACHE_ALIAS']:
+                    velocity._shared().delete(velocity._key(account.id))
+                # Past VELOCITY_HISTORY debits in 24 hours the daily rule can't trust the ring and queries
+                for _ in range(fill or settings.VELOCITY_HISTORY + 1):
+                    velocity.record_velocity(account, 'Transfer', Decimal('1.00'))
+                velocity.check_velocity(account, 'Transfer', Decimal('1.00'))
+                n = repeat if fill else repeat // 20
+                started = time.perf_counter()
+                for _ in range(n):
+                    velocity.check_velocity(account, 'Transfer', Decimal('1.00'))
+                elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {label:<26} {elapsed / n * 1e6:8.2f} us")
@@ -0,0 +1,40 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from bankapp.bulk import BulkFileError, parse_transfer_file
+from bankapp.models import Account
+from bankapp.services import BankingFacade
+
+
+class Command(BaseCommand):
+    help = "Run a batch of transfers (payroll) from a CSV or JSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('sender_account', help="Account number the money is sent from.")
+        parser.add_argument('path', help="CSV (receiver_account,amount) or JSON file of transfers.")
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--report', help="Write the per-row result report to this JSON file.")
+
+    def handle(self, *args, **options):
+        try:
+            sender = Account.objects.get(account_number=options['sender_account'])
+        except Account.DoesNotExist:
+            raise CommandError("Sender account not found")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig') as f:
+                rows = parse_transfer_file(f.read(), options['path'])
+        except (OSError, BulkFileError) as e:
+            raise CommandError(str(e))
+
+        report = BankingFacade.bulk_transfer(sender.id, rows, chunk_size=options['chunk_size'])
+
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+
+        failed = [r for r in report if r['status'] != 'Success']
+        for r in failed[:20]:
+            self.stderr.write(f"row {r['row']}: {r['receiver_account']} {r['amount']} - {r['message']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(report) - len(failed)} of {len(report)} transfers succeeded."
+        ))
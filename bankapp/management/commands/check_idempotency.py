@@ -0,0 +1,84 @@
+import threading
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from bankapp.bench import cleanup, seed_accounts
+from bankapp.models import Account, MobileRecharge, Transaction
+
+PREFIX = 'check_idem_'
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire the same deposit, withdrawal, transfer and recharge POST (same idempotency key) "
+        "from many threads at once and check each ran exactly once. Exits non-zero otherwise."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--rounds', type=int, default=3, help="Fresh keys per endpoint.")
+
+    def handle(self, *args, **options):
+        cleanup(PREFIX)
+        try:
+            sender_id, receiver_id = seed_accounts(2, PREFIX, 'CI', balance=Decimal('1000.00'))
+            sender = Account.objects.select_related('user').get(id=sender_id)
+            receiver = Account.objects.get(id=receiver_id)
+            posts = {
+                'deposit': ('/deposit/', {'amount': '5.00'}, 'Deposit', Decimal('5.00')),
+                'withdraw': ('/withdraw/', {'amount': '3.00'}, 'Withdrawal', Decimal('-3.00')),
+                'transfer': ('/transfer/', {'receiver_account': receiver.account_number, 'amount': '7.00'},
+                             'Transfer', Decimal('-7.00')),
+                'recharge': ('/mobile-recharge/', {'phone': '+923001234567', 'country_code': '+92', 'amount': '2.00'},
+                             'Mobile Recharge', Decimal('-2.00')),
+            }
+
+            failures = []
+            for scope, (path, data, transaction_type, delta) in posts.items():
+                for _ in range(options['rounds']):
+                    before = Account.objects.get(id=sender_id).balance
+                    count_before = Transaction.objects.filter(account_id=sender_id, transaction_type=transaction_type).count()
+                    statuses = self.storm(sender.user, path, {**data, 'idempotency_key': uuid.uuid4().hex}, options['threads'])
+                    executed = Transaction.objects.filter(
+                        account_id=sender_id, transaction_type=transaction_type,
+                    ).count() - count_before
+                    moved = Account.objects.get(id=sender_id).balance - before
+
+                    ok = executed == 1 and moved == delta and set(statuses) == {302}
+                    line = f"  {scope:<9} {options['threads']} parallel posts: executed {executed}x, balance {moved:+}"
+                    if not ok:
+                        failures.append(scope)
+                        self.stdout.write(self.style.ERROR(f"{line}, responses {sorted(set(statuses))}"))
+                    else:
+                        self.stdout.write(line)
+
+            recharges = MobileRecharge.objects.filter(account_id=sender_id).count()
+            if recharges != options['rounds']:
+                failures.append(f"{recharges} recharge records")
+            if failures:
+                raise CommandError(f"Not exactly-once: {', '.join(failures)}")
+            self.stdout.write(self.style.SUCCESS("Every request ran exactly once."))
+        finally:
+            cleanup(PREFIX)
+
+    def storm(self, user, path, data, threads):
+        barrier = threading.Barrier(threads)
+        statuses = []
+
+        def post():
+            client = Client()
+            client.force_login(user)
+            try:
+                barrier.wait()
+                statuses.append(client.post(path, data).status_code)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=post) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return statuses
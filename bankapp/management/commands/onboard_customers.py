@@ -0,0 +1,55 @@
+import csv
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from bankapp.onboarding import OnboardingFileError, onboard_chunk, read_customer_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Open accounts for every customer in a CSV with columns username, email, account_type, cnic, "
+        "date_of_birth, age, address, phone_number (and optionally password). Rows that clash with "
+        "existing users/CNICs are reported and skipped, so a re-run only adds what's missing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--report', help="Write a per-row result CSV here.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        opened = failed = 0
+        report = None
+        try:
+            with open(options['file'], newline='', encoding='utf-8-sig') as f:
+                if options['report']:
+                    report_file = open(options['report'], 'w', newline='')
+                    report = csv.DictWriter(report_file, ['line', 'username', 'account_number', 'status', 'message'])
+                    report.writeheader()
+                lines = read_customer_csv(f)
+                while True:
+                    chunk = list(islice(lines, options['chunk_size']))
+                    if not chunk:
+                        break
+                    for result in onboard_chunk(chunk):
+                        if result['status'] == 'Success':
+                            opened += 1
+                        else:
+                            failed += 1
+                            if options['verbosity'] > 1:
+                                self.stdout.write(f"  line {result['line']}: {result['message']}")
+                        if report:
+                            report.writerow(result)
+                    self.stdout.write(f"  {opened + failed} rows: {opened} opened, {failed} failed")
+        except (OSError, OnboardingFileError) as e:
+            raise CommandError(str(e))
+        finally:
+            if report:
+                report_file.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{opened} accounts opened, {failed} rows failed in {elapsed:.1f}s "
+            f"({(opened + failed) / elapsed if elapsed else 0:,.0f} rows/s)."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from bankapp.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete idempotency keys past their TTL (IDEMPOTENCY_TTL_SECONDS). Safe to run from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        removed = purge_expired(options['batch_size'])
+        self.stdout.write(f"{removed} expired idempotency key(s) removed.")
@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+from bankapp.ledger import reconcile_range, unbalanced_journals
+from bankapp.models import Account
+
+
+def _reconcile(bounds):
+    try:
+        return reconcile_range(*bounds)
+    finally:
+        connections.close_all()  # each worker thread has its own connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that every Account.balance equals the sum of its ledger entries and that every "
+        "journal balances. Account id ranges are checked in parallel; exits non-zero on mismatches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--chunk-size', type=int, default=10000, help="Accounts per id range.")
+        parser.add_argument('--show', type=int, default=20, help="Mismatches to print.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        bounds = Account.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            self.stdout.write("No accounts.")
+            return
+        step = options['chunk_size']
+        ranges = [(low, low + step) for low in range(bounds['low'], bounds['high'] + 1, step)]
+
+        mismatches = []
+        with ThreadPoolExecutor(options['workers']) as pool:
+            for found in pool.map(_reconcile, ranges):
+                mismatches += found
+        journals = unbalanced_journals()
+
+        for account_id, number, balance, ledger in mismatches[:options['show']]:
+            self.stdout.write(self.style.ERROR(
+                f"  {number} (#{account_id}): balance {balance}, ledger {ledger}, off by {balance - ledger}"
+            ))
+        for journal, total in journals[:options['show']]:
+            self.stdout.write(self.style.ERROR(f"  journal {journal} doesn't balance: {total}"))
+
+        elapsed = time.perf_counter() - started
+        summary = f"{len(ranges)} range(s) checked in {elapsed:.2f}s: {len(mismatches)} account mismatch(es), {len(journals)} unbalanced journal(s)."
+        if mismatches or journals:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
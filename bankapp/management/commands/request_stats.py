@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from bankapp.models import RequestStat, SlowRequest
+from bankapp.profiling import request_stats_snapshot
+
+
+class Command(BaseCommand):
+    help = "Show per-URL request profiles (latency histogram, queries, DB/template/facade time) and slow requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slow', type=int, default=10, help="How many recent slow/N+1 requests to list.")
+        parser.add_argument('--reset', action='store_true', help="Delete all collected stats afterwards.")
+
+    def handle(self, *args, **options):
+        snapshot = request_stats_snapshot(options['slow'])
+
+        self.stdout.write(
+            f"{'url name':<28}{'reqs':>7}{'avg ms':>9}{'db ms':>8}{'tpl ms':>8}{'fac ms':>8}"
+            f"{'avg q':>7}{'max q':>7}{'N+1':>5}  histogram (<=10/50/100/250/500/1000/>1000 ms)"
+        )
+        for u in snapshot['urls']:
+            histogram = '/'.join(str(v) for v in u['latency_histogram'].values())
+            self.stdout.write(
+                f"{u['url_name'][:27]:<28}{u['requests']:>7}{u['avg_ms']:>9.1f}{u['avg_db_ms']:>8.1f}"
+                f"{u['avg_template_ms']:>8.1f}{u['avg_facade_ms']:>8.1f}{u['avg_queries']:>7.1f}"
+                f"{u['max_queries']:>7}{u['duplicate_query_requests']:>5}  {histogram}"
+            )
+
+        if snapshot['slow_requests']:
+            self.stdout.write(self.style.MIGRATE_HEADING("\nRecent slow / duplicate-query requests"))
+        for s in snapshot['slow_requests']:
+            self.stdout.write(f"{s['at']} {s['path']} {s['duration_ms']}ms {s['queries']} queries")
+            for line in s['duplicate_queries']:
+                self.stdout.write(f"    {line[:160]}")
+
+        if options['reset']:
+            RequestStat.objects.all().delete()
+            SlowRequest.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS("Stats reset."))
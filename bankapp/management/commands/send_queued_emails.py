@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from bankapp.outbox import MAX_ATTEMPTS, drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued transaction receipt emails from the outbox in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting when the outbox is empty.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep between polls when idle.")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = drain_outbox(options['batch_size'], options['max_attempts'])
+            if any(stats.values()):
+                self.stdout.write(
+                    f"sent={stats['sent']} skipped={stats['skipped']} "
+                    f"retried={stats['retried']} failed={stats['failed']}"
+                )
+                continue  # there may be more due rows, keep draining
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from bankapp.ledger import SNAPSHOT_LAG, take_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Snapshot every account's ledger balance, so balance-as-of queries only scan the "
+        "entries after the nearest snapshot. Run it periodically (e.g. nightly from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help=f"ISO datetime to snapshot at (default: now minus {SNAPSHOT_LAG}).")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            as_of = parse_datetime(options['as_of'])
+            if as_of is None:
+                raise CommandError("--as-of must be an ISO datetime, e.g. 2026-01-31T23:59:59")
+            if timezone.is_naive(as_of):
+                as_of = timezone.make_aware(as_of)
+
+        written = take_snapshots(as_of, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} balance snapshots."))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('transaction_type', models.CharField(max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('credit_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debit_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_aggregates', to='bankapp.account')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'month', 'transaction_type'), name='unique_monthly_aggregate')],
+            },
+        ),
+    ]
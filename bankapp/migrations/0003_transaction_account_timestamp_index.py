@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0002_monthlyaggregate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'timestamp', 'id'], name='txn_account_timestamp_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0004_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(unique=True)),
+                ('status', models.CharField(choices=[('Running', 'Running'), ('Completed', 'Completed')], default='Running', max_length=10)),
+                ('last_account_id', models.BigIntegerField(default=0)),
+                ('accounts_processed', models.PositiveIntegerField(default=0)),
+                ('total_interest', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0005_interestrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanRepaymentRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_date', models.DateField(unique=True)),
+                ('status', models.CharField(choices=[('Running', 'Running'), ('Completed', 'Completed')], default='Running', max_length=10)),
+                ('last_loan_id', models.BigIntegerField(default=0)),
+                ('loans_processed', models.PositiveIntegerField(default=0)),
+                ('loans_repaid', models.PositiveIntegerField(default=0)),
+                ('loans_pending', models.PositiveIntegerField(default=0)),
+                ('total_collected', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
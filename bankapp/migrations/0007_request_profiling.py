@@ -0,0 +1,48 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0006_loanrepaymentrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=100, unique=True)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('total_db_ms', models.FloatField(default=0)),
+                ('total_template_ms', models.FloatField(default=0)),
+                ('total_facade_ms', models.FloatField(default=0)),
+                ('total_queries', models.PositiveIntegerField(default=0)),
+                ('max_queries', models.PositiveIntegerField(default=0)),
+                ('duplicate_query_requests', models.PositiveIntegerField(default=0)),
+                ('le_10ms', models.PositiveIntegerField(default=0)),
+                ('le_50ms', models.PositiveIntegerField(default=0)),
+                ('le_100ms', models.PositiveIntegerField(default=0)),
+                ('le_250ms', models.PositiveIntegerField(default=0)),
+                ('le_500ms', models.PositiveIntegerField(default=0)),
+                ('le_1000ms', models.PositiveIntegerField(default=0)),
+                ('gt_1000ms', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SlowRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=100)),
+                ('path', models.CharField(max_length=255)),
+                ('duration_ms', models.FloatField()),
+                ('queries', models.PositiveIntegerField()),
+                ('db_ms', models.FloatField()),
+                ('duplicate_queries', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
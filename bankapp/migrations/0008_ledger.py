@@ -0,0 +1,42 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0007_request_profiling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='bankapp.account')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'as_of'), name='unique_balance_snapshot')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('journal', models.UUIDField(db_index=True)),
+                ('book', models.CharField(choices=[('Customer', 'Customer'), ('Cash', 'Cash'), ('Interest', 'Interest'), ('Loans', 'Loans'), ('Recharge', 'Recharge'), ('Opening', 'Opening Balance')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='bankapp.account')),
+                ('transaction', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='bankapp.transaction')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', 'created_at'], name='ledger_account_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+def create_sequence(apps, schema_editor):
+    apps.get_model('bankapp', 'AccountNumberSequence').objects.get_or_create(name='account_number')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0008_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True)),
+                ('next_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0009_account_number_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=50)),
+                ('run_key', models.CharField(max_length=50)),
+                ('low', models.BigIntegerField()),
+                ('high', models.BigIntegerField(blank=True, null=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Completed', 'Completed'), ('Failed', 'Failed')], default='Pending', max_length=10)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('succeeded', models.PositiveIntegerField(default=0)),
+                ('deferred', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('job', 'run_key', 'low'), name='unique_batch_shard')],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:36
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+
+def reclassify_recharges(apps, schema_editor):
+    """
+    The dashboard used to spot recharges by 'Recharge' in the description, so
+    any recharge stored under another type was counted twice. Move those rows to
+    'Mobile Recharge' and rebuild the monthly rollups of the accounts involved.
+    """
+    Transaction = apps.get_model('bankapp', 'Transaction')
+    MonthlyAggregate = apps.get_model('bankapp', 'MonthlyAggregate')
+
+    legacy = Transaction.objects.filter(description__contains='Recharge').exclude(transaction_type='Mobile Recharge')
+    account_ids = list(legacy.values_list('account_id', flat=True).distinct())
+    if not account_ids:
+        return
+    legacy.update(transaction_type='Mobile Recharge')
+
+    money = DecimalField(max_digits=14, decimal_places=2)
+    for start in range(0, len(account_ids), 500):
+        chunk = account_ids[start:start + 500]
+        grouped = (
+            Transaction.objects.filter(account_id__in=chunk)
+            .annotate(month=TruncMonth('timestamp'))
+            .values('account_id', 'month', 'transaction_type')
+            .annotate(
+                txn_count=Count('id'),
+                credits=Sum(Case(When(amount__gt=0, then=F('amount')), default=Value(0), output_field=money)),
+                debits=Sum(Case(When(amount__lt=0, then=F('amount')), default=Value(0), output_field=money)),
+            )
+            .order_by()
+        )
+        rows = [
+            MonthlyAggregate(
+                account_id=row['account_id'],
+                month=(row['month'].date() if hasattr(row['month'], 'date') else row['month']).replace(day=1),
+                transaction_type=row['transaction_type'],
+                count=row['txn_count'],
+                credit_total=row['credits'] or Decimal('0.00'),
+                debit_total=row['debits'] or Decimal('0.00'),
+            )
+            for row in grouped
+        ]
+        MonthlyAggregate.objects.filter(account_id__in=chunk).delete()
+        MonthlyAggregate.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0010_batchshard'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('Deposit', 'Deposit'), ('Withdrawal', 'Withdrawal'), ('Transfer', 'Transfer'), ('Mobile Recharge', 'Mobile Recharge')], max_length=20),
+        ),
+        # Not reversible in a meaningful way: the original (wrong) types aren't kept
+        migrations.RunPython(reclassify_recharges, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:44
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Substr
+
+
+def backfill_counterparty(apps, schema_editor):
+    # Transfers have always been described as "Sent to <number>" / "Received from <number>"
+    Transaction = apps.get_model('bankapp', 'Transaction')
+    transfers = Transaction.objects.filter(transaction_type='Transfer', counterparty='')
+    transfers.filter(description__startswith='Sent to ').update(
+        counterparty=Substr(F('description'), len('Sent to ') + 1, 20)
+    )
+    transfers.filter(description__startswith='Received from ').update(
+        counterparty=Substr(F('description'), len('Received from ') + 1, 20)
+    )
+
+
+def add_fulltext_index(apps, schema_editor):
+    # MySQL maintains a FULLTEXT index itself; on SQLite bankapp.search keeps an FTS5 table instead
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE bankapp_transaction ADD FULLTEXT INDEX txn_description_ft (description)')
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE bankapp_transaction DROP INDEX txn_description_ft')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0012_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='counterparty',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        # Before the indexes, so the backfill doesn't have to maintain them row by row
+        migrations.RunPython(backfill_counterparty, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'transaction_type', 'timestamp', 'id'], name='txn_account_type_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['counterparty', 'timestamp', 'id'], name='txn_counterparty_time_idx'),
+        ),
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.10 on 2026-10-18 16:39
+
+import calendar
+from decimal import Decimal
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _split(total, parts):
+    share = total // parts
+    return [share] * (parts - 1) + [total - share * (parts - 1)]
+
+
+def schedule_open_loans(apps, schema_editor):
+    """
+    Approved loans used to be collected in full by the next nightly run. Give
+    each open one a schedule instead: what it still owes in monthly installments
+    until its due date, or a single installment due today if that has passed.
+    """
+    Loan = apps.get_model('bankapp', 'Loan')
+    LoanInstallment = apps.get_model('bankapp', 'LoanInstallment')
+    today = timezone.localdate()
+    rows = []
+    for loan in Loan.objects.filter(status='Approved', balance_remaining__gt=0).iterator(chunk_size=2000):
+        due = timezone.localtime(loan.due_date).date() if loan.due_date else today
+        count = max(1, (due.year - today.year) * 12 + due.month - today.month)
+        balance = int(loan.balance_remaining * 100)
+        interest = int((loan.balance_remaining * loan.interest_rate / (1 + loan.interest_rate) * 100).to_integral_value())
+        for number, (amount, part) in enumerate(zip(_split(balance, count), _split(interest, count)), start=1):
+            rows.append(LoanInstallment(
+                loan_id=loan.id, account_id=loan.account_id, number=number,
+                # Never later than the loan's own due date
+                due_date=min(_add_months(today, number), due) if due > today else today,
+                amount=Decimal(amount) / 100, interest=Decimal(part) / 100, principal=Decimal(amount - part) / 100,
+            ))
+        if len(rows) >= 5000:
+            LoanInstallment.objects.bulk_create(rows)
+            rows = []
+    LoanInstallment.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0014_archivesegment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanInstallment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField()),
+                ('due_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('principal', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('interest', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(choices=[('Due', 'Due'), ('Paid', 'Paid')], default='Due', max_length=10)),
+                ('paid_on', models.DateTimeField(blank=True, null=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loan_installments', to='bankapp.account')),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='bankapp.loan')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'due_date'], name='installment_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('loan', 'number'), name='unique_loan_installment')],
+            },
+        ),
+        migrations.RunPython(schedule_open_loans, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:01
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Concat
+
+
+def key_shards_by_account_type(apps, schema_editor):
+    """
+    Accrual shards used to be keyed by the period alone, so the second account
+    type accrued in a month found the first one's finished run. Earlier runs
+    were all Savings (the command's only type); key their shards that way.
+    """
+    BatchShard = apps.get_model('bankapp', 'BatchShard')
+    BatchShard.objects.filter(job='accrue_interest').exclude(run_key__contains=':').update(
+        run_key=Concat('run_key', Value(':Savings')),
+    )
+
+
+def unkey_shards(apps, schema_editor):
+    BatchShard = apps.get_model('bankapp', 'BatchShard')
+    for shard in BatchShard.objects.filter(job='accrue_interest', run_key__endswith=':Savings'):
+        shard.run_key = shard.run_key.rsplit(':', 1)[0]
+        shard.save(update_fields=['run_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0015_loaninstallment'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='interestrun',
+            name='last_account_id',
+        ),
+        migrations.RemoveField(
+            model_name='loanrepaymentrun',
+            name='last_loan_id',
+        ),
+        migrations.AddField(
+            model_name='interestrun',
+            name='account_type',
+            field=models.CharField(choices=[('Savings', 'Savings'), ('Current', 'Current')], default='Savings', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='interestrun',
+            name='period',
+            field=models.DateField(),
+        ),
+        migrations.AddConstraint(
+            model_name='interestrun',
+            constraint=models.UniqueConstraint(fields=('period', 'account_type'), name='unique_interest_run'),
+        ),
+        migrations.RunPython(key_shards_by_account_type, unkey_shards),
+    ]
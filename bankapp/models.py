@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from decimal import Decimal
+from django.utils import timezone
 
 class Account(models.Model):
     id = models.BigAutoField(primary_key=True)
@@ -24,13 +25,28 @@ class Account(models.Model):
 
 
 class Transaction(models.Model):
-    TRANSACTION_TYPES = [('Deposit', 'Deposit'), ('Withdrawal', 'Withdrawal'), ('Transfer', 'Transfer')]
+    TRANSACTION_TYPES = [
+        ('Deposit', 'Deposit'), ('Withdrawal', 'Withdrawal'), ('Transfer', 'Transfer'),
+        ('Mobile Recharge', 'Mobile Recharge'),
+    ]
     
     account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='transactions')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     timestamp = models.DateTimeField(auto_now_add=True)
     description = models.CharField(max_length=255)
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
+    # Account number on the other side of a transfer, blank otherwise
+    counterparty = models.CharField(max_length=20, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Serves the newest-first keyset pagination over an account's history
+            models.Index(fields=['account', 'timestamp', 'id'], name='txn_account_timestamp_idx'),
+            # History filtered by type, same order
+            models.Index(fields=['account', 'transaction_type', 'timestamp', 'id'], name='txn_account_type_time_idx'),
+            # Transfers to/from an account number, across all accounts (staff search)
+            models.Index(fields=['counterparty', 'timestamp', 'id'], name='txn_counterparty_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type} ${self.amount} - {self.account.user.username}"
@@ -53,6 +69,38 @@ class Loan(models.Model):
     def __str__(self):
         return f"{self.scheme} Loan - {self.account.user.username} - ${self.principal_amount}"
 
+
+class LoanInstallment(models.Model):
+    """
+    One row of a loan's repayment schedule, written in bulk when the loan is
+    approved (see bankapp/amortization.py) and collected by auto_repay_loans on
+    or after its due date.
+    """
+    STATUSES = [('Due', 'Due'), ('Paid', 'Paid')]
+
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='installments')
+    # Copied from the loan, so the collector can shard and lock by account without a join
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='loan_installments')
+    number = models.PositiveSmallIntegerField()  # 1-based
+    due_date = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    principal = models.DecimalField(max_digits=12, decimal_places=2)
+    interest = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=10, choices=STATUSES, default='Due')
+    paid_on = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['loan', 'number'], name='unique_loan_installment'),
+        ]
+        indexes = [
+            # "What's due by tonight?": only unpaid rows up to the run date are read
+            models.Index(fields=['status', 'due_date'], name='installment_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.loan_id} #{self.number} due {self.due_date}: ${self.amount} - {self.status}"
+
 class MobileRecharge(models.Model):
     account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='mobile_recharges')
     phone_number = models.CharField(max_length=20)
@@ -63,3 +111,272 @@ class MobileRecharge(models.Model):
 
     def __str__(self):
         return f"{self.phone_number} - ${self.amount}"
+
+
+class MonthlyAggregate(models.Model):
+    """Per-account rollup of transactions for one calendar month and type."""
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='monthly_aggregates')
+    month = models.DateField()  # always the first day of the month
+    transaction_type = models.CharField(max_length=20)
+    count = models.PositiveIntegerField(default=0)
+    credit_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debit_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'month', 'transaction_type'], name='unique_monthly_aggregate'),
+        ]
+
+    @property
+    def net_total(self):
+        return self.credit_total + self.debit_total
+
+    def __str__(self):
+        return f"{self.account_id} {self.month:%b %Y} {self.transaction_type}: {self.count}"
+
+
+class EmailOutbox(models.Model):
+    """Transaction receipt waiting to be mailed by the send_queued_emails worker."""
+    STATUSES = [('Pending', 'Pending'), ('Sent', 'Sent'), ('Skipped', 'Skipped'), ('Failed', 'Failed')]
+
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='outbox_emails')
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=10, choices=STATUSES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Receipt for transaction {self.transaction_id} ({self.status})"
+
+
+class InterestRun(models.Model):
+    """Totals of the month-end interest accrual job; one row per period and account type."""
+    period = models.DateField()  # first day of the accrual month
+    account_type = models.CharField(max_length=10, choices=Account.ACCOUNT_TYPES, default='Savings')
+    status = models.CharField(max_length=10, choices=[('Running', 'Running'), ('Completed', 'Completed')], default='Running')
+    accounts_processed = models.PositiveIntegerField(default=0)
+    total_interest = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'account_type'], name='unique_interest_run'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_type} interest {self.period:%b %Y} - {self.status}"
+
+
+class LoanRepaymentRun(models.Model):
+    """Progress counters for one nightly auto-repayment run; the loans_* counters count installments."""
+    run_date = models.DateField(unique=True)
+    status = models.CharField(max_length=10, choices=[('Running', 'Running'), ('Completed', 'Completed')], default='Running')
+    loans_processed = models.PositiveIntegerField(default=0)
+    loans_repaid = models.PositiveIntegerField(default=0)
+    loans_pending = models.PositiveIntegerField(default=0)
+    total_collected = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Loan repayments {self.run_date} - {self.status}"
+
+
+
+class BatchShard(models.Model):
+    """
+    Checkpoint for one id range of a sharded batch job run (see bankapp/batch.py).
+    `last_id` is the job's own resume cursor; the counters are summed into the run.
+    """
+    STATUSES = [('Pending', 'Pending'), ('Running', 'Running'), ('Completed', 'Completed'), ('Failed', 'Failed')]
+
+    job = models.CharField(max_length=50)
+    run_key = models.CharField(max_length=50)
+    low = models.BigIntegerField()
+    high = models.BigIntegerField(null=True, blank=True)  # exclusive; None means no upper bound
+    last_id = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUSES, default='Pending')
+    processed = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    deferred = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'run_key', 'low'], name='unique_batch_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.job} {self.run_key} [{self.low}, {self.high}) - {self.status}"
+
+class RequestStat(models.Model):
+    """Aggregated request profile per URL name, flushed from RequestProfilingMiddleware."""
+    # Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+    LATENCY_BUCKETS = (10, 50, 100, 250, 500, 1000)
+
+    url_name = models.CharField(max_length=100, unique=True)
+    requests = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    total_db_ms = models.FloatField(default=0)
+    total_template_ms = models.FloatField(default=0)
+    total_facade_ms = models.FloatField(default=0)
+    total_queries = models.PositiveIntegerField(default=0)
+    max_queries = models.PositiveIntegerField(default=0)
+    duplicate_query_requests = models.PositiveIntegerField(default=0)
+    le_10ms = models.PositiveIntegerField(default=0)
+    le_50ms = models.PositiveIntegerField(default=0)
+    le_100ms = models.PositiveIntegerField(default=0)
+    le_250ms = models.PositiveIntegerField(default=0)
+    le_500ms = models.PositiveIntegerField(default=0)
+    le_1000ms = models.PositiveIntegerField(default=0)
+    gt_1000ms = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.url_name}: {self.requests} requests"
+
+
+class SlowRequest(models.Model):
+    """A request that was slow or repeated the same query shape (likely N+1)."""
+    url_name = models.CharField(max_length=100)
+    path = models.CharField(max_length=255)
+    duration_ms = models.FloatField()
+    queries = models.PositiveIntegerField()
+    db_ms = models.FloatField()
+    duplicate_queries = models.TextField(blank=True)  # "count x shape" lines
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.path} {self.duration_ms:.0f}ms"
+
+
+class LedgerEntry(models.Model):
+    """
+    One leg of a double-entry journal. Rows are only ever inserted: the legs of
+    a journal sum to zero, customer legs carry the account, and the balancing
+    leg is booked against one of the bank's own books (cash, interest, ...).
+    """
+    BOOKS = [
+        ('Customer', 'Customer'),
+        ('Cash', 'Cash'),
+        ('Interest', 'Interest'),
+        ('Loans', 'Loans'),
+        ('Recharge', 'Recharge'),
+        ('Opening', 'Opening Balance'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    journal = models.UUIDField(db_index=True)
+    book = models.CharField(max_length=10, choices=BOOKS)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, null=True, blank=True, related_name='ledger_entries')
+    # Not a real foreign key: archived transactions must not take their ledger legs with them
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Serves balance-as-of scans: one account, a bounded created_at range
+            models.Index(fields=['account', 'created_at'], name='ledger_account_time_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries are append-only")
+
+    def __str__(self):
+        return f"{self.book} {self.amount} ({self.journal})"
+
+
+class BalanceSnapshot(models.Model):
+    """An account's ledger balance including every entry created at or before as_of."""
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='balance_snapshots')
+    as_of = models.DateTimeField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'as_of'], name='unique_balance_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} @ {self.as_of:%Y-%m-%d %H:%M}: {self.balance}"
+
+
+class AccountNumberSequence(models.Model):
+    """Counter behind account number allocation; processes reserve blocks of it at a time."""
+    name = models.CharField(max_length=30, unique=True)
+    next_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a money-moving POST, stored under the client's idempotency key so
+    a retried or double-submitted request is answered without running again
+    (see bankapp/idempotency.py). `succeeded` is None while the first request runs.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    scope = models.CharField(max_length=20)
+    key = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=64)
+    succeeded = models.BooleanField(null=True)
+    message = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.user_id})"
+
+
+class ArchiveSegment(models.Model):
+    """
+    One account's transactions for one month, moved out of the Transaction
+    table into a gzip'd JSON-lines file under ARCHIVE_DIR (see bankapp/archive.py).
+    The rows, oldest first, are the gzip member at [offset, offset + length) of `path`.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='archive_segments')
+    month = models.DateField()  # first day of the month the rows belong to
+    path = models.CharField(max_length=255)  # relative to ARCHIVE_DIR
+    offset = models.PositiveBigIntegerField()
+    length = models.PositiveBigIntegerField()
+    row_count = models.PositiveIntegerField()
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    first_at = models.DateTimeField()
+    last_at = models.DateTimeField()
+    total = models.DecimalField(max_digits=16, decimal_places=2)  # sum of the rows' amounts
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # "Does this account's archive reach back past T?" and newest-first history reads
+            models.Index(fields=['account', 'last_at'], name='archive_account_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} {self.month:%b %Y}: {self.row_count} rows in {self.path}"
@@ -0,0 +1,189 @@
+# bankapp/onboarding.py
+"""
+Opening accounts, one at a time (signup) or from a CSV (onboard_customers).
+
+Uniqueness of usernames, CNICs and account numbers is left to the database:
+rows are inserted straight away and a conflict is read off the IntegrityError,
+so there are no exists() round trips before the insert.
+"""
+import csv
+import re
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils.dateparse import parse_date
+from .account_numbers import allocator
+from .models import Account
+
+
+CSV_COLUMNS = ('username', 'email', 'account_type', 'cnic', 'date_of_birth', 'age', 'address', 'phone_number')
+ACCOUNT_TYPES = {value for value, _ in Account.ACCOUNT_TYPES}
+
+
+class DuplicateCustomer(ValueError):
+    def __init__(self, field):
+        self.field = field
+        super().__init__(f"{field} already exists")
+
+
+class OnboardingFileError(ValueError):
+    pass
+
+
+# Where each backend names the violated index; the rest of the message can
+# quote the duplicate value, which may itself contain "cnic" or "username".
+CONFLICT_KEY_PATTERNS = (
+    re.compile(r"for key '([^']+)'"),  # MySQL: Duplicate entry '...' for key 'bankapp_account.cnic'
+    re.compile(r"unique constraint failed: (\S+)"),  # SQLite: UNIQUE constraint failed: auth_user.username
+    re.compile(r'unique constraint "([^"]+)"'),  # PostgreSQL
+)
+
+
+def conflict_field(error):
+    """Which unique column an IntegrityError is about, read off the index name only."""
+    message = str(error).lower()
+    for pattern in CONFLICT_KEY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            key = match.group(1)
+            for field in ('account_number', 'cnic', 'username'):
+                if field in key:
+                    return field
+            return None
+    return None
+
+
+def _new_user(customer):
+    """An unsaved User, normalised the way create_user() does, with the row's hashed password."""
+    return User(
+        username=User.normalize_username(customer['username']),
+        email=User.objects.normalize_email(customer['email']),
+        password=customer['password'],
+    )
+
+
+def _create_account(user, customer, account_number):
+    return Account.objects.create(
+        user=user,
+        account_number=account_number,
+        account_type=customer['account_type'],
+        balance=Decimal('0.00'),
+        cnic=customer['cnic'],
+        date_of_birth=customer['date_of_birth'],
+        age=customer['age'],
+        address=customer['address'],
+        phone_number=customer['phone_number'],
+    )
+
+
+def open_account(username, email, password, account_type, cnic, date_of_birth, age, address, phone_number):
+    """Create the user and their account. Raises DuplicateCustomer('username'|'cnic')."""
+    customer = {
+        'account_type': account_type, 'cnic': cnic, 'date_of_birth': date_of_birth,
+        'age': age, 'address': address, 'phone_number': phone_number,
+    }
+    for _ in range(3):
+        # Drawn before the transaction, so a new block is never reserved while we hold locks
+        account_number = allocator.take()[0]
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username, email, password)
+                return _create_account(user, customer, account_number)
+        except IntegrityError as e:
+            field = conflict_field(e)
+            if field != 'account_number':
+                raise DuplicateCustomer(field or 'username') from e
+    raise IntegrityError("Could not allocate a free account number")
+
+
+def clean_customer_row(line):
+    """Normalise one CSV row into create() kwargs; raises ValueError with a readable message."""
+    row = {k.strip(): (v or '').strip() for k, v in line.items() if k}
+    missing = [column for column in CSV_COLUMNS if not row.get(column)]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    if row['account_type'] not in ACCOUNT_TYPES:
+        raise ValueError(f"Unknown account type {row['account_type']!r}")
+    try:
+        date_of_birth = parse_date(row['date_of_birth'])
+    except ValueError:
+        date_of_birth = None
+    if date_of_birth is None:
+        raise ValueError(f"Invalid date_of_birth {row['date_of_birth']!r}")
+    if not row['age'].isdigit():
+        raise ValueError(f"Invalid age {row['age']!r}")
+
+    return {
+        'username': row['username'][:150],
+        'email': row['email'],
+        # Imported customers set a password through the reset flow unless one is given
+        'password': make_password(row.get('password') or None),
+        'account_type': row['account_type'],
+        'cnic': row['cnic'],
+        'date_of_birth': date_of_birth,
+        'age': int(row['age']),
+        'address': row['address'],
+        'phone_number': row['phone_number'],
+    }
+
+
+def read_customer_csv(f):
+    """Yield (line_number, row dict) from an open CSV file with a header row."""
+    reader = csv.DictReader(f)
+    if not reader.fieldnames or not set(CSV_COLUMNS) <= {name.strip() for name in reader.fieldnames}:
+        raise OnboardingFileError(f"CSV must have columns: {', '.join(CSV_COLUMNS)}")
+    for line in reader:
+        yield reader.line_num, line
+
+
+def _bulk_create(customers, numbers):
+    with transaction.atomic():
+        users = User.objects.bulk_create([_new_user(c) for c in customers])
+        # Fetched back by username because MySQL doesn't return ids from bulk inserts
+        user_ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+        Account.objects.bulk_create([
+            Account(
+                user_id=user_ids[u.username], account_number=number, account_type=c['account_type'],
+                balance=Decimal('0.00'), cnic=c['cnic'], date_of_birth=c['date_of_birth'], age=c['age'],
+                address=c['address'], phone_number=c['phone_number'],
+            )
+            for c, u, number in zip(customers, users, numbers)
+        ])
+
+
+def onboard_chunk(lines):
+    """
+    Open accounts for a list of (line_number, csv row) pairs. The whole chunk is
+    tried as two bulk inserts; if the database rejects it, rows are retried one
+    by one so each conflict is pinned to its row. Returns a result dict per row.
+    """
+    results, customers = [], []
+    for line_number, line in lines:
+        result = {'line': line_number, 'username': (line.get('username') or '').strip(), 'account_number': '',
+                  'status': 'Failed', 'message': ''}
+        results.append(result)
+        try:
+            customers.append((result, clean_customer_row(line)))
+        except ValueError as e:
+            result['message'] = str(e)
+
+    numbers = allocator.take(len(customers)) if customers else []
+    try:
+        _bulk_create([c for _, c in customers], numbers)
+        for (result, _), number in zip(customers, numbers):
+            result.update(status='Success', account_number=number, message="Account opened")
+        return results
+    except IntegrityError:
+        pass
+
+    for (result, customer), number in zip(customers, numbers):
+        try:
+            with transaction.atomic():
+                user = _new_user(customer)
+                user.save()
+                _create_account(user, customer, number)
+            result.update(status='Success', account_number=number, message="Account opened")
+        except IntegrityError as e:
+            result['message'] = f"{conflict_field(e) or 'Row'} already exists"
+    return results
@@ -0,0 +1,140 @@
+# bankapp/outbox.py
+from datetime import timedelta
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import EmailOutbox
+from .utils import build_transaction_emails
+
+
+MAX_ATTEMPTS = 5
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def enqueue_transaction_email(txn):
+    """
+    Queue a receipt for a transaction. Call inside the facade's atomic block:
+    the row commits (or rolls back) together with the money movement.
+    """
+    return EmailOutbox.objects.create(transaction=txn, balance_after=txn.account.balance)
+
+
+def enqueue_transaction_emails(txns):
+    """
+    Queue receipts for many saved transactions with one bulk insert. A txn may
+    carry a `balance_after` attribute when several hit the same account in a batch.
+    """
+    return EmailOutbox.objects.bulk_create([
+        EmailOutbox(transaction=txn, balance_after=getattr(txn, 'balance_after', txn.account.balance))
+        for txn in txns
+    ], batch_size=1000)
+
+
+def backoff_delay(attempts):
+    return timedelta(seconds=min(BASE_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to batch_size due rows. The lease pushes next_attempt_at forward so
+    other workers skip them; a crashed worker's rows become due again afterwards.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        EmailOutbox.objects.filter(id__in=ids).update(next_attempt_at=now + CLAIM_LEASE)
+
+    return list(
+        EmailOutbox.objects.filter(id__in=ids)
+        .select_related('transaction__account__user')
+        .order_by('id')
+    )
+
+
+def _retry_later(entry, error, max_attempts, stats):
+    """Count a failed attempt: back off, or give up after max_attempts."""
+    entry.attempts += 1
+    entry.last_error = str(error)
+    if entry.attempts >= max_attempts:
+        entry.status = 'Failed'
+        stats['failed'] += 1
+    else:
+        entry.next_attempt_at = timezone.now() + backoff_delay(entry.attempts)
+        stats['retried'] += 1
+    entry.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error'])
+
+
+def _skip(entry, stats):
+    entry.status = 'Skipped'
+    entry.save(update_fields=['status'])
+    stats['skipped'] += 1
+
+
+def _open(connection, pending, max_attempts, stats):
+    """
+    Open the mail connection. If the server can't be reached, every entry still
+    `pending` counts a failed attempt (so max_attempts and backoff apply to
+    outages too) instead of sitting leased until CLAIM_LEASE runs out.
+    """
+    try:
+        connection.open()
+        return True
+    except OSError as e:  # smtplib.SMTPException is an OSError too
+        for entry, email in pending:
+            if email is None:
+                _skip(entry, stats)
+            else:
+                _retry_later(entry, e, max_attempts, stats)
+        return False
+
+
+def drain_outbox(batch_size=100, max_attempts=MAX_ATTEMPTS):
+    """
+    Send one batch of due receipts over a single mail connection.
+    Returns a dict with sent/skipped/retried/failed counts.
+    """
+    stats = {'sent': 0, 'skipped': 0, 'retried': 0, 'failed': 0}
+    entries = claim_batch(batch_size)
+    if not entries:
+        return stats
+
+    connection = get_connection(fail_silently=False)
+    # The whole batch is rendered in one pass (claim_batch already joined account and user)
+    emails = build_transaction_emails(
+        [entry.transaction for entry in entries], [entry.balance_after for entry in entries], connection=connection,
+    )
+    batch = list(zip(entries, emails))
+    try:
+        if not _open(connection, batch, max_attempts, stats):
+            return stats
+        for i, (entry, email) in enumerate(batch):
+            if email is None:
+                _skip(entry, stats)
+                continue
+
+            try:
+                email.send(fail_silently=False)
+            except Exception as e:
+                _retry_later(entry, e, max_attempts, stats)
+                # The connection may be half-broken after an error; start a fresh one
+                connection.close()
+                if not _open(connection, batch[i + 1:], max_attempts, stats):
+                    return stats
+                continue
+
+            entry.attempts += 1
+            entry.status = 'Sent'
+            entry.sent_at = timezone.now()
+            entry.save(update_fields=['status', 'attempts', 'sent_at'])
+            stats['sent'] += 1
+    finally:
+        connection.close()
+
+    return stats
@@ -0,0 +1,112 @@
+# bankapp/pagination.py
+import base64
+import binascii
+from datetime import datetime, time, timedelta
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(txn):
+    """Opaque cursor pointing just past the given transaction in (-timestamp, -id) order."""
+    raw = f"{txn.timestamp.isoformat()}|{txn.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        stamp, pk = raw.rsplit('|', 1)
+        timestamp = parse_datetime(stamp)
+        if timestamp is None:
+            raise ValueError(stamp)
+        return timestamp, int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor("Invalid pagination cursor")
+
+
+def date_range_bounds(start_date, end_date):
+    """
+    Turn inclusive 'YYYY-MM-DD' strings into aware [start, end) datetimes.
+    Either side is None when missing or unparseable.
+    """
+    def parse(value):
+        try:
+            return parse_date(value) if value else None
+        except ValueError:  # well-formed but impossible, e.g. 2026-02-31
+            return None
+
+    start, end = parse(start_date), parse(end_date)
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)) if start else None,
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)) if end else None,
+    )
+
+
+def filter_by_date_range(queryset, start_date, end_date):
+    """
+    Inclusive date filter written as a plain timestamp range so the
+    (account, timestamp) index is used instead of casting the column to a date.
+    """
+    start, end = date_range_bounds(start_date, end_date)
+    if start:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end:
+        queryset = queryset.filter(timestamp__lt=end)
+    return queryset
+
+
+class KeysetPage:
+    """One page of transactions plus the cursor needed to fetch the next one."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _page_query(queryset, cursor, page_size):
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    queryset = queryset.order_by('-timestamp', '-id')
+
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+    return queryset[:page_size + 1], page_size
+
+
+def _make_page(rows, page_size):
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return KeysetPage(rows[:page_size], next_cursor)
+
+
+def paginate_transactions(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Newest-first keyset pagination. Each page is a single indexed range scan
+    of at most page_size + 1 rows no matter how deep the cursor is.
+    """
+    query, page_size = _page_query(queryset, cursor, page_size)
+    return _make_page(list(query), page_size)
+
+
+async def apaginate_transactions(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """paginate_transactions on the async ORM."""
+    query, page_size = _page_query(queryset, cursor, page_size)
+    return _make_page([txn async for txn in query], page_size)
@@ -0,0 +1,54 @@
+# bankapp/posting.py
+from collections import defaultdict
+from django.db import connection
+from django.db.models import Max
+from .aggregates import record_transactions
+from .ledger import record_ledger
+from .models import Transaction
+from .outbox import enqueue_transaction_emails
+
+
+def bulk_insert_transactions(txns, batch_size=1000):
+    """
+    bulk_create Transaction rows and make sure every object ends up with its id,
+    even on backends (MySQL) that don't return primary keys from bulk inserts.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return Transaction.objects.bulk_create(txns, batch_size=batch_size)
+
+    last_id = Transaction.objects.aggregate(last=Max('id'))['last'] or 0
+    Transaction.objects.bulk_create(txns, batch_size=batch_size)
+
+    # Match the new rows back to the objects; identical (account, amount, description)
+    # rows are interchangeable so the order within a bucket doesn't matter.
+    pending = defaultdict(list)
+    for txn in txns:
+        pending[(txn.account_id, txn.amount, txn.description)].append(txn)
+    rows = (
+        Transaction.objects.filter(account_id__in={txn.account_id for txn in txns}, id__gt=last_id)
+        .order_by('id')
+        .values_list('id', 'account_id', 'amount', 'description')
+    )
+    for pk, account_id, amount, description in rows.iterator(chunk_size=batch_size):
+        bucket = pending.get((account_id, amount, description))
+        if bucket:
+            txn = bucket.pop(0)
+            txn.id = pk
+            txn._state.adding = False
+    return txns
+
+
+def post_transactions(txns, batch_size=1000, contra_book='Cash'):
+    """
+    Insert a batch of Transaction objects and apply the same side effects the
+    single-row facades do: one ledger journal (balanced against contra_book),
+    monthly rollups and queued receipt emails.
+    Call inside the atomic block that holds the affected account locks.
+    """
+    if not txns:
+        return txns
+    bulk_insert_transactions(txns, batch_size)
+    record_ledger(txns, contra_book, batch_size)
+    record_transactions(txns)
+    enqueue_transaction_emails(txns)
+    return txns
@@ -0,0 +1,269 @@
+# bankapp/profiling.py
+"""
+Per-request profiling: query count, DB time, template render time and facade
+time for every request, plus detection of repeated query shapes (N+1).
+
+Numbers are aggregated in-process per URL name and flushed to RequestStat /
+SlowRequest every REQUEST_PROFILING_FLUSH_SECONDS, so the request_stats command
+and the staff-only JSON endpoint can see every worker's data.
+"""
+import functools
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.template.backends.django import Template as DjangoTemplate
+from .models import RequestStat, SlowRequest
+
+
+_current = ContextVar('request_profile', default=None)
+
+# Most slow/N+1 requests a snapshot will list
+MAX_SLOW_LIMIT = 200
+
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r"IN \((?:\?|%s)(?:, (?:\?|%s))*\)")
+
+
+def query_shape(sql):
+    """SQL with literals and IN-lists collapsed, so repeated lookups compare equal."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.facade_ms = 0.0
+        self.shapes = Counter()
+        self.template_depth = 0
+        self.facade_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.shapes[query_shape(sql)] += 1
+
+    def duplicates(self):
+        threshold = getattr(settings, 'DUPLICATE_QUERY_THRESHOLD', 3)
+        return [(count, shape) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def _timed(attr, depth_attr):
+    """Add the wall time of the outermost call to the current profile's `attr`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            setattr(profile, depth_attr, getattr(profile, depth_attr) + 1)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                depth = getattr(profile, depth_attr) - 1
+                setattr(profile, depth_attr, depth)
+                if depth == 0:
+                    setattr(profile, attr, getattr(profile, attr) + (time.perf_counter() - started) * 1000)
+        return wrapper
+    return decorator
+
+
+track_facade = _timed('facade_ms', 'facade_depth')
+
+_template_patch_lock = threading.Lock()
+
+
+def _install_template_timer():
+    with _template_patch_lock:
+        if not getattr(DjangoTemplate.render, '_profiled', False):
+            DjangoTemplate.render = _timed('template_ms', 'template_depth')(DjangoTemplate.render)
+            DjangoTemplate.render._profiled = True
+
+
+class _Aggregator:
+    """In-process totals per URL name, written to the database in batches."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.stats = {}
+        self.slow = []
+        self.last_flush = time.monotonic()
+
+    def record(self, url_name, path, duration_ms, profile, duplicates):
+        slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 500)
+        with self.lock:
+            s = self.stats.setdefault(url_name, Counter())
+            s['requests'] += 1
+            s['total_ms'] += duration_ms
+            s['total_db_ms'] += profile.db_ms
+            s['total_template_ms'] += profile.template_ms
+            s['total_facade_ms'] += profile.facade_ms
+            s['total_queries'] += profile.queries
+            s['max_queries'] = max(s['max_queries'], profile.queries)
+            s['duplicate_query_requests'] += bool(duplicates)
+            s[bucket_field(duration_ms)] += 1
+            if duration_ms >= slow_ms or duplicates:
+                self.slow.append(SlowRequest(
+                    url_name=url_name, path=path[:255], duration_ms=duration_ms,
+                    queries=profile.queries, db_ms=profile.db_ms,
+                    duplicate_queries="\n".join(f"{count} x {shape}" for count, shape in duplicates),
+                ))
+
+    def due(self):
+        interval = getattr(settings, 'REQUEST_PROFILING_FLUSH_SECONDS', 30)
+        return time.monotonic() - self.last_flush >= interval
+
+    def flush(self):
+        with self.lock:
+            stats, slow = self.stats, self.slow
+            self.reset()
+        for url_name, s in stats.items():
+            increments = {field: F(field) + value for field, value in s.items() if field != 'max_queries'}
+            row, created = RequestStat.objects.get_or_create(url_name=url_name)
+            RequestStat.objects.filter(id=row.id).update(**increments)
+            RequestStat.objects.filter(id=row.id, max_queries__lt=s['max_queries']).update(max_queries=s['max_queries'])
+        if slow:
+            SlowRequest.objects.bulk_create(slow)
+            prune_slow_requests()
+
+
+def prune_slow_requests(keep=None):
+    """Delete all but the newest `keep` (SLOW_REQUEST_KEEP) SlowRequest rows."""
+    if keep is None:
+        keep = getattr(settings, 'SLOW_REQUEST_KEEP', 1000)
+    newest_pruned = SlowRequest.objects.order_by('-id').values_list('id', flat=True)[keep:keep + 1].first()
+    if newest_pruned is None:
+        return 0
+    deleted, _ = SlowRequest.objects.filter(id__lte=newest_pruned).delete()
+    return deleted
+
+
+aggregator = _Aggregator()
+
+
+def bucket_field(duration_ms):
+    for bound in RequestStat.LATENCY_BUCKETS:
+        if duration_ms <= bound:
+            return f'le_{bound}ms'
+    return f'gt_{RequestStat.LATENCY_BUCKETS[-1]}ms'
+
+
+def _profiled_execute(execute, sql, params, many, context):
+    """
+    Permanent execute wrapper on every connection. It forwards to the current
+    request's profile, which asgiref also propagates into the threads async
+    views use for ORM calls, so sync and async requests are both covered.
+    """
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+def _install_query_wrapper(sender=None, connection=connection, **kwargs):
+    if _profiled_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profiled_execute)
+
+
+class RequestProfilingMiddleware:
+    """Profiles every request; disable with REQUEST_PROFILING = False."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _install_template_timer()
+        connection_created.connect(_install_query_wrapper, dispatch_uid='bankapp.profiling')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'REQUEST_PROFILING', True):
+            return self.get_response(request)
+
+        _install_query_wrapper(connection=connection)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, profile, started)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'REQUEST_PROFILING', True):
+            return await self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        if aggregator.due():
+            await sync_to_async(self.finish)(request, profile, started)
+        else:
+            self.finish(request, profile, started, flush=False)
+        return response
+
+    def finish(self, request, profile, started, flush=True):
+        duration_ms = (time.perf_counter() - started) * 1000
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.view_name if match else None) or 'unresolved'
+        aggregator.record(url_name, request.path, duration_ms, profile, profile.duplicates())
+        if flush and aggregator.due():
+            aggregator.flush()
+
+
+def request_stats_snapshot(slow_limit=20):
+    """Aggregated stats per URL name plus the most recent slow/N+1 requests, as plain dicts."""
+    buckets = [f'le_{bound}ms' for bound in RequestStat.LATENCY_BUCKETS] + [f'gt_{RequestStat.LATENCY_BUCKETS[-1]}ms']
+    urls = []
+    for row in RequestStat.objects.order_by('-total_ms'):
+        n = row.requests or 1
+        urls.append({
+            'url_name': row.url_name,
+            'requests': row.requests,
+            'avg_ms': round(row.total_ms / n, 2),
+            'avg_db_ms': round(row.total_db_ms / n, 2),
+            'avg_template_ms': round(row.total_template_ms / n, 2),
+            'avg_facade_ms': round(row.total_facade_ms / n, 2),
+            'avg_queries': round(row.total_queries / n, 2),
+            'max_queries': row.max_queries,
+            'duplicate_query_requests': row.duplicate_query_requests,
+            'latency_histogram': {bucket: getattr(row, bucket) for bucket in buckets},
+        })
+    slow = [
+        {
+            'url_name': s.url_name, 'path': s.path, 'duration_ms': round(s.duration_ms, 2),
+            'queries': s.queries, 'db_ms': round(s.db_ms, 2),
+            'duplicate_queries': s.duplicate_queries.splitlines(), 'at': s.created_at.isoformat(),
+        }
+        for s in SlowRequest.objects.order_by('-created_at')[:max(0, min(slow_limit, MAX_SLOW_LIMIT))]
+    ]
+    return {'urls': urls, 'slow_requests': slow}
@@ -0,0 +1,196 @@
+# bankapp/search.py
+"""
+Transaction search for the history pages and the staff search API.
+
+Type, counterparty, amount and date filters are plain column filters served
+by Transaction's composite indexes ((account, type, timestamp) and
+(counterparty, timestamp)). Free text is matched against a full-text index on
+description instead of a LIKE scan:
+
+- MySQL: a FULLTEXT index (migration 0013), maintained by InnoDB itself.
+- SQLite: an external-content FTS5 table, bankapp_transaction_fts. Triggers
+  on bankapp_transaction keep it in step with every insert, update and delete,
+  in the same transaction as the facade writing the row. account_id is indexed
+  too, so a customer's search is answered from their own rows' postings
+  instead of every row in the table containing the word. ensure_search_index()
+  (run after every migrate) puts the table and triggers back if a table rebuild
+  dropped them, and reindexes.
+- Anything else falls back to icontains.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from .models import Transaction
+from .pagination import filter_by_date_range
+
+
+FTS_TABLE = 'bankapp_transaction_fts'
+FTS_TRIGGERS = {
+    'bankapp_transaction_fts_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS bankapp_transaction_fts_ai AFTER INSERT ON bankapp_transaction BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, description, account_id) VALUES (new.id, new.description, new.account_id);
+        END""",
+    'bankapp_transaction_fts_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS bankapp_transaction_fts_ad AFTER DELETE ON bankapp_transaction BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, account_id)
+                VALUES ('delete', old.id, old.description, old.account_id);
+        END""",
+    'bankapp_transaction_fts_au': f"""
+        CREATE TRIGGER IF NOT EXISTS bankapp_transaction_fts_au
+        AFTER UPDATE OF description, account_id ON bankapp_transaction BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, account_id)
+                VALUES ('delete', old.id, old.description, old.account_id);
+            INSERT INTO {FTS_TABLE}(rowid, description, account_id) VALUES (new.id, new.description, new.account_id);
+        END""",
+}
+SEARCH_PARAMS = ('q', 'type', 'counterparty', 'min_amount', 'max_amount', 'start_date', 'end_date')
+TRANSACTION_TYPES = {value for value, _ in Transaction.TRANSACTION_TYPES}
+
+
+class SearchError(ValueError):
+    pass
+
+
+def ensure_search_index(using='default'):
+    """Create the SQLite FTS5 table and triggers if any are missing and reindex. No-op elsewhere."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND name LIKE %s)",
+            [FTS_TABLE, f'{FTS_TABLE}_%'],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if existing >= {FTS_TABLE, *FTS_TRIGGERS}:
+            return False
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(description, account_id, content='bankapp_transaction', content_rowid='id')"
+        )
+        for sql in FTS_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def match_description(queryset, text, account=None):
+    """
+    Narrow a Transaction queryset to rows whose description contains every word
+    of `text`. Pass `account` when the queryset is one account's history.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # Whole words only: a prefix query would make FTS5 merge every matching term's postings first
+        terms = [f'description : "{word}"' for word in words]
+        if account is not None:
+            terms.insert(0, f'account_id : "{account.id}"')
+        query = ' AND '.join(terms)
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]))
+    if vendor == 'mysql':
+        query = ' '.join(f'+{word}' for word in words)
+        return queryset.alias(
+            description_match=RawSQL(
+                "MATCH (bankapp_transaction.description) AGAINST (%s IN BOOLEAN MODE)", [query],
+                output_field=FloatField(),
+            ),
+        ).filter(description_match__gt=0)
+
+    for word in words:
+        queryset = queryset.filter(description__icontains=word)
+    return queryset
+
+
+def _amount(params, name):
+    value = (params.get(name) or '').strip()
+    if not value:
+        return None
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise SearchError(f"Invalid {name.replace('_', ' ')} {value!r}")
+    if not amount.is_finite() or amount < 0:
+        raise SearchError(f"Invalid {name.replace('_', ' ')} {value!r}")
+    return amount
+
+
+def _criteria(params):
+    transaction_type = (params.get('type') or '').strip()
+    if transaction_type and transaction_type not in TRANSACTION_TYPES:
+        raise SearchError(f"Unknown transaction type {transaction_type!r}")
+    counterparty = (params.get('counterparty') or '').strip()
+    low, high = _amount(params, 'min_amount'), _amount(params, 'max_amount')
+    return transaction_type, counterparty, low, high, (params.get('q') or '').strip()
+
+
+def search_transactions(queryset, params, account=None):
+    """
+    Apply the search filters present in `params` (request.GET or a dict) to a
+    Transaction queryset: q (description words), type, counterparty (account
+    number), min_amount / max_amount (size of the movement, credit or debit)
+    and start_date / end_date (inclusive). `account` limits the search to that
+    account's transactions. Raises SearchError on bad values.
+    """
+    transaction_type, counterparty, low, high, text = _criteria(params)
+    if account is not None:
+        queryset = queryset.filter(account=account)
+    if transaction_type:
+        queryset = queryset.filter(transaction_type=transaction_type)
+    if counterparty:
+        queryset = queryset.filter(counterparty=counterparty)
+
+    if low is not None or high is not None:
+        credits, debits = Q(), Q()
+        if low is not None:
+            credits &= Q(amount__gte=low)
+            debits &= Q(amount__lte=-low)
+        if high is not None:
+            credits &= Q(amount__lte=high)
+            debits &= Q(amount__gte=-high)
+        queryset = queryset.filter((credits & Q(amount__gte=0)) | (debits & Q(amount__lt=0)))
+
+    queryset = filter_by_date_range(queryset, params.get('start_date'), params.get('end_date'))
+
+    if text:
+        queryset = match_description(queryset, text, account)
+    return queryset
+
+
+def search_predicate(params):
+    """
+    The same filters as search_transactions, minus the date range, as a test on
+    a single Transaction, for rows that aren't in the table (archived ones).
+    """
+    transaction_type, counterparty, low, high, text = _criteria(params)
+    words = [word.casefold() for word in re.findall(r'\w+', text)]
+
+    def matches(txn):
+        if transaction_type and txn.transaction_type != transaction_type:
+            return False
+        if counterparty and txn.counterparty != counterparty:
+            return False
+        if low is not None and abs(txn.amount) < low:
+            return False
+        if high is not None and abs(txn.amount) > high:
+            return False
+        if words:
+            # Whole words, like the full-text index
+            found = set(re.findall(r'\w+', txn.description.casefold()))
+            return all(word in found for word in words)
+        return True
+    return matches
+
+
+def search_query_string(params):
+    """The search params of a request, urlencoded, for "next page" links."""
+    query = params.copy()
+    for name in list(query):
+        if name not in SEARCH_PARAMS or not query.get(name):
+            del query[name]
+    return query.urlencode()
@@ -1,13 +1,26 @@
 # bankapp/services.py
 from .models import Account, Transaction
 from django.db import transaction
+from django.db.models import F, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from decimal import Decimal
-from .models import Account, Transaction, Loan,  MobileRecharge
+from .models import Account, Transaction, Loan, LoanInstallment, MobileRecharge, LoanRepaymentRun, BatchShard
 from django.db import transaction
 from decimal import Decimal
-from datetime import datetime
-from .utils import send_transaction_email
+from datetime import datetime, time
+from itertools import islice
+from asgiref.sync import sync_to_async
+from .outbox import enqueue_transaction_email
+from .aggregates import record_transaction
+from .ledger import record_ledger
+from .posting import post_transactions
+from .cache import get_account_id_by_number, invalidate_accounts
+from .profiling import track_facade
+from .velocity import PAYROLL_PREFIX, check_bulk_velocity, check_velocity, record_velocity
+from .batch import BatchReport, plan_shards, run_shards, run_totals, shard_filter
 from .factories import LoanFactory  # Add this import at the top
+from .amortization import add_months, schedule_installments
 
 
 # --- STRATEGY PATTERN ---
@@ -15,6 +28,11 @@ class InterestStrategy:
     def calculate(self, balance):
         pass
 
+    def calculate_many(self, balances):
+        """Interest for a whole chunk of balances, rounded to cents."""
+        cents = Decimal('0.01')
+        return [self.calculate(balance).quantize(cents) for balance in balances]
+
 class SavingsInterest(InterestStrategy):
     def calculate(self, balance):
         # Use Decimal for the rate
@@ -27,19 +45,48 @@ class CurrentInterest(InterestStrategy):
         # Always returns zero for Current Accounts to satisfy math requirements
         return Decimal('0.00')
 
+
+INTEREST_STRATEGIES = {'Savings': SavingsInterest(), 'Current': CurrentInterest()}
+
 # --- FACADE PATTERN ---
 # services.py (update deposit/withdraw/transfer)
 
-from .utils import send_transaction_email
+def lock_accounts(*account_ids):
+    """
+    SELECT ... FOR UPDATE the given accounts in ascending id order, so two
+    writers touching the same pair of accounts can never deadlock each other.
+    """
+    return Account.objects.select_for_update().filter(id__in=account_ids).order_by('id').in_bulk()
+
+
+def apply_balance_delta(account, delta):
+    """
+    Move an account's balance with one `UPDATE ... SET balance = balance + delta`.
+    Debits carry a `WHERE balance >= -delta` guard and return False if it fails.
+    Only the balance column is written; the in-memory instance is kept in step.
+    """
+    rows = Account.objects.filter(id=account.id)
+    if delta < 0:
+        rows = rows.filter(balance__gte=-delta)
+    if not rows.update(balance=F('balance') + delta):
+        return False
+    account.balance += delta
+    invalidate_accounts(account.id)
+    return True
+
 
 class BankingFacade:
     
     @staticmethod
+    @track_facade
     @transaction.atomic
-    def deposit(account_id, amount, description="Deposit"):
-        account = Account.objects.get(id=account_id)
-        account.balance += amount
-        account.save()
+    def deposit(account_id, amount, description="Deposit", contra_book='Cash'):
+        # A negative "deposit" would be a withdrawal that skips the funds check
+        if amount <= 0:
+            raise ValueError("Deposit amount must be positive")
+        account = Account.objects.select_for_update().get(id=account_id)
+        if not apply_balance_delta(account, amount):
+            raise ValueError(f"Could not credit account {account_id}")
         
         txn = Transaction.objects.create(
             account=account, 
@@ -47,59 +94,171 @@ class BankingFacade:
             description=description,
             transaction_type="Deposit"
         )
+        record_ledger([txn], contra_book)
+        record_transaction(txn)
 
-        # Send email
-        send_transaction_email(txn)
+        # Queue receipt email (sent by the send_queued_emails worker)
+        enqueue_transaction_email(txn)
 
         return account
 
     @staticmethod
+    @track_facade
     @transaction.atomic
     def withdraw(account_id, amount, description="Withdrawal"):
-        account = Account.objects.get(id=account_id)
-        if account.balance >= amount:
-            account.balance -= amount
-            account.save()
+        if amount <= 0:
+            return False, "Invalid amount"
+        account = Account.objects.select_for_update().get(id=account_id)
+        refusal = check_velocity(account, 'Withdrawal', amount)
+        if refusal:
+            return False, refusal
+        if apply_balance_delta(account, -amount):
+            record_velocity(account, 'Withdrawal', amount)
             txn = Transaction.objects.create(
                 account=account, 
                 amount=-amount, 
                 description=description,
                 transaction_type="Withdrawal"
             )
-            send_transaction_email(txn)
+            record_ledger([txn])
+            record_transaction(txn)
+            enqueue_transaction_email(txn)
             return True, "Success"
         return False, "Insufficient funds"
 
     @staticmethod
+    @track_facade
     def transfer_funds(sender_id, receiver_acc_num, amount):
+        # A negative amount would turn the guarded debit into an unguarded credit
+        if amount <= 0:
+            return False, "Invalid amount"
         with transaction.atomic():
             try:
-                sender = Account.objects.get(id=sender_id)
-                receiver = Account.objects.get(account_number=receiver_acc_num)
-                
-                if sender.balance >= amount:
-                    sender.balance -= amount
-                    receiver.balance += amount
-                    sender.save()
-                    receiver.save()
+                receiver_id = get_account_id_by_number(receiver_acc_num)
+                accounts = lock_accounts(sender_id, receiver_id)
+                if sender_id not in accounts:
+                    raise Account.DoesNotExist
+                sender, receiver = accounts[sender_id], accounts[receiver_id]
+                refusal = check_velocity(sender, 'Transfer', amount)
+                if refusal:
+                    return False, refusal
+
+                if apply_balance_delta(sender, -amount):
+                    if not apply_balance_delta(receiver, amount):
+                        # Undo the sender's debit too; nothing is recorded
+                        transaction.set_rollback(True)
+                        return False, "Transfer failed"
+                    record_velocity(sender, 'Transfer', amount)
 
                     txn_sender = Transaction.objects.create(
-                        account=sender, amount=-amount, 
+                        account=sender, amount=-amount, counterparty=receiver.account_number,
                         transaction_type='Transfer', description=f"Sent to {receiver_acc_num}"
                     )
                     txn_receiver = Transaction.objects.create(
-                        account=receiver, amount=amount, 
+                        account=receiver, amount=amount, counterparty=sender.account_number,
                         transaction_type='Transfer', description=f"Received from {sender.account_number}"
                     )
+                    record_ledger([txn_sender, txn_receiver])
+                    record_transaction(txn_sender)
+                    record_transaction(txn_receiver)
 
-                    # Send emails to both
-                    send_transaction_email(txn_sender)
-                    send_transaction_email(txn_receiver)
+                    # Queue receipt emails for both
+                    enqueue_transaction_email(txn_sender)
+                    enqueue_transaction_email(txn_receiver)
 
                     return True, "Transfer Successful"
                 return False, "Insufficient funds"
             except Account.DoesNotExist:
                 return False, "Receiver account not found"
+
+    @staticmethod
+    @track_facade
+    def bulk_transfer(sender_id, rows, chunk_size=500):
+        """
+        Payroll-style batch transfer. `rows` is a list of
+        {'receiver_account': str, 'amount': Decimal or None} dicts.
+
+        Amounts must be positive whole cents. If the sender account doesn't
+        exist, every row fails with "Sender account not found".
+
+        Receivers are resolved in one query, each chunk runs in its own atomic
+        block with the sender and receivers locked in id order, and balances,
+        transactions, rollups and receipts are written with bulk queries.
+        The batch as a whole goes through BULK_VELOCITY_RULES once (see
+        bankapp/velocity.py); if they refuse it, every row fails with the
+        rule's message.
+        Returns one result dict per input row, in input order.
+        """
+        report = [
+            {'row': i, 'receiver_account': row.get('receiver_account'), 'amount': row.get('amount'),
+             'status': 'Failed', 'message': ''}
+            for i, row in enumerate(rows, start=1)
+        ]
+        receiver_ids = dict(
+            Account.objects.filter(account_number__in={r['receiver_account'] for r in report if r['receiver_account']})
+            .values_list('account_number', 'id')
+        )
+        for result in report:
+            amount = result['amount']
+            # Sub-cent amounts would be rounded silently by the DecimalField
+            if amount is None or amount <= 0 or amount != amount.quantize(Decimal('0.01')):
+                result['message'] = "Invalid amount"
+            elif result['receiver_account'] not in receiver_ids:
+                result['message'] = "Receiver account not found"
+        valid = [result for result in report if not result['message']]
+        refusal = check_bulk_velocity(sender_id, sum(result['amount'] for result in valid))
+        if refusal:
+            for result in valid:
+                result['message'] = refusal
+            return report
+
+        for start in range(0, len(report), chunk_size):
+            chunk = report[start:start + chunk_size]
+            with transaction.atomic():
+                # Deterministic lock order (by id) so concurrent batches can't deadlock
+                lock_ids = {sender_id} | {receiver_ids[r['receiver_account']] for r in chunk if r['receiver_account'] in receiver_ids}
+                accounts = lock_accounts(*lock_ids)
+                if sender_id not in accounts:
+                    for result in report[start:]:
+                        result['message'] = "Sender account not found"
+                    return report
+                sender = accounts[sender_id]
+                touched, txns = {}, []
+
+                for result in chunk:
+                    if result['message']:
+                        continue
+                    amount = result['amount']
+                    if sender.balance < amount:
+                        result['message'] = "Insufficient funds"
+                        continue
+
+                    receiver = accounts[receiver_ids[result['receiver_account']]]
+                    sender.balance -= amount
+                    receiver.balance += amount
+                    touched[sender.id] = sender
+                    touched[receiver.id] = receiver
+
+                    txn_sender = Transaction(
+                        account=sender, amount=-amount, counterparty=receiver.account_number,
+                        transaction_type='Transfer', description=f"{PAYROLL_PREFIX}{receiver.account_number}"
+                    )
+                    txn_sender.balance_after = sender.balance
+                    txn_receiver = Transaction(
+                        account=receiver, amount=amount, counterparty=sender.account_number,
+                        transaction_type='Transfer', description=f"Received from {sender.account_number}"
+                    )
+                    txn_receiver.balance_after = receiver.balance
+                    txns += [txn_sender, txn_receiver]
+
+                    result['status'] = 'Success'
+                    result['message'] = "Transfer Successful"
+
+                Account.objects.bulk_update(touched.values(), ['balance'], batch_size=chunk_size)
+                invalidate_accounts(*touched)
+                post_transactions(txns)
+
+        return report
  
             
 
@@ -122,21 +281,47 @@ class LoanEvaluationStrategy:
         """Return True if loan can be approved, False otherwise"""
         raise NotImplementedError
 
+    def evaluate_many(self, accounts, requested_amount):
+        """Return {account_id: bool} for a batch of accounts."""
+        return {account.id: self.evaluate(account, requested_amount) for account in accounts}
+
 
 class BasicHistoryEvaluation(LoanEvaluationStrategy):
     """Approve based on deposits in the last 6 months."""
-    def evaluate(self, account, requested_amount):
-        six_months_ago = datetime.now() - timedelta(days=180)
-        last_6_months = Transaction.objects.filter(
-            account=account,
-            timestamp__gte=six_months_ago
-        )
-        total_deposits = sum(t.amount for t in last_6_months if t.amount > 0)
+    HISTORY_DAYS = 180
+
+    def deposits_since(self):
+        return timezone.now() - timedelta(days=self.HISTORY_DAYS)
+
+    def is_eligible(self, total_deposits, account, requested_amount):
         avg_balance = account.balance
 
         # Approve if deposits + current balance >= 50% of requested amount
         return (total_deposits + avg_balance) >= (requested_amount / 2)
 
+    def evaluate(self, account, requested_amount):
+        # Summed in the database over the (account, timestamp) index
+        total_deposits = Transaction.objects.filter(
+            account=account,
+            timestamp__gte=self.deposits_since(),
+            amount__gt=0,
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        return self.is_eligible(total_deposits, account, requested_amount)
+
+    def evaluate_many(self, accounts, requested_amount):
+        # One GROUP BY query for the whole batch
+        deposits = dict(
+            Transaction.objects.filter(
+                account_id__in=[account.id for account in accounts],
+                timestamp__gte=self.deposits_since(),
+                amount__gt=0,
+            ).values('account_id').annotate(total=Sum('amount')).order_by().values_list('account_id', 'total')
+        )
+        return {
+            account.id: self.is_eligible(deposits.get(account.id, Decimal('0.00')), account, requested_amount)
+            for account in accounts
+        }
+
 
 class HighBalanceEvaluation(LoanEvaluationStrategy):
     """Approve small loans automatically if the account balance is high."""
@@ -144,19 +329,25 @@ class HighBalanceEvaluation(LoanEvaluationStrategy):
         return account.balance >= 1000 and requested_amount <= 5000
 
 
+# Strategies are stateless, so one shared list serves every evaluation.
+# The cheap in-memory check goes first so it can short-circuit the query.
+LOAN_EVALUATION_STRATEGIES = (HighBalanceEvaluation(), BasicHistoryEvaluation())
+
+
 from .factories import LoanFactory  # Add this import at the top
 
 class LoanFacade:
     
-    # Predefined loan schemes
+    # Predefined loan schemes; `installments` are monthly and cover return_days to within a few days
     LOAN_SCHEMES = {
-        'Personal': {"max_amount": 5000, "interest_rate": 0.07, "return_days": 180},
-        'Car': {"max_amount": 20000, "interest_rate": 0.08, "return_days": 365},
-        'Home': {"max_amount": 100000, "interest_rate": 0.06, "return_days": 3650},  # 10 years
-        'Education': {"max_amount": 15000, "interest_rate": 0.05, "return_days": 730},  # 2 years
+        'Personal': {"max_amount": 5000, "interest_rate": 0.07, "return_days": 180, "installments": 6},
+        'Car': {"max_amount": 20000, "interest_rate": 0.08, "return_days": 365, "installments": 12},
+        'Home': {"max_amount": 100000, "interest_rate": 0.06, "return_days": 3650, "installments": 120},  # 10 years
+        'Education': {"max_amount": 15000, "interest_rate": 0.05, "return_days": 730, "installments": 24},  # 2 years
     }
     
     @staticmethod
+    @track_facade
     @transaction.atomic
     def apply_loan(account_id, scheme_name):
         account = Account.objects.get(id=account_id)
@@ -172,21 +363,24 @@ class LoanFacade:
         # ---------------------------------------------------------
 
         # --- Evaluate using existing strategies ---
-        strategies = [BasicHistoryEvaluation(), HighBalanceEvaluation()]
-        approved = any(s.evaluate(account, scheme["max_amount"]) for s in strategies)
+        approved = any(s.evaluate(account, scheme["max_amount"]) for s in LOAN_EVALUATION_STRATEGIES)
 
+        today = timezone.localdate()
         if approved:
             loan.status = 'Approved'
             loan.approved_amount = Decimal(scheme["max_amount"])
-            loan.interest_rate = Decimal(scheme["interest_rate"])
-            loan.balance_remaining = loan.approved_amount * (1 + loan.interest_rate)
+            # Through str, so the rate is exactly 0.07 rather than the float's binary expansion
+            loan.interest_rate = Decimal(str(scheme["interest_rate"]))
+            loan.balance_remaining = (loan.approved_amount * (1 + loan.interest_rate)).quantize(Decimal('0.01'))
             loan.remarks = "Approved automatically based on history and balance"
-            loan.due_date = datetime.now() + timedelta(days=scheme["return_days"])
+            # Due with the last monthly installment
+            loan.due_date = timezone.make_aware(datetime.combine(add_months(today, scheme["installments"]), time.min))
 
             BankingFacade.deposit(
                 account_id,
                 loan.approved_amount,
-                description=f"{scheme_name} Loan Credit"
+                description=f"{scheme_name} Loan Credit",
+                contra_book='Loans',
             )
         else:
             loan.status = 'Rejected'
@@ -195,39 +389,180 @@ class LoanFacade:
             loan.balance_remaining = Decimal('0.00')
             loan.remarks = "Rejected due to insufficient history or balance"
 
-        loan.reviewed_on = datetime.now()
+        loan.reviewed_on = timezone.now()
         loan.save()
+        if approved:
+            LoanInstallment.objects.bulk_create(schedule_installments([loan], today, scheme["installments"]))
         return loan
 
+    @staticmethod
+    @track_facade
+    def evaluate_many(accounts, requested_amount, chunk_size=1000):
+        """
+        Score many accounts for a loan of requested_amount, e.g. for a pre-approval
+        campaign. Accounts are handled chunk_size at a time and each strategy only
+        sees the accounts the previous ones didn't approve, so a chunk costs at most
+        one query per strategy. Returns {account_id: bool}.
+        """
+        results = {}
+        if hasattr(accounts, 'iterator'):
+            accounts = accounts.iterator(chunk_size=chunk_size)
+        accounts = iter(accounts)
+        while True:
+            chunk = list(islice(accounts, chunk_size))
+            if not chunk:
+                return results
+            undecided = chunk
+            for strategy in LOAN_EVALUATION_STRATEGIES:
+                if not undecided:
+                    break
+                verdicts = strategy.evaluate_many(undecided, requested_amount)
+                undecided = [account for account in undecided if not verdicts[account.id]]
+            undecided_ids = {account.id for account in undecided}
+            for account in chunk:
+                results[account.id] = account.id not in undecided_ids
+
     @staticmethod
     def get_pending_loans():
         """Return all pending loans for admin review (if admin implemented)."""
         return Loan.objects.filter(status='Pending').order_by('applied_on')
 
     @staticmethod
-    def auto_repay_loans():
+    @track_facade
+    def auto_repay_loans(run_date=None, chunk_size=500, progress=None, workers=1, shards=None, loans=None):
         """
-        Check all approved loans:
-        - Deduct repayment if account balance sufficient
-        - If not enough, mark pending_repayment=True
+        Collect every installment due on or before run_date (see
+        bankapp/amortization.py):
+        - Deduct it if the account balance is sufficient
+        - If not, leave it due (tomorrow's run tries again) and mark the loan
+          pending_repayment=True
+
+        Only unpaid installments up to run_date are read, so a run costs what is
+        due, not what is lent. Installments are sharded by account id range (see
+        bankapp/batch.py) and each shard runs repay_loans_shard, in `workers`
+        processes. Shards never share an account, so they can't contend for the
+        same rows. Every chunk commits with its shard checkpoint, so an
+        interrupted run for run_date picks up after the last committed chunk of
+        each shard. The run's counters count installments. `progress` is called
+        with each finished ShardResult; the merged BatchReport is returned as
+        `.report`. `loans` optionally narrows the Loan queryset (used by the
+        benchmark).
         """
-        loans = Loan.objects.filter(status='Approved', balance_remaining__gt=0)
-        for loan in loans:
-            account = loan.account
-            repayment_amount = loan.balance_remaining
-            if account.balance >= repayment_amount:
-                # Deduct repayment
-                BankingFacade.withdraw(
-                    account.id,
-                    repayment_amount,
-                    description=f"Loan Repayment: {loan.scheme}"
-                )
-                loan.balance_remaining = Decimal('0.00')
-                loan.status = 'Closed'
-                loan.pending_repayment = False
-            else:
-                loan.pending_repayment = True
-            loan.save()
+        run_date = run_date or timezone.localdate()
+        run, _ = LoanRepaymentRun.objects.get_or_create(run_date=run_date)
+        report = BatchReport([], 0.0)
+        if run.status != 'Completed':
+            due = LoanInstallment.objects.filter(status='Due', due_date__lte=run_date)
+            if loans is not None:
+                due = due.filter(loan__in=loans)
+            plan = plan_shards(
+                REPAYMENT_JOB, run_date.isoformat(), due,
+                shards or (workers * 4 if workers > 1 else 1), field='account_id',
+            )
+            report = run_shards(
+                repay_loans_shard, plan, workers, progress,
+                run_date=run_date, chunk_size=chunk_size, scope=None if loans is None else loans.query,
+            )
+
+            totals = run_totals(REPAYMENT_JOB, run_date.isoformat())
+            run.loans_processed = totals['processed']
+            run.loans_repaid = totals['succeeded']
+            run.loans_pending = totals['deferred']
+            run.total_collected = totals['total_amount']
+            fields = ['loans_processed', 'loans_repaid', 'loans_pending', 'total_collected']
+            if totals['completed']:
+                run.status = 'Completed'
+                run.finished_at = timezone.now()
+                fields += ['status', 'finished_at']
+            run.save(update_fields=fields)
+
+        run.report = report
+        return run
+
+
+# Runs from before installment schedules were sharded by loan id as 'auto_repay_loans';
+# their shard checkpoints mean nothing to the installment collector
+REPAYMENT_JOB = 'collect_installments'
+
+
+def repay_loans_shard(shard, run_date, chunk_size=500, scope=None):
+    """
+    Collect the installments due on or before run_date of the accounts in one
+    shard, in installment id order, chunk_size at a time. Each chunk locks the
+    shard row, its installments, their loans and their accounts (in id order),
+    applies every repayment in memory and writes balances, installments, loans
+    and transactions with bulk queries. It then moves the shard checkpoint
+    forward in the same transaction. A loan's installments are paid in order:
+    one is only collected once every earlier one is paid.
+    """
+    due = LoanInstallment.objects.filter(
+        shard_filter(shard, 'account_id'), status='Due', due_date__lte=run_date,
+    )
+    if scope is not None:
+        loans_in_scope = Loan.objects.all()
+        loans_in_scope.query = scope
+        due = due.filter(loan__in=loans_in_scope)
+    while True:
+        with transaction.atomic():
+            shard = BatchShard.objects.select_for_update().get(id=shard.id)
+            installments = list(due.select_for_update().filter(id__gt=shard.last_id).order_by('id')[:chunk_size])
+            if not installments:
+                return
+
+            loans = Loan.objects.select_for_update().filter(
+                id__in={installment.loan_id for installment in installments}
+            ).order_by('id').in_bulk()
+            accounts = lock_accounts(*{installment.account_id for installment in installments})
+            # Each loan's earliest unpaid installment, the only one it may pay next
+            next_number = dict(
+                LoanInstallment.objects.filter(loan_id__in=list(loans), status='Due')
+                .values('loan_id').annotate(first=Min('number')).values_list('loan_id', 'first')
+            )
+            touched, paid, deferred, txns = {}, [], set(), []
+            for installment in installments:
+                loan, account = loans[installment.loan_id], accounts[installment.account_id]
+                if installment.number != next_number[loan.id]:
+                    # An earlier installment is still unpaid, here or in an earlier run
+                    deferred.add(loan.id)
+                    shard.deferred += 1
+                elif account.balance >= installment.amount:
+                    # Deduct repayment
+                    account.balance -= installment.amount
+                    touched[account.id] = account
+                    txn = Transaction(
+                        account=account,
+                        amount=-installment.amount,
+                        description=f"Loan Repayment: {loan.scheme} #{installment.number}",
+                        transaction_type="Withdrawal"
+                    )
+                    txn.balance_after = account.balance
+                    txns.append(txn)
+                    paid.append(installment.id)
+                    next_number[loan.id] += 1
+                    shard.succeeded += 1
+                    shard.total_amount += installment.amount
+                else:
+                    deferred.add(loan.id)
+                    shard.deferred += 1
+
+            Account.objects.bulk_update(touched.values(), ['balance'], batch_size=chunk_size)
+            invalidate_accounts(*touched)
+            # Set-based, so a chunk costs a handful of statements instead of a CASE per row:
+            # a loan owes exactly what is left of its schedule
+            LoanInstallment.objects.filter(id__in=paid).update(status='Paid', paid_on=timezone.now())
+            chunk_loans = Loan.objects.filter(id__in=list(loans))
+            owed = LoanInstallment.objects.filter(loan=OuterRef('pk'), status='Due').values('loan').annotate(
+                total=Sum('amount'),
+            ).values('total')
+            chunk_loans.update(balance_remaining=Coalesce(Subquery(owed), Decimal('0.00')))
+            chunk_loans.filter(balance_remaining__lte=0).update(status='Closed')
+            chunk_loans.filter(id__in=deferred).update(pending_repayment=True)
+            chunk_loans.exclude(id__in=deferred).update(pending_repayment=False)
+            post_transactions(txns, contra_book='Loans')
+
+            shard.last_id = installments[-1].id
+            shard.processed += len(installments)
+            shard.save(update_fields=['last_id', 'processed', 'succeeded', 'deferred', 'total_amount'])
 
 
 class RechargeStrategy:
@@ -248,17 +583,18 @@ class DefaultRechargeStrategy(RechargeStrategy):
 class RechargeFacade:
 
     @staticmethod
+    @track_facade
     @transaction.atomic
     def process_recharge(account_id, phone, country_code, amount):
-        account = Account.objects.get(id=account_id)
+        account = Account.objects.select_for_update().get(id=account_id)
         strategy = DefaultRechargeStrategy()
         is_valid, message = strategy.validate(account, amount)
 
         if not is_valid:
             return False, message
 
-        account.balance -= amount
-        account.save()
+        if not apply_balance_delta(account, -amount):
+            return False, "Insufficient balance"
 
         txn = Transaction.objects.create(
             account=account,
@@ -266,6 +602,8 @@ class RechargeFacade:
             description=f"Mobile Recharge ({country_code}) {phone}",
             transaction_type="Mobile Recharge"
         )
+        record_ledger([txn], 'Recharge')
+        record_transaction(txn)
 
         # Recharge record
         MobileRecharge.objects.create(
@@ -275,7 +613,46 @@ class RechargeFacade:
             amount=amount
         )
 
-        # Send email
-        send_transaction_email(txn)
+        # Queue receipt email (sent by the send_queued_emails worker)
+        enqueue_transaction_email(txn)
 
         return True, "Recharge Successful"
+
+
+# --- ASYNC ENTRY POINTS ---
+# Django's async ORM has no transaction.atomic() or select_for_update(), so the
+# money-moving facades keep running on the sync code path (sync_to_async puts them
+# on the one thread that owns the DB connection). Reads use the async ORM directly.
+
+class AsyncBankingFacade:
+    deposit = staticmethod(sync_to_async(BankingFacade.deposit))
+    withdraw = staticmethod(sync_to_async(BankingFacade.withdraw))
+    transfer_funds = staticmethod(sync_to_async(BankingFacade.transfer_funds))
+    bulk_transfer = staticmethod(sync_to_async(BankingFacade.bulk_transfer))
+
+    @staticmethod
+    async def get_balance(account_id):
+        return await Account.objects.values_list('balance', flat=True).aget(id=account_id)
+
+    @staticmethod
+    async def recent_transactions(account_id, limit=10):
+        return [
+            txn async for txn in
+            Transaction.objects.filter(account_id=account_id).order_by('-timestamp', '-id')[:limit]
+        ]
+
+
+class AsyncLoanFacade:
+    apply_loan = staticmethod(sync_to_async(LoanFacade.apply_loan))
+
+    @staticmethod
+    async def get_loans(account_id):
+        return [loan async for loan in Loan.objects.filter(account_id=account_id).order_by('-applied_on')]
+
+    @staticmethod
+    async def get_pending_loans():
+        return [loan async for loan in Loan.objects.filter(status='Pending').order_by('applied_on')]
+
+
+class AsyncRechargeFacade:
+    process_recharge = staticmethod(sync_to_async(RechargeFacade.process_recharge))
@@ -0,0 +1,113 @@
+# bankapp/statements.py
+import csv
+import heapq
+from decimal import Decimal
+from django.db.models import Q, Sum
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from .archive import archived_rows, archived_total
+from .models import Transaction
+from .pagination import date_range_bounds
+
+
+ROWS_PER_PRINT_PAGE = 40
+
+
+def opening_balance(account, start):
+    """Balance just before `start`: today's balance minus everything posted since, archived rows included."""
+    if start is None:
+        later = Transaction.objects.filter(account=account)
+    else:
+        later = Transaction.objects.filter(account=account, timestamp__gte=start)
+    posted = (later.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')) + archived_total(account, start)
+    return account.balance - posted
+
+
+def _hot_rows(account, start, end, chunk_size):
+    rows = Transaction.objects.filter(account=account)
+    if start:
+        rows = rows.filter(timestamp__gte=start)
+    if end:
+        rows = rows.filter(timestamp__lt=end)
+    rows = rows.order_by('timestamp', 'id').values_list(
+        'timestamp', 'id', 'transaction_type', 'description', 'amount'
+    )
+
+    after = None
+    while True:
+        chunk = rows
+        if after:
+            chunk = rows.filter(Q(timestamp__gt=after[0]) | Q(timestamp=after[0], id__gt=after[1]))
+        chunk = list(chunk[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        after = chunk[-1][:2]
+
+
+def statement_rows(account, start=None, end=None, chunk_size=2000):
+    """
+    Yield (timestamp, transaction_type, description, amount, running_balance)
+    oldest first. Rows are fetched in keyset-paginated chunks of chunk_size, so
+    memory stays flat on every backend, including MySQL, whose driver otherwise
+    buffers a whole result set client-side. Archived rows in the range are
+    merged in from their files, one month at a time.
+    """
+    balance = opening_balance(account, start)
+    archived = (row[:5] for row in archived_rows(account, start, end))
+    for timestamp, pk, transaction_type, description, amount in heapq.merge(
+        archived, _hot_rows(account, start, end, chunk_size),
+    ):
+        balance += amount
+        yield timestamp, transaction_type, description, amount, balance
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+def csv_statement(account, start_date=None, end_date=None):
+    start, end = date_range_bounds(start_date, end_date)
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['Date', 'Type', 'Description', 'Amount', 'Balance'])
+    for timestamp, transaction_type, description, amount, balance in statement_rows(account, start, end):
+        yield writer.writerow([timestamp.isoformat(), transaction_type, description, amount, balance])
+
+
+def print_statement_pages(account, start_date=None, end_date=None, rows_per_page=ROWS_PER_PRINT_PAGE):
+    """Printable HTML statement, streamed one page-sized table at a time."""
+    start, end = date_range_bounds(start_date, end_date)
+    context = {
+        'account': account,
+        'start_date': start_date,
+        'end_date': end_date,
+        'opening_balance': opening_balance(account, start),
+    }
+    yield render_to_string('statement_export_header.html', context)
+
+    closing = context['opening_balance']
+    page, rows_on_page = 0, 0
+    for timestamp, transaction_type, description, amount, balance in statement_rows(account, start, end):
+        if rows_on_page == 0:
+            page += 1
+            yield format_html(
+                '<div class="page"><p class="page-number">Page {}</p><table><thead><tr>'
+                '<th>Date</th><th>Description</th><th class="amount">Amount ($)</th>'
+                '<th class="amount">Balance ($)</th></tr></thead><tbody>',
+                page,
+            )
+        yield format_html(
+            '<tr><td>{}</td><td>{}</td><td class="amount">{}</td><td class="amount">{}</td></tr>',
+            timestamp.strftime('%Y-%m-%d'), description, f"{amount:.2f}", f"{balance:.2f}",
+        )
+        closing = balance
+        rows_on_page += 1
+        if rows_on_page == rows_per_page:
+            yield '</tbody></table></div>'
+            rows_on_page = 0
+    if rows_on_page:
+        yield '</tbody></table></div>'
+
+    yield render_to_string('statement_export_footer.html', {'closing_balance': closing})
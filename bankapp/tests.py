@@ -1,3 +1,328 @@
-from django.test import TestCase
+import threading
+import uuid
+from unittest import mock
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.db import IntegrityError, connections
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from . import velocity
+from .amortization import add_months, schedule_installments
+from .cache import get_account_id_by_number, get_user_account
+from .interest import accrue_interest
+from .idempotency import _claim, request_fingerprint, run_once
+from .models import (
+    Account, EmailOutbox, IdempotencyKey, InterestRun, Loan, LoanInstallment, SlowRequest, Transaction,
+)
+from .onboarding import conflict_field
+from .outbox import drain_outbox
+from .profiling import MAX_SLOW_LIMIT, prune_slow_requests
+from .services import BankingFacade, LoanFacade
 
-# Create your tests here.
+
+class IdempotencyConcurrencyTests(TransactionTestCase):
+    """Parallel retries of one deposit POST (same idempotency key) must move money exactly once."""
+    THREADS = 8
+
+    def setUp(self):
+        self.user = User.objects.create_user('idem', 'idem@example.com', 'pw')
+        self.account = Account.objects.create(
+            user=self.user, account_number='00000001', balance=Decimal('1000.00'), account_type='Savings',
+            cnic='00000001', date_of_birth='1990-01-01', age=30, address='a', phone_number='1',
+        )
+        self.key = uuid.uuid4().hex
+
+    def storm(self, func):
+        """Call run_once(func) from THREADS threads at once; returns (outcomes, errors)."""
+        barrier = threading.Barrier(self.THREADS)
+        outcomes, errors = [], []
+
+        def post():
+            request = RequestFactory().post('/deposit/', {'amount': '5.00', 'idempotency_key': self.key})
+            request.user = self.user
+            try:
+                barrier.wait()
+                outcomes.append(run_once(request, 'deposit', func))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=post) for _ in range(self.THREADS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return outcomes, errors
+
+    def deposit(self):
+        BankingFacade.deposit(self.account.id, Decimal('5.00'))
+        return True, "Deposit successful"
+
+    def assertDepositedOnce(self):
+        self.assertEqual(Transaction.objects.filter(account=self.account, transaction_type='Deposit').count(), 1)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1005.00'))
+        self.assertTrue(IdempotencyKey.objects.get(key=self.key).succeeded)
+
+    def test_parallel_retries_run_once(self):
+        outcomes, errors = self.storm(self.deposit)
+        self.assertEqual(errors, [])
+        self.assertEqual(outcomes, [(True, "Deposit successful")] * self.THREADS)
+        self.assertDepositedOnce()
+
+    def test_repeats_take_over_when_first_attempt_raises(self):
+        # The first attempt holds the claim while the repeats wait on it, then
+        # fails and drops it the way run_once does when func raises
+        request = RequestFactory().post('/deposit/', {'amount': '5.00', 'idempotency_key': self.key})
+        record, claimed = _claim(self.user, 'deposit', self.key, request_fingerprint('deposit', request))
+        self.assertTrue(claimed)
+        dropper = threading.Timer(0.3, lambda: (IdempotencyKey.objects.filter(id=record.id).delete(), connections.close_all()))
+        dropper.start()
+        outcomes, errors = self.storm(self.deposit)
+        dropper.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(outcomes, [(True, "Deposit successful")] * self.THREADS)
+        self.assertDepositedOnce()
+
+
+class TransferAmountTests(TransactionTestCase):
+    def setUp(self):
+        self.sender, self.receiver = [
+            Account.objects.create(
+                user=User.objects.create_user(f'amount{n}', f'amount{n}@example.com', 'pw'),
+                account_number=f'0000001{n}', balance=Decimal('100.00'), account_type='Savings',
+                cnic=f'0000001{n}', date_of_birth='1990-01-01', age=30, address='a', phone_number='1',
+            )
+            for n in (1, 2)
+        ]
+
+    def assertUnchanged(self):
+        for account in (self.sender, self.receiver):
+            account.refresh_from_db()
+            self.assertEqual(account.balance, Decimal('100.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_non_positive_amounts_are_rejected(self):
+        for amount in (Decimal('0'), Decimal('-500.00')):
+            self.assertEqual(
+                BankingFacade.transfer_funds(self.sender.id, self.receiver.account_number, amount),
+                (False, "Invalid amount"),
+            )
+            self.assertEqual(BankingFacade.withdraw(self.sender.id, amount), (False, "Invalid amount"))
+            with self.assertRaises(ValueError):
+                BankingFacade.deposit(self.sender.id, amount)
+        self.assertUnchanged()
+
+
+class BulkTransferVelocityTests(TransactionTestCase):
+    def setUp(self):
+        self.sender, self.receiver = [
+            Account.objects.create(
+                user=User.objects.create_user(f'payroll{n}', f'payroll{n}@example.com', 'pw'),
+                account_number=f'0000002{n}', balance=Decimal('1000000.00'), account_type='Current',
+                cnic=f'0000002{n}', date_of_birth='1990-01-01', age=30, address='a', phone_number='1',
+            )
+            for n in (1, 2)
+        ]
+        velocity.reset_velocity()
+        self.addCleanup(velocity.reset_velocity)
+
+    def payroll(self, rows, amount):
+        report = BankingFacade.bulk_transfer(
+            self.sender.id, [{'receiver_account': self.receiver.account_number, 'amount': Decimal(amount)}] * rows,
+        )
+        return [r['status'] for r in report]
+
+    def test_payroll_runs_under_the_default_limits(self):
+        # Far more rows, and more money, than one customer may send by hand in a day
+        self.assertEqual(self.payroll(250, '1000.00'), ['Success'] * 250)
+        # ...and the payroll didn't use up the customer's own transfer limits
+        self.assertEqual(
+            BankingFacade.transfer_funds(self.sender.id, self.receiver.account_number, Decimal('10.00')),
+            (True, "Transfer Successful"),
+        )
+
+    @override_settings(VELOCITY_DAILY_BULK_LIMIT=5000)
+    def test_batch_over_the_daily_bulk_limit_is_refused_whole(self):
+        self.assertEqual(self.payroll(4, '1000.00'), ['Success'] * 4)
+        self.assertEqual(self.payroll(2, '1000.00'), ['Failed'] * 2)
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal('996000.00'))
+
+
+class ConflictFieldTests(SimpleTestCase):
+    def test_reads_the_index_name_not_the_value(self):
+        cases = {
+            "(1062, \"Duplicate entry 'cnic_account_number' for key 'auth_user.username'\")": 'username',
+            "(1062, \"Duplicate entry 'username-1' for key 'bankapp_account.account_number'\")": 'account_number',
+            "(1062, \"Duplicate entry 'account_number' for key 'cnic'\")": 'cnic',
+            "UNIQUE constraint failed: bankapp_account.cnic": 'cnic',
+            "UNIQUE constraint failed: auth_user.username": 'username',
+            "(1062, \"Duplicate entry 'cnic' for key 'PRIMARY'\")": None,
+        }
+        for message, field in cases.items():
+            self.assertEqual(conflict_field(IntegrityError(message)), field, message)
+
+
+class BulkTransferValidationTests(TransactionTestCase):
+    def setUp(self):
+        self.receiver = Account.objects.create(
+            user=User.objects.create_user('payee', 'payee@example.com', 'pw'), account_number='00000031',
+            balance=Decimal('0.00'), account_type='Current', cnic='00000031', date_of_birth='1990-01-01',
+            age=30, address='a', phone_number='1',
+        )
+
+    def test_missing_sender_fails_every_row(self):
+        report = BankingFacade.bulk_transfer(
+            self.receiver.id + 1000, [{'receiver_account': '00000031', 'amount': Decimal('5.00')}] * 3, chunk_size=2,
+        )
+        self.assertEqual({(r['status'], r['message']) for r in report}, {('Failed', "Sender account not found")})
+        self.assertEqual(len(report), 3)
+
+    def test_sub_cent_amounts_are_rejected(self):
+        sender = Account.objects.create(
+            user=User.objects.create_user('payer', 'payer@example.com', 'pw'), account_number='00000032',
+            balance=Decimal('100.00'), account_type='Current', cnic='00000032', date_of_birth='1990-01-01',
+            age=30, address='a', phone_number='1',
+        )
+        report = BankingFacade.bulk_transfer(sender.id, [
+            {'receiver_account': '00000031', 'amount': Decimal('1.005')},
+            {'receiver_account': '00000031', 'amount': Decimal('1.50')},
+        ])
+        self.assertEqual([r['message'] for r in report], ["Invalid amount", "Transfer Successful"])
+
+
+class InstallmentOrderTests(TransactionTestCase):
+    def test_later_installments_wait_for_a_deferred_one(self):
+        account = Account.objects.create(
+            user=User.objects.create_user('borrower', 'borrower@example.com', 'pw'), account_number='00000041',
+            balance=Decimal('0.00'), account_type='Current', cnic='00000041', date_of_birth='1990-01-01',
+            age=30, address='a', phone_number='1',
+        )
+        loan = Loan.objects.create(
+            account=account, scheme='Personal', principal_amount=Decimal('300.00'), approved_amount=Decimal('300.00'),
+            interest_rate=Decimal('0.00'), balance_remaining=Decimal('300.00'), status='Approved',
+        )
+        start = date(2026, 1, 1)
+        LoanInstallment.objects.bulk_create(schedule_installments([loan], start, 3))
+        LoanInstallment.objects.filter(loan=loan, number=1).update(amount=Decimal('150.00'))
+
+        # Enough for the second installment but not the first: neither is paid
+        Account.objects.filter(id=account.id).update(balance=Decimal('120.00'))
+        run = LoanFacade.auto_repay_loans(add_months(start, 2), chunk_size=1)
+        self.assertEqual((run.loans_processed, run.loans_repaid, run.loans_pending), (2, 0, 2))
+        self.assertFalse(loan.installments.filter(status='Paid').exists())
+        loan.refresh_from_db()
+        self.assertTrue(loan.pending_repayment)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('120.00'))
+
+
+class InterestRunTests(TransactionTestCase):
+    def test_each_account_type_is_its_own_run(self):
+        for n, account_type in enumerate(('Savings', 'Current')):
+            Account.objects.create(
+                user=User.objects.create_user(f'saver{n}', f'saver{n}@example.com', 'pw'),
+                account_number=f'0000005{n}', balance=Decimal('100.00'), account_type=account_type,
+                cnic=f'0000005{n}', date_of_birth='1990-01-01', age=30, address='a', phone_number='1',
+            )
+        savings = accrue_interest(date(2026, 1, 1))
+        current = accrue_interest(date(2026, 1, 1), account_type='Current')
+        self.assertEqual((savings.account_type, savings.status), ('Savings', 'Completed'))
+        self.assertEqual((current.account_type, current.status), ('Current', 'Completed'))
+        # The Current run wasn't mistaken for the finished Savings one
+        self.assertEqual(sum(result.processed for result in current.report.results), 1)
+        self.assertEqual(InterestRun.objects.filter(period=date(2026, 1, 1)).count(), 2)
+
+
+class AccountCacheTests(TransactionTestCase):
+    @override_settings(ACCOUNT_CACHE_TTL=60)
+    def test_shared_tier_never_serves_a_stale_balance(self):
+        self.addCleanup(cache.clear)
+        account = Account.objects.create(
+            user=User.objects.create_user('cached', 'cached@example.com', 'pw'), account_number='00000061',
+            balance=Decimal('10.00'), account_type='Savings', cnic='00000061', date_of_birth='1990-01-01',
+            age=30, address='a', phone_number='1',
+        )
+        self.assertEqual(get_account_id_by_number('00000061'), account.id)
+        self.assertEqual(get_user_account(account.user).balance, Decimal('10.00'))
+        # Written by "another worker": nothing in this process is invalidated
+        Account.objects.filter(id=account.id).update(balance=Decimal('99.00'))
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user_account(account.user).balance, Decimal('99.00'))
+            self.assertEqual(get_account_id_by_number('00000061'), account.id)
+
+
+class MoneyFormTests(TransactionTestCase):
+    def setUp(self):
+        user = User.objects.create_user('former', 'former@example.com', 'pw')
+        self.account = Account.objects.create(
+            user=user, account_number='00000071', balance=Decimal('50.00'), account_type='Savings',
+            cnic='00000071', date_of_birth='1990-01-01', age=30, address='a', phone_number='1',
+        )
+        self.client.force_login(user)
+
+    def post(self, path, amount):
+        return self.client.post(path, {'amount': amount, 'idempotency_key': uuid.uuid4().hex})
+
+    def test_bad_amounts_are_shown_not_swallowed(self):
+        for path, refusal in (('/deposit/', "Deposit amount must be positive"), ('/withdraw/', "Invalid amount")):
+            for amount, message in (('0', refusal), ('abc', "Invalid amount entered."), ('NaN', "Invalid amount entered.")):
+                response = self.post(path, amount)
+                self.assertEqual(response.status_code, 200, (path, amount))
+                self.assertContains(response, message)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('50.00'))
+        self.assertEqual(self.post('/deposit/', '5.00').status_code, 302)
+
+
+class OutboxOutageTests(TransactionTestCase):
+    def setUp(self):
+        self.account = Account.objects.create(
+            user=User.objects.create_user('mailed', 'mailed@example.com', 'pw'), account_number='00000081',
+            balance=Decimal('0.00'), account_type='Savings', cnic='00000081', date_of_birth='1990-01-01',
+            age=30, address='a', phone_number='1',
+        )
+        for _ in range(3):
+            BankingFacade.deposit(self.account.id, Decimal('1.00'))
+
+    def test_unreachable_server_counts_an_attempt_for_the_whole_batch(self):
+        with mock.patch.object(locmem.EmailBackend, 'open', side_effect=ConnectionRefusedError("down")):
+            self.assertEqual(drain_outbox(), {'sent': 0, 'skipped': 0, 'retried': 3, 'failed': 0})
+        self.assertEqual(set(EmailOutbox.objects.values_list('status', 'attempts')), {('Pending', 1)})
+        self.assertFalse(EmailOutbox.objects.filter(next_attempt_at__lte=timezone.now()).exists())
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        with mock.patch.object(locmem.EmailBackend, 'open', side_effect=ConnectionRefusedError("down")):
+            self.assertEqual(drain_outbox(max_attempts=2)['failed'], 3)
+
+    def test_failed_reopen_mid_batch_defers_the_rest(self):
+        with mock.patch.object(locmem.EmailBackend, 'open', side_effect=[None, OSError("down")]), \
+                mock.patch.object(locmem.EmailBackend, 'send_messages', side_effect=OSError("reset")):
+            self.assertEqual(drain_outbox()['retried'], 3)
+        self.assertEqual(set(EmailOutbox.objects.values_list('status', 'attempts')), {('Pending', 1)})
+
+
+class RequestStatsTests(TransactionTestCase):
+    def setUp(self):
+        SlowRequest.objects.bulk_create([
+            SlowRequest(url_name='home', path=f'/{i}/', duration_ms=600, queries=1, db_ms=1) for i in range(MAX_SLOW_LIMIT + 5)
+        ])
+
+    def test_slow_limit_is_parsed_and_clamped(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get('/api/request-stats/', {'slow': 'abc'}).status_code, 400)
+        for slow, listed in (('-5', 0), ('3', 3), ('100000', MAX_SLOW_LIMIT)):
+            response = self.client.get('/api/request-stats/', {'slow': slow})
+            self.assertEqual(len(response.json()['slow_requests']), listed, slow)
+
+    def test_pruning_keeps_the_newest_rows(self):
+        newest = list(SlowRequest.objects.order_by('-id').values_list('id', flat=True)[:10])
+        self.assertEqual(prune_slow_requests(keep=10), MAX_SLOW_LIMIT - 5)
+        self.assertEqual(sorted(SlowRequest.objects.values_list('id', flat=True)), sorted(newest))
+        self.assertEqual(prune_slow_requests(keep=10), 0)
@@ -1,23 +1,39 @@
 # bankapp/urls.py
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views # Built-in Login/Logout
 from . import views
 
+# With ASYNC_READ_VIEWS on (ASGI deployments), the read-only pages use the async-ORM views
+if settings.ASYNC_READ_VIEWS:
+    dashboard, history = views.dashboard_async, views.transaction_history_async
+    profile, my_loans = views.profile_async, views.my_loans_async
+else:
+    dashboard, history = views.dashboard, views.transaction_history
+    profile, my_loans = views.profile_view, views.my_loans_view
+
 # bankapp/urls.py
 urlpatterns = [
-    path('', views.dashboard, name='dashboard'),
+    path('', dashboard, name='dashboard'),
     path('login/', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='login'), name='logout'),
     path('signup/', views.signup_view, name='signup'),  # Only keep this one
     path('deposit/', views.deposit_view, name='deposit'),
     path('withdraw/', views.withdraw_view, name='withdraw'),
     path('transfer/', views.transfer_view, name='transfer'),
+    path('transfer/bulk/', views.bulk_transfer_view, name='bulk_transfer'),
     path('apply-interest/', views.apply_interest, name='apply_interest'),
-    path('history/', views.transaction_history, name='history'),
+    path('history/', history, name='history'),
+    path('api/transactions/', views.transaction_history_api, name='transaction_history_api'),
+    path('api/search/transactions/', views.transaction_search_api, name='transaction_search_api'),
+    path('api/balance-series/', views.balance_series_api, name='balance_series_api'),
+    path('api/cache-stats/', views.account_cache_stats_view, name='account_cache_stats'),
+    path('api/request-stats/', views.request_stats_view, name='request_stats'),
     path('receipt/<int:transaction_id>/', views.transaction_receipt, name='receipt'),
-    path('profile/', views.profile_view, name='profile'),
+    path('profile/', profile, name='profile'),
     path('print-statement/', views.print_statement, name='print_statement'),
+    path('statement/export/', views.export_statement, name='export_statement'),
     path('apply-loan/', views.apply_loan_view, name='apply_loan'),  # Apply for a loan
-    path('my-loans/', views.my_loans_view, name='my_loans'),        # View your loans        # User views all their loans
+    path('my-loans/', my_loans, name='my_loans'),        # View your loans        # User views all their loans
     path("mobile-recharge/", views.mobile_recharge_view, name="mobile_recharge"),
 ]
\ No newline at end of file
@@ -1,42 +1,100 @@
 from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+from django.db.models import prefetch_related_objects
+from django.template import Context
+from django.template.loader import get_template
 from django.conf import settings
 
-def send_transaction_email(transaction):
-    account = transaction.account
-    user_email = account.user.email
 
-    if not user_email:
-        return False
+RECEIPT_TEMPLATE = 'transaction_email.html'
+
+
+def receipt_template():
+    """The compiled receipt template; the cached loader parses the file only once per process."""
+    return get_template(RECEIPT_TEMPLATE).template
 
-    subject = f"Transaction Receipt - {transaction.description}"
 
-    # HTML content
-    html_content = render_to_string('transaction_email.html', {
-        'transaction': transaction,
-        'account': account,
-    })
+def render_receipts(transactions, balances=None):
+    """
+    Render (subject, text, html) for many transactions in one go: accounts and
+    users are loaded in one query for any transaction that doesn't already have
+    them, the template is looked up once, and a single Context is reused with a
+    push per receipt. `balances` optionally gives the balance to show per
+    transaction (defaults to the account's current balance).
+    """
+    transactions = list(transactions)
+    prefetch_related_objects(transactions, 'account__user')
+    if balances is None:
+        balances = [None] * len(transactions)
+
+    template = receipt_template()
+    context = Context(autoescape=True)
+    rendered = []
+    for transaction, balance in zip(transactions, balances):
+        account = transaction.account
+        if balance is None:
+            balance = account.balance
 
-    # Plain text fallback
-    text_content = f"""
+        subject = f"Transaction Receipt - {transaction.description}"
+
+        # HTML content
+        with context.push(transaction=transaction, account=account, balance=balance):
+            html_content = template.render(context)
+
+        # Plain text fallback
+        text_content = f"""
     Transaction Receipt for {account.user.username}
-    
+
     Account: {account.account_number} ({account.account_type})
     Transaction Type: {transaction.transaction_type}
     Description: {transaction.description}
     Amount: ${transaction.amount}
     Date: {transaction.timestamp}
-    Remaining Balance: ${account.balance}
+    Remaining Balance: ${balance}
     """
+        rendered.append((subject, text_content, html_content))
+    return rendered
+
+
+def build_transaction_emails(transactions, balances=None, connection=None):
+    """
+    Receipt messages for many transactions, in order. Entries are None for
+    users without an email address; their receipts aren't rendered at all.
+    """
+    transactions = list(transactions)
+    prefetch_related_objects(transactions, 'account__user')
+    if balances is None:
+        balances = [None] * len(transactions)
+
+    wanted = [i for i, transaction in enumerate(transactions) if transaction.account.user.email]
+    rendered = render_receipts([transactions[i] for i in wanted], [balances[i] for i in wanted])
+
+    emails = [None] * len(transactions)
+    for i, (subject, text_content, html_content) in zip(wanted, rendered):
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=text_content,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[transactions[i].account.user.email],
+            connection=connection,
+        )
+        email.attach_alternative(html_content, "text/html")
+        emails[i] = email
+    return emails
+
+
+def build_transaction_email(transaction, balance=None, connection=None):
+    """
+    Build the receipt message for a transaction, or None if the user has no email.
+    `balance` overrides the account's current balance (used for queued receipts).
+    """
+    return build_transaction_emails([transaction], [balance], connection)[0]
+
+
+def send_transaction_email(transaction):
+    email = build_transaction_email(transaction)
+    if email is None:
+        return False
 
-    email = EmailMultiAlternatives(
-        subject=subject,
-        body=text_content,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        to=[user_email],
-    )
-    email.attach_alternative(html_content, "text/html")
     email.send(fail_silently=False)
 
     return True
-
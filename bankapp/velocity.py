@@ -0,0 +1,251 @@
+# bankapp/velocity.py
+"""
+Velocity limits on transfers and withdrawals.
+
+BankingFacade.withdraw and transfer_funds call check_velocity() once the
+sender's row is locked, and record_velocity() after the debit. The rules in
+VELOCITY_RULES (strategies, like the loan and recharge ones) see how many
+debits the account made, and for how much, in a sliding window, and can refuse
+the new one with a message for the customer.
+
+Each account's recent debits are kept in a DebitRing in this process: three
+parallel arrays (epoch seconds, cents, kind) of at most VELOCITY_HISTORY
+entries, the oldest overwritten first. A check scans a few dozen numbers and
+runs no query. The first time a process sees an account, it fills the ring from
+the Transaction table with one query. It keeps at most VELOCITY_MAX_ACCOUNTS
+rings and drops the least recently used. If an account made more debits inside
+a rule's window than its ring holds, that rule counts the older ones with a
+COUNT/SUM query.
+
+With several worker processes, set VELOCITY_CACHE_ALIAS to a shared cache
+(Redis, Memcached). The ring is then read from that cache before each check and
+written back after each debit. Both happen under the sender's row lock, so two
+processes never interleave on one account's ring. Debits are recorded before
+commit, so a transfer that later rolls back still counts against the limits.
+"""
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Sum
+from django.utils import timezone
+from .models import Transaction
+
+
+KINDS = ('Transfer', 'Withdrawal')
+# Description of the sender's side of a payroll row (bulk_transfer). Those rows
+# count against BULK_VELOCITY_RULES, not against the customer's own limits.
+PAYROLL_PREFIX = "Payroll to "
+
+_lock = threading.Lock()
+_rings = OrderedDict()
+
+
+def _cents(amount):
+    return int(amount * 100)
+
+
+class DebitRing:
+    """The latest debits of one account; once full, each new one overwrites the oldest."""
+    __slots__ = ('times', 'cents', 'kinds', 'head', 'capacity')
+
+    def __init__(self, capacity):
+        self.times, self.cents, self.kinds = array('d'), array('q'), array('b')
+        self.head = 0  # next slot to overwrite once full
+        self.capacity = capacity
+
+    def add(self, at, cents, kind):
+        if len(self.times) < self.capacity:
+            self.times.append(at)
+            self.cents.append(cents)
+            self.kinds.append(kind)
+            return
+        self.times[self.head], self.cents[self.head], self.kinds[self.head] = at, cents, kind
+        self.head = (self.head + 1) % self.capacity
+
+    def complete_since(self):
+        """Earliest time from which the ring holds every debit (None: all of them)."""
+        return min(self.times) if len(self.times) == self.capacity else None
+
+    def totals(self, since, kinds):
+        """(count, cents) of the debits of `kinds` (codes) at or after `since`."""
+        count = cents = 0
+        for at, amount, kind in zip(self.times, self.cents, self.kinds):
+            if at >= since and kind in kinds:
+                count += 1
+                cents += amount
+        return count, cents
+
+
+# --- STRATEGY PATTERN: velocity rules ---
+class VelocityRule:
+    """Refuses a debit based on the account's debits of `kinds` in the last `window`."""
+    kinds = KINDS
+    window = timedelta(minutes=10)
+
+    def check(self, count, total, amount):
+        """Return a message refusing a debit of `amount`, or None to allow it."""
+        raise NotImplementedError
+
+
+class MaxDebitCount(VelocityRule):
+    """At most VELOCITY_MAX_DEBITS transfers and withdrawals in any 10 minutes."""
+    def check(self, count, total, amount):
+        if count >= settings.VELOCITY_MAX_DEBITS:
+            return "Too many transfers and withdrawals in a short time. Please try again later."
+        return None
+
+
+class DailyDebitLimit(VelocityRule):
+    """At most VELOCITY_DAILY_DEBIT_LIMIT moved out in any 24 hours."""
+    window = timedelta(hours=24)
+
+    def check(self, count, total, amount):
+        if total + amount > Decimal(settings.VELOCITY_DAILY_DEBIT_LIMIT):
+            return "This would exceed your daily transfer and withdrawal limit."
+        return None
+
+
+class DailyBulkLimit(VelocityRule):
+    """At most VELOCITY_DAILY_BULK_LIMIT moved out in any 24 hours, counting the batch being sent."""
+    window = timedelta(hours=24)
+
+    def check(self, count, total, amount):
+        if total + amount > Decimal(settings.VELOCITY_DAILY_BULK_LIMIT):
+            return "This batch would exceed your daily bulk transfer limit."
+        return None
+
+
+# Stateless, like LOAN_EVALUATION_STRATEGIES; the first refusal wins
+VELOCITY_RULES = (MaxDebitCount(), DailyDebitLimit())
+# Payroll batches (bulk_transfer) are checked once, as a whole, against these
+# instead: a 100-row payroll would never get past MaxDebitCount row by row
+BULK_VELOCITY_RULES = (DailyBulkLimit(),)
+
+
+def _longest_window():
+    return max(rule.window for rule in VELOCITY_RULES)
+
+
+def _shared():
+    alias = getattr(settings, 'VELOCITY_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def _key(account_id):
+    return f'velocity:{account_id}'
+
+
+def _seed(account_id):
+    """A ring filled with the account's debits from the Transaction table."""
+    ring = DebitRing(settings.VELOCITY_HISTORY)
+    rows = Transaction.objects.filter(
+        account_id=account_id, transaction_type__in=KINDS, amount__lt=0,
+        timestamp__gte=timezone.now() - _longest_window(),
+    ).exclude(description__startswith=PAYROLL_PREFIX).order_by('-timestamp', '-id').values_list('timestamp', 'amount', 'transaction_type')[:ring.capacity]
+    for at, amount, kind in reversed(rows):
+        ring.add(at.timestamp(), _cents(-amount), KINDS.index(kind))
+    return ring
+
+
+def _ring(account_id):
+    shared = _shared()
+    if shared is not None:
+        return shared.get(_key(account_id)) or _seed(account_id)
+
+    with _lock:
+        ring = _rings.get(account_id)
+        if ring is not None:
+            _rings.move_to_end(account_id)
+            return ring
+    ring = _seed(account_id)
+    with _lock:
+        ring = _rings.setdefault(account_id, ring)
+        while len(_rings) > settings.VELOCITY_MAX_ACCOUNTS:
+            _rings.popitem(last=False)
+    return ring
+
+
+def _db_totals(account_id, kinds, since, until=None, payroll=False):
+    """(count, total) of the account's debits of `kinds` since `since`; payroll rows only if `payroll`."""
+    rows = Transaction.objects.filter(
+        account_id=account_id, transaction_type__in=kinds, amount__lt=0,
+        timestamp__gte=datetime.fromtimestamp(since, timezone.get_fixed_timezone(0)),
+    )
+    if not payroll:
+        rows = rows.exclude(description__startswith=PAYROLL_PREFIX)
+    if until is not None:
+        rows = rows.filter(timestamp__lt=datetime.fromtimestamp(until, timezone.get_fixed_timezone(0)))
+    totals = rows.aggregate(count=Count('id'), total=Sum('amount'))
+    return totals['count'], -(totals['total'] or Decimal('0.00'))
+
+
+def check_velocity(account, kind, amount):
+    """
+    The message of the first rule refusing a debit of `amount` from `account`
+    (kind 'Transfer' or 'Withdrawal'), or None. Call with the account row locked.
+    """
+    if not settings.VELOCITY_CHECKS:
+        return None
+    ring, now = _ring(account.id), time.time()
+    for rule in VELOCITY_RULES:
+        if kind not in rule.kinds:
+            continue
+        since = now - rule.window.total_seconds()
+        with _lock:
+            complete_since = ring.complete_since()
+            count, cents = ring.totals(since, {KINDS.index(k) for k in rule.kinds})
+        total = Decimal(cents) / 100
+        if complete_since is not None and complete_since > since:
+            # More debits in the window than the ring holds: the ones older than
+            # the ring come from the table. The ring's own are counted from the
+            # ring, so recorded debits not committed yet still count.
+            older, older_total = _db_totals(account.id, rule.kinds, since, until=complete_since)
+            count, total = count + older, total + older_total
+        message = rule.check(count, total, amount)
+        if message:
+            return message
+    return None
+
+
+def check_bulk_velocity(account_id, amount):
+    """
+    The message of the first rule refusing a payroll batch moving `amount` out
+    of the account, or None. One query per rule, over everything the account
+    sent. Batch rows aren't added to the account's ring and are described with
+    PAYROLL_PREFIX, so they don't use up the customer's own transfer limits.
+    """
+    if not settings.VELOCITY_CHECKS:
+        return None
+    now = time.time()
+    for rule in BULK_VELOCITY_RULES:
+        count, total = _db_totals(account_id, rule.kinds, now - rule.window.total_seconds(), payroll=True)
+        message = rule.check(count, total, amount)
+        if message:
+            return message
+    return None
+
+
+def record_velocity(account, kind, amount):
+    """Count a debit of `amount` from `account` against the rules. Call with the account row locked."""
+    if not settings.VELOCITY_CHECKS:
+        return
+    ring = _ring(account.id)
+    with _lock:
+        ring.add(time.time(), _cents(amount), KINDS.index(kind))
+    shared = _shared()
+    if shared is not None:
+        shared.set(_key(account.id), ring, int(_longest_window().total_seconds()))
+
+
+def reset_velocity(*account_ids):
+    """Forget the rings of these accounts (all of them if none given) in this process."""
+    with _lock:
+        if not account_ids:
+            _rings.clear()
+        for account_id in account_ids:
+            _rings.pop(account_id, None)
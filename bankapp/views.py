@@ -1,29 +1,51 @@
-from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from .models import Account, Transaction
 from .services import BankingFacade  # Import your Facade
+from .profiling import aggregator, request_stats_snapshot
+from .cache import account_cache_stats, aget_user_account, get_user_account
+from .aggregates import atype_totals, type_totals
+from .ledger import SERIES_GRANULARITIES, abalance_series, balance_series
+from .bulk import BulkFileError, parse_transfer_file, parse_transfer_json
+from .onboarding import DuplicateCustomer, open_account
+from .idempotency import IdempotencyConflict, new_key, run_once
+from .archive import apaginate_history, archived_transaction, paginate_history
+from .search import SearchError, search_query_string, search_transactions
+from .statements import csv_statement, print_statement_pages
+from .pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, filter_by_date_range,
+)
 from .services import SavingsInterest, CurrentInterest
 from decimal import Decimal, InvalidOperation  # Add this import at the top
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login
 from .models import Transaction, Account
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 from decimal import Decimal, InvalidOperation
-import random
 from django.db import transaction
 from django.contrib.auth.models import User # Ensure this is at the top
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from .models import Account, Loan
 from .services import LoanFacade
+from .amortization import with_next_installment
 from decimal import Decimal
 
 
 @login_required
 def transaction_receipt(request, transaction_id):
     # Ensure the transaction actually belongs to the logged-in user
-    transaction = get_object_or_404(Transaction, id=transaction_id, account__user=request.user)
+    transaction = Transaction.objects.filter(id=transaction_id, account__user=request.user).first()
+    if transaction is None:
+        # Old receipts are read back from the archive
+        try:
+            transaction = archived_transaction(get_user_account(request.user), transaction_id)
+        except Account.DoesNotExist:
+            pass
+        if transaction is None:
+            raise Http404("No such transaction")
     return render(request, 'receipt.html', {'transaction': transaction})
 
 
@@ -31,26 +53,131 @@ def transaction_receipt(request, transaction_id):
 @login_required
 def transaction_history(request):
     try:
-        account = Account.objects.get(user=request.user)
-        # Fetch all transactions for this specific account
-        transactions = Transaction.objects.filter(account=account).order_by('-timestamp')
-        
-        # Filtering logic
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        if start_date and end_date:
-            transactions = transactions.filter(timestamp__date__range=[start_date, end_date])
-            
+        account = get_user_account(request.user)
+        # Fetch this account's transactions one keyset page at a time
+        transactions = Transaction.objects.filter(account=account)
+
+        # Filtering logic (dates, type, amount, counterparty, description words)
+        search_error = ''
+        try:
+            transactions = search_transactions(transactions, request.GET, account)
+        except SearchError as e:
+            search_error = str(e)
+            transactions = transactions.none()
+
+        try:
+            page = paginate_history(transactions, account, request.GET.get('cursor'), params=request.GET)
+        except InvalidCursor:
+            page = paginate_history(transactions, account, params=request.GET)
+
         return render(request, 'history.html', {
             'account': account, 
-            'transactions': transactions
+            'transactions': page,
+            'next_cursor': page.next_cursor,
+            **_search_context(request, search_error),
         })
     except Account.DoesNotExist:
         return redirect('signup')
 
 
+@user_passes_test(lambda u: u.is_staff)
+def account_cache_stats_view(request):
+    """Hit/miss counters of the Account lookup cache in this worker process (staff only)."""
+    return JsonResponse(account_cache_stats())
+
+
+@user_passes_test(lambda u: u.is_staff)
+def request_stats_view(request):
+    """Per-URL request profiles and recent slow requests (staff only)."""
+    try:
+        slow_limit = int(request.GET.get('slow', 20))
+    except ValueError:
+        return JsonResponse({'error': "Invalid slow limit."}, status=400)
+    aggregator.flush()  # include this worker's not-yet-flushed numbers
+    return JsonResponse(request_stats_snapshot(slow_limit))
+
+
+@login_required
+def transaction_history_api(request):
+    """JSON feed of the logged-in user's transactions, newest first, paged by cursor."""
+    try:
+        account = get_user_account(request.user)
+    except Account.DoesNotExist:
+        return JsonResponse({'error': "No bank account found for this user."}, status=404)
+
+    try:
+        transactions = search_transactions(Transaction.objects.all(), request.GET, account)
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    try:
+        page_size = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        page = paginate_history(transactions, account, request.GET.get('cursor'), page_size, request.GET)
+    except (InvalidCursor, ValueError):
+        return JsonResponse({'error': "Invalid cursor or limit."}, status=400)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': t.id,
+                'timestamp': t.timestamp.isoformat(),
+                'transaction_type': t.transaction_type,
+                'description': t.description,
+                'counterparty': t.counterparty,
+                'amount': str(t.amount),
+            }
+            for t in page
+        ],
+        'next_cursor': page.next_cursor,
+    })
+
+
+def _search_context(request, search_error=''):
+    return {
+        'search_error': search_error,
+        'search_query': search_query_string(request.GET),
+        'transaction_types': [value for value, _ in Transaction.TRANSACTION_TYPES],
+    }
+
+
+@user_passes_test(lambda u: u.is_staff)
+def transaction_search_api(request):
+    """
+    Staff search over every account's transactions: the history filters plus
+    `account` (account number), newest first, paged by cursor.
+    """
+    transactions = Transaction.objects.select_related('account')
+    account = None
+    account_number = (request.GET.get('account') or '').strip()
+    if account_number:
+        account = Account.objects.filter(account_number=account_number).first()
+        if account is None:
+            return JsonResponse({'results': [], 'next_cursor': None})
+    try:
+        transactions = search_transactions(transactions, request.GET, account)
+        page_size = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        page = paginate_history(transactions, account, request.GET.get('cursor'), page_size, request.GET)
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except (InvalidCursor, ValueError):
+        return JsonResponse({'error': "Invalid cursor or limit."}, status=400)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': t.id,
+                'account': t.account.account_number,
+                'timestamp': t.timestamp.isoformat(),
+                'transaction_type': t.transaction_type,
+                'description': t.description,
+                'counterparty': t.counterparty,
+                'amount': str(t.amount),
+            }
+            for t in page
+        ],
+        'next_cursor': page.next_cursor,
+    })
+
 
-from django.db import IntegrityError
 
 def signup_view(request):
     if request.method == "POST":
@@ -64,37 +191,24 @@ def signup_view(request):
         address = request.POST.get('address')
         phone = request.POST.get('phone')
 
-        # 🔹 Check CNIC uniqueness
-        if Account.objects.filter(cnic=cnic).exists():
-            return render(request, 'signup.html', {'error': "CNIC already exists! You cannot create another account."})
-
+        # Username/CNIC clashes come back from the insert itself; no pre-check queries
         try:
-            with transaction.atomic():
-                user = User.objects.create_user(
-                    username=username,
-                    email=email,
-                    password=password
-                )
-
-                acc_num = str(random.randint(10000000, 99999999))
-                while Account.objects.filter(account_number=acc_num).exists():
-                    acc_num = str(random.randint(10000000, 99999999))
-
-                Account.objects.create(
-                    user=user,
-                    account_number=acc_num,
-                    account_type=acc_type,
-                    balance=Decimal('0.00'),
-                    cnic=cnic,
-                    date_of_birth=dob,
-                    age=age,
-                    address=address,
-                    phone_number=phone
-                )
-
+            open_account(
+                username=username,
+                email=email,
+                password=password,
+                account_type=acc_type,
+                cnic=cnic,
+                date_of_birth=dob,
+                age=age,
+                address=address,
+                phone_number=phone
+            )
             return redirect('login')
 
-        except IntegrityError:
+        except DuplicateCustomer as e:
+            if e.field == 'cnic':
+                return render(request, 'signup.html', {'error': "CNIC already exists! You cannot create another account."})
             return render(request, 'signup.html', {'error': "Username or Email already exists."})
         except Exception as e:
             return render(request, 'signup.html', {'error': f"Something went wrong: {str(e)}"})
@@ -102,79 +216,144 @@ def signup_view(request):
     return render(request, 'signup.html')
 
 
-@login_required
-def dashboard(request):
-    try:
-        account = Account.objects.get(user=request.user)
-        transactions = Transaction.objects.filter(account=account).order_by('-timestamp')
+CHART_MONTHS = 6
+SERIES_YEARS = (1, 5, 10)
 
-        # --- Monthly Balance Trend (last 6 months) ---
-        from datetime import datetime, timedelta
-        import json
 
-        today = datetime.today()
-        monthly_labels = []
-        monthly_balance = []
+def _chart_start(months=CHART_MONTHS):
+    """First day of the calendar month `months - 1` months ago, so the chart ends with this month."""
+    from datetime import date
+    from django.utils import timezone
+    today = timezone.localdate()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return date(index // 12, index % 12 + 1, 1)
 
-        for i in range(5, -1, -1):  # last 6 months
-            month = today - timedelta(days=i*30)
-            label = month.strftime('%b %Y')
-            monthly_labels.append(label)
 
-            month_transactions = transactions.filter(
-                timestamp__year=month.year,
-                timestamp__month=month.month
-            )
-            month_balance = sum(t.amount for t in month_transactions) + account.balance
-            monthly_balance.append(float(month_balance))
-
-        # --- Transaction Type Summary ---
-        transaction_types = ['Deposit', 'Withdrawal', 'Transfer', 'Mobile Recharge']
-        type_data = []
-        for t_type in transaction_types:
-            if t_type == 'Deposit':
-                amount = sum(t.amount for t in transactions if t.amount > 0)
-            else:
-                amount = sum(
-                    -t.amount for t in transactions 
-                    if t.transaction_type == t_type or (t_type=='Mobile Recharge' and 'Recharge' in t.description)
-                )
-            type_data.append(float(amount))
-
-        context = {
-            'account': account,
-            'transactions': transactions,
-            'monthly_labels': json.dumps(monthly_labels),
-            'monthly_balance': json.dumps(monthly_balance),
-            'transaction_types': json.dumps(transaction_types),
-            'type_data': json.dumps(type_data),
-        }
+def _dashboard_context(account, transactions, series, totals_by_type):
+    import json
+
+    # --- Monthly Balance Trend (last 6 months) ---
+    # Month-end balances come from the ledger's balance series (one window query, cached
+    # until the next write), the type summary from the MonthlyAggregate rollup
+    monthly_labels = []
+    monthly_balance = []
+    for month, balance in series:
+        monthly_labels.append(month.strftime('%b %Y'))
+        monthly_balance.append(float(balance))
+
+    # --- Transaction Type Summary ---
+    transaction_types = [value for value, _ in Transaction.TRANSACTION_TYPES]
+    type_data = []
+    for t_type in transaction_types:
+        if t_type == 'Deposit':
+            amount = sum(credits for credits, _ in totals_by_type.values())
+        else:
+            credits, debits = totals_by_type.get(t_type, (0, 0))
+            amount = -(credits + debits)
+        type_data.append(float(amount))
+
+    return {
+        'account': account,
+        'transactions': transactions,
+        'monthly_labels': json.dumps(monthly_labels),
+        'monthly_balance': json.dumps(monthly_balance),
+        'transaction_types': json.dumps(transaction_types),
+        'type_data': json.dumps(type_data),
+    }
+
 
+@login_required
+def dashboard(request):
+    try:
+        account = get_user_account(request.user)
+        # Only the most recent page is shown; the full history lives on the history view
+        transactions = paginate_history(Transaction.objects.filter(account=account), account, page_size=10)
+        series = balance_series(account, _chart_start(), granularity='month')
+        context = _dashboard_context(account, transactions, series, type_totals(account))
         return render(request, 'dashboard.html', context)
 
     except Account.DoesNotExist:
         return HttpResponse("No bank account found for this user.")
 
+
+@login_required
+def balance_series_api(request):
+    """
+    Closing balances for the balance-trend charts: ?years=1|5|10 and
+    granularity=day|month (default: day for one year, month for longer).
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    try:
+        account = get_user_account(request.user)
+    except Account.DoesNotExist:
+        return JsonResponse({'error': "No bank account found for this user."}, status=404)
+
+    try:
+        years = int(request.GET.get('years', 1))
+    except ValueError:
+        years = None
+    if years not in SERIES_YEARS:
+        return JsonResponse({'error': f"years must be one of {', '.join(map(str, SERIES_YEARS))}."}, status=400)
+    granularity = request.GET.get('granularity') or ('day' if years == 1 else 'month')
+    if granularity not in SERIES_GRANULARITIES:
+        return JsonResponse({'error': f"granularity must be one of {', '.join(SERIES_GRANULARITIES)}."}, status=400)
+
+    today = timezone.localdate()
+    try:
+        start = today.replace(year=today.year - years)
+    except ValueError:  # Feb 29
+        start = today.replace(year=today.year - years, day=28)
+    series = balance_series(account, start + timedelta(days=1), today, granularity)
+    return JsonResponse({
+        'account': account.account_number,
+        'granularity': granularity,
+        'labels': [day.isoformat() for day, _ in series],
+        'balances': [str(balance) for _, balance in series],
+    })
+
 def deposit_view(request):
-    account = Account.objects.get(user=request.user) # Use logged-in user
+    account = get_user_account(request.user) # Use logged-in user
+    message = ""
     if request.method == "POST":
         # Convert the string from the form into a Decimal, NOT a float
-        amount = Decimal(request.POST.get('amount')) 
-        BankingFacade.deposit(account.id, amount)
-        return redirect('dashboard')
-    return render(request, 'deposit.html', {'account': account})
+        try:
+            amount = Decimal(request.POST.get('amount') or '')
+            if not amount.is_finite():
+                raise InvalidOperation
+        except InvalidOperation:
+            message = "Invalid amount entered."
+        else:
+            def deposit():
+                BankingFacade.deposit(account.id, amount)
+                return True, "Deposit successful"
+
+            # A resubmitted form (same idempotency key) doesn't deposit twice
+            try:
+                run_once(request, 'deposit', deposit)
+                return redirect('dashboard')
+            except ValueError as e:  # non-positive amount, or IdempotencyConflict
+                message = str(e)
+    return render(request, 'deposit.html', {'account': account, 'message': message, 'idempotency_key': new_key()})
 
 def withdraw_view(request):
-    account = Account.objects.get(user=request.user)
+    account = get_user_account(request.user)
     message = ""
     if request.method == "POST":
         # Convert here as well
-        amount = Decimal(request.POST.get('amount')) 
-        success, result = BankingFacade.withdraw(account.id, amount)
+        try:
+            amount = Decimal(request.POST.get('amount') or '')
+            if not amount.is_finite():
+                raise InvalidOperation
+            success, result = run_once(request, 'withdraw', lambda: BankingFacade.withdraw(account.id, amount))
+        except InvalidOperation:
+            success, result = False, "Invalid amount entered."
+        except IdempotencyConflict as e:
+            success, result = False, str(e)
         if success:
             return redirect('dashboard')
         message = result
-    return render(request, 'withdraw.html', {'account': account, 'message': message})
+    return render(request, 'withdraw.html', {'account': account, 'message': message, 'idempotency_key': new_key()})
 
 
 
@@ -182,7 +361,7 @@ def withdraw_view(request):
 @login_required
 def transfer_view(request):
     # FIX: Get the account belonging ONLY to the logged-in user
-    sender_account = Account.objects.get(user=request.user)
+    sender_account = get_user_account(request.user)
     message = ""
 
     if request.method == "POST":
@@ -192,15 +371,55 @@ def transfer_view(request):
         try:
             amount = Decimal(request.POST.get('amount'))
             
-            # Call the Facade with the specific ID of the logged-in sender
-            success, message = BankingFacade.transfer_funds(sender_account.id, receiver_num, amount)
+            # Call the Facade with the specific ID of the logged-in sender, once per idempotency key
+            success, message = run_once(
+                request, 'transfer', lambda: BankingFacade.transfer_funds(sender_account.id, receiver_num, amount)
+            )
             
             if success:
                 return redirect('dashboard')
+        except IdempotencyConflict as e:
+            message = str(e)
         except (InvalidOperation, ValueError):
             message = "Invalid amount entered."
 
-    return render(request, 'transfer.html', {'account': sender_account, 'message': message})
+    return render(request, 'transfer.html', {
+        'account': sender_account, 'message': message, 'idempotency_key': new_key(),
+    })
+
+@login_required
+def bulk_transfer_view(request):
+    """Upload a CSV/JSON payroll file (or POST a JSON body) and run every transfer in it."""
+    sender_account = get_user_account(request.user)
+    wants_json = request.content_type == 'application/json'
+    message = ""
+    report = None
+
+    if request.method == "POST":
+        try:
+            if wants_json:
+                rows = parse_transfer_json(request.body.decode())
+            elif 'file' in request.FILES:
+                upload = request.FILES['file']
+                rows = parse_transfer_file(upload.read().decode('utf-8-sig'), upload.name)
+            else:
+                raise BulkFileError("Please choose a file to upload.")
+            report = BankingFacade.bulk_transfer(sender_account.id, rows)
+        except (BulkFileError, UnicodeDecodeError) as e:
+            message = str(e)
+
+        if wants_json:
+            if report is None:
+                return JsonResponse({'error': message}, status=400)
+            return JsonResponse({'results': [dict(r, amount=None if r['amount'] is None else str(r['amount'])) for r in report]})
+        sender_account.refresh_from_db(fields=['balance'])
+
+    return render(request, 'bulk_transfer.html', {
+        'account': sender_account,
+        'message': message,
+        'report': report,
+        'succeeded': sum(1 for r in report or [] if r['status'] == 'Success'),
+    })
 
 # bankapp/views.py additions
 
@@ -208,14 +427,14 @@ from django.contrib import messages
 
 @login_required
 def apply_interest(request):
-    account = Account.objects.get(user=request.user)
+    account = get_user_account(request.user)
     
     if account.account_type == 'Savings':
         strategy = SavingsInterest()
         interest_amount = strategy.calculate(account.balance)
         
         if interest_amount > 0:
-            BankingFacade.deposit(account.id, interest_amount, description="Monthly Interest Credit (5%)")
+            BankingFacade.deposit(account.id, interest_amount, description="Monthly Interest Credit (5%)", contra_book='Interest')
             messages.success(request, f"Interest of ${interest_amount} applied!")
     else:
         # This handles your specific requirement for Current Accounts
@@ -225,25 +444,46 @@ def apply_interest(request):
 
 @login_required
 def profile_view(request):
-    account = Account.objects.get(user=request.user)
+    account = get_user_account(request.user)
     return render(request, 'profile.html', {'account': account})
 
 @login_required
 def print_statement(request):
-    account = Account.objects.get(user=request.user)
-    transactions = Transaction.objects.filter(account=account).order_by('-timestamp')
+    account = get_user_account(request.user)
+    transactions = Transaction.objects.filter(account=account)
     
     # Optional: Keep the same date filtering logic from the history view
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
+    params = None
     if start_date and end_date:
-        transactions = transactions.filter(timestamp__date__range=[start_date, end_date])
+        transactions = filter_by_date_range(transactions, start_date, end_date)
+        params = {'start_date': start_date, 'end_date': end_date}
+
+    try:
+        page = paginate_history(transactions, account, request.GET.get('cursor'), MAX_PAGE_SIZE, params)
+    except InvalidCursor:
+        page = paginate_history(transactions, account, page_size=MAX_PAGE_SIZE, params=params)
         
     return render(request, 'print_statement.html', {
         'account': account, 
-        'transactions': transactions
+        'transactions': page,
+        'next_cursor': page.next_cursor,
     })
 
+@login_required
+def export_statement(request):
+    """Stream the statement as CSV (?format=csv) or as a paginated printable page."""
+    account = get_user_account(request.user)
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+
+    if request.GET.get('format') == 'csv':
+        response = StreamingHttpResponse(csv_statement(account, start_date, end_date), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="statement-{account.account_number}.csv"'
+        return response
+    return StreamingHttpResponse(print_statement_pages(account, start_date, end_date), content_type='text/html')
+
 from decimal import Decimal
 from datetime import datetime, timedelta
 from django.shortcuts import render, redirect
@@ -256,7 +496,7 @@ import json
 
 @login_required
 def apply_loan_view(request):
-    account = Account.objects.get(user=request.user)
+    account = get_user_account(request.user)
     message = ""
     loan = None
 
@@ -292,8 +532,8 @@ def apply_loan_view(request):
 
 @login_required
 def my_loans_view(request):
-    account = Account.objects.get(user=request.user)
-    loans = Loan.objects.filter(account=account).order_by('-applied_on')
+    account = get_user_account(request.user)
+    loans = with_next_installment(Loan.objects.filter(account=account)).order_by('-applied_on')
     return render(request, 'my_loans.html', {
         'loans': loans,
         'account': account
@@ -308,19 +548,22 @@ from django.contrib import messages
 
 @login_required
 def mobile_recharge_view(request):
-    account = Account.objects.get(user=request.user)
+    account = get_user_account(request.user)
 
     if request.method == "POST":
         phone = request.POST.get("phone")
         country_code = request.POST.get("country_code")
         amount = Decimal(request.POST.get("amount"))
 
-        success, msg = RechargeFacade.process_recharge(
-            account.id,
-            phone,
-            country_code,
-            amount
-        )
+        try:
+            success, msg = run_once(request, 'recharge', lambda: RechargeFacade.process_recharge(
+                account.id,
+                phone,
+                country_code,
+                amount
+            ))
+        except IdempotencyConflict as e:
+            success, msg = False, str(e)
 
         if success:
             messages.success(request, msg)
@@ -330,10 +573,78 @@ def mobile_recharge_view(request):
         return redirect("mobile_recharge")
 
     return render(request, "mobile_recharge.html", {
-        "account": account
+        "account": account,
+        "idempotency_key": new_key(),
     })
 
 
+# --- Async read views ---
+# Used instead of the sync ones above when ASYNC_READ_VIEWS is on (see urls.py), so
+# under ASGI these pages don't each tie up a thread-pool worker waiting on the DB.
+# Rendering still goes through sync_to_async: context processors read the session
+# and messages, which the async ORM can't do yet.
+
+arender = sync_to_async(render)
 
 
+async def _arequest_account(request):
+    user = await request.auser()
+    request.user = user  # so the templates don't load the user a second time
+    return await aget_user_account(user)
 
+
+@login_required
+async def dashboard_async(request):
+    try:
+        account = await _arequest_account(request)
+    except Account.DoesNotExist:
+        return HttpResponse("No bank account found for this user.")
+
+    transactions = await apaginate_history(Transaction.objects.filter(account=account), account, page_size=10)
+    series = await abalance_series(account, _chart_start(), granularity='month')
+    context = _dashboard_context(account, transactions, series, await atype_totals(account))
+    return await arender(request, 'dashboard.html', context)
+
+
+@login_required
+async def transaction_history_async(request):
+    try:
+        account = await _arequest_account(request)
+    except Account.DoesNotExist:
+        return redirect('signup')
+
+    transactions = Transaction.objects.filter(account=account)
+    search_error = ''
+    try:
+        transactions = search_transactions(transactions, request.GET, account)
+    except SearchError as e:
+        search_error = str(e)
+        transactions = transactions.none()
+
+    try:
+        page = await apaginate_history(transactions, account, request.GET.get('cursor'), params=request.GET)
+    except InvalidCursor:
+        page = await apaginate_history(transactions, account, params=request.GET)
+
+    return await arender(request, 'history.html', {
+        'account': account,
+        'transactions': page,
+        'next_cursor': page.next_cursor,
+        **_search_context(request, search_error),
+    })
+
+
+@login_required
+async def profile_async(request):
+    account = await _arequest_account(request)
+    return await arender(request, 'profile.html', {'account': account})
+
+
+@login_required
+async def my_loans_async(request):
+    account = await _arequest_account(request)
+    loans = [loan async for loan in with_next_installment(Loan.objects.filter(account=account)).order_by('-applied_on')]
+    return await arender(request, 'my_loans.html', {
+        'loans': loans,
+        'account': account
+    })
@@ -43,11 +43,13 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'bankapp.profiling.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bankapp.cache.AccountCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,8 +60,14 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  # <- add this
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parse each template once per process; receipt emails are rendered in bulk
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -87,16 +95,82 @@ DEFAULT_FROM_EMAIL = 'SA Bank <abubakarshabbir64@gmail.com>'
 
 # banking_system/settings.py
 
+# Connections: by default each worker thread keeps its connection for
+# DB_CONN_MAX_AGE seconds and checks it's still alive before a request reuses it.
+# DB_POOL_SIZE > 0 switches to the pooled backend (bankapp/db_pool): connections
+# go back to a per-process pool after every request and are shared by all threads
+# and async tasks, so CONN_MAX_AGE defaults to 0 there.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '0'))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'banking_db',
-        'USER': 'root',
-        'PASSWORD': '3512',
-        'HOST': 'localhost',
-        'PORT': '3306',
+        'ENGINE': 'bankapp.db_pool.mysql' if DB_POOL_SIZE else 'django.db.backends.mysql',
+        'NAME': os.environ.get('DB_NAME', 'banking_db'),
+        'USER': os.environ.get('DB_USER', 'root'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', '3512'),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '3306'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '0' if DB_POOL_SIZE else '60')),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'POOL': {
+            'SIZE': DB_POOL_SIZE,
+            'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', '10')),
+            'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', '3600')),  # seconds; keep below MySQL's wait_timeout
+            'TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        },
+    }
+}
+
+# Caching
+# Account lookups are memoised per request; set ACCOUNT_CACHE_TTL (seconds) > 0 to
+# also keep the ones that never change (account number -> id, user -> account) in
+# this cache between requests. Account rows themselves are never cached here.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
+ACCOUNT_CACHE_TTL = int(os.environ.get('ACCOUNT_CACHE_TTL', '0'))
+# Balance-trend series (bankapp/ledger.py) stay cached until the account's next
+# write; this only bounds how long a series nobody invalidates can linger
+BALANCE_SERIES_CACHE_TTL = int(os.environ.get('BALANCE_SERIES_CACHE_TTL', str(24 * 3600)))
+
+# Request profiling (see bankapp/profiling.py and `manage.py request_stats`)
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', '1') == '1'
+REQUEST_PROFILING_FLUSH_SECONDS = 30
+SLOW_REQUEST_MS = 500
+SLOW_REQUEST_KEEP = int(os.environ.get('SLOW_REQUEST_KEEP', 1000))  # older SlowRequest rows are pruned on flush
+DUPLICATE_QUERY_THRESHOLD = 3  # same query shape this many times in one request = likely N+1
+
+# Serve dashboard/history/profile/my-loans from the async-ORM views. Only worth it
+# under ASGI (uvicorn banking_system.asgi:application); under WSGI leave it off.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '0') == '1'
+
+# How long deposit/withdraw/transfer/recharge outcomes are kept for replay under
+# their idempotency key (see bankapp/idempotency.py)
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+
+# Velocity limits on transfers and withdrawals (bankapp/velocity.py): at most
+# VELOCITY_MAX_DEBITS in any 10 minutes and VELOCITY_DAILY_DEBIT_LIMIT moved out in
+# any 24 hours. Recent debits are kept per process; with several worker processes,
+# point VELOCITY_CACHE_ALIAS at a shared cache (Redis, Memcached) in CACHES.
+# Payroll batches (bulk_transfer) are checked once per batch against
+# VELOCITY_DAILY_BULK_LIMIT instead.
+VELOCITY_CHECKS = os.environ.get('VELOCITY_CHECKS', '1') == '1'
+VELOCITY_MAX_DEBITS = int(os.environ.get('VELOCITY_MAX_DEBITS', '20'))
+VELOCITY_DAILY_DEBIT_LIMIT = int(os.environ.get('VELOCITY_DAILY_DEBIT_LIMIT', '50000'))
+VELOCITY_DAILY_BULK_LIMIT = int(os.environ.get('VELOCITY_DAILY_BULK_LIMIT', '1000000'))
+VELOCITY_HISTORY = 64  # debits remembered per account; busier accounts fall back to a query
+VELOCITY_MAX_ACCOUNTS = 100000
+VELOCITY_CACHE_ALIAS = os.environ.get('VELOCITY_CACHE_ALIAS') or None
+
+# Transactions older than ARCHIVE_AFTER_DAYS (whole months) are moved to gzip'd
+# JSON-lines files under ARCHIVE_DIR by `manage.py archive_transactions`; history
+# and statements read them back when a date range reaches that far (bankapp/archive.py)
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators